@@ -0,0 +1,164 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import json
+from collections import Counter, deque
+
+
+class TopK:
+    """
+    Approximate heavy hitter counter with bounded memory. Once more than 2 * capacity keys
+    are tracked, only the capacity most frequent ones are kept. Pruning sorts at most
+    2 * capacity keys every capacity insertions, so the amortized cost per update is O(log capacity).
+
+    Parameters:
+        capacity: Number of keys kept after pruning
+    """
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key, amount=1):
+        """
+        Count key
+        """
+        self.counts[key] = self.counts.get(key, 0) + amount
+        if len(self.counts) > 2 * self.capacity:
+            self.counts = dict(Counter(self.counts).most_common(self.capacity))
+
+    def most_common(self, n):
+        """
+        Returns:
+            List of the n most frequent (key, count) tuples
+        """
+        return Counter(self.counts).most_common(n)
+
+
+class ConflictAnalytics:
+    """
+    Aggregates where aborts come from: per variable counts of first-committer-wins conflicts
+    and rw-antidependency edges, the transaction pairs of those edges, the transactions
+    involved in cycles of the serialization graph and abort counts by reason.
+    Memory is bounded by the number of variables plus the capacity of the TopK counters.
+
+    Parameters:
+        capacity: Capacity of the TopK counters of transaction pairs and cycle members
+        recent_cycles: Number of most recent cycles kept
+
+    Attributes:
+        fcw_conflicts ( Counter ) : KEY is variable id and VALUE is number of first-committer-wins aborts
+        rw_edges ( Counter ) : KEY is variable id and VALUE is number of rw-antidependency edges
+        rw_pairs ( TopK ) : KEY is (reader txn, writer txn)
+        cycle_members ( TopK ) : KEY is txn name and VALUE is number of detected cycles it was part of
+        cycles ( deque ) : Most recent cycles as lists of txn names
+        aborts ( Counter ) : KEY is AbortReason name
+    """
+    enabled = True
+
+    def __init__(self, capacity=1000, recent_cycles=100):
+        self.fcw_conflicts = Counter()
+        self.rw_edges = Counter()
+        self.rw_pairs = TopK(capacity)
+        self.cycle_members = TopK(capacity)
+        self.cycles = deque(maxlen=recent_cycles)
+        self.aborts = Counter()
+
+    def fcw_conflict(self, variable_id):
+        """
+        A transaction aborted because variable_id was committed by another transaction after it began
+        """
+        self.fcw_conflicts[variable_id] += 1
+
+    def rw_edge(self, variable_id, reader, writer):
+        """
+        A rw-antidependency edge reader --rw--> writer was added on variable_id
+        """
+        self.rw_edges[variable_id] += 1
+        self.rw_pairs.add((reader, writer))
+
+    def cycle(self, txn_names):
+        """
+        A cycle through txn_names was detected in the serialization graph
+        """
+        self.cycles.append(txn_names)
+        for txn_name in txn_names:
+            self.cycle_members.add(txn_name)
+
+    def abort(self, reason):
+        """
+        A transaction aborted for reason (AbortReason)
+        """
+        self.aborts[reason.name] += 1
+
+    def report(self, top_n=10):
+        """
+        Hotspot report
+
+        Parameters:
+            top_n: Number of entries in every top list
+
+        Returns:
+            Dict representation of the report
+        """
+        return {
+            "aborts_by_reason": dict(self.aborts),
+            "fcw_conflicts_by_variable": [{"variable": "x" + str(var), "count": count} for var, count in self.fcw_conflicts.most_common(top_n)],
+            "rw_edges_by_variable": [{"variable": "x" + str(var), "count": count} for var, count in self.rw_edges.most_common(top_n)],
+            "rw_transaction_pairs": [{"reader": "T" + str(reader), "writer": "T" + str(writer), "count": count}
+                                     for (reader, writer), count in self.rw_pairs.most_common(top_n)],
+            "cycle_transactions": [{"transaction": txn_name, "cycles": count} for txn_name, count in self.cycle_members.most_common(top_n)],
+            "recent_cycles": list(self.cycles)[-top_n:],
+        }
+
+    def format_report(self, top_n=10):
+        """
+        Human readable hotspot report
+
+        Parameters:
+            top_n: Number of entries in every top list
+
+        Returns:
+            Report as a string
+        """
+        report = self.report(top_n)
+        lines = ["Conflict hotspots (top " + str(top_n) + ")"]
+        lines.append("Aborts by reason : " + (", ".join(reason + " : " + str(count) for reason, count in sorted(report["aborts_by_reason"].items())) or "none"))
+        lines.append("First-committer-wins conflicts by variable : " + (", ".join(entry["variable"] + " : " + str(entry["count"]) for entry in report["fcw_conflicts_by_variable"]) or "none"))
+        lines.append("rw-antidependency edges by variable : " + (", ".join(entry["variable"] + " : " + str(entry["count"]) for entry in report["rw_edges_by_variable"]) or "none"))
+        lines.append("rw-antidependency transaction pairs : " + (", ".join(entry["reader"] + " -> " + entry["writer"] + " : " + str(entry["count"]) for entry in report["rw_transaction_pairs"]) or "none"))
+        lines.append("Transactions in cycles : " + (", ".join(entry["transaction"] + " : " + str(entry["cycles"]) for entry in report["cycle_transactions"]) or "none"))
+        for cycle in report["recent_cycles"]:
+            lines.append("Cycle : " + " -> ".join(cycle + cycle[:1]))
+        return "\n".join(lines) + "\n"
+
+    def export(self, file_path, top_n=10):
+        """
+        Write the report as JSON
+
+        Parameters:
+            file_path: Output file
+            top_n: Number of entries in every top list
+        """
+        with open(file_path, 'w', encoding='UTF-8') as report_file:
+            json.dump(self.report(top_n), report_file, indent=2)
+
+
+class NullAnalytics(ConflictAnalytics):
+    """
+    Analytics which records nothing. Used when analytics are disabled
+    """
+    enabled = False
+
+    def fcw_conflict(self, variable_id):
+        return
+
+    def rw_edge(self, variable_id, reader, writer):
+        return
+
+    def cycle(self, txn_names):
+        return
+
+    def abort(self, reason):
+        return
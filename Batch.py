@@ -0,0 +1,146 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import plac
+
+from RepCRec.config import config
+from RepCRec.Output import create_sink
+from RepCRec.SiteManager import SiteManager
+from RepCRec.TransactionManager import TransactionManager
+from RepCRec.Simulator import Simulator
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+BATCH_OUTPUT_FORMATS = ["text", "jsonl", "null"]
+OUTPUT_EXTENSIONS = {"text": ".out", "jsonl": ".jsonl", "null": ""}
+
+
+def find_inputs(pattern):
+    """
+    Expand a directory or a glob into a sorted list of input files
+
+    Parameters:
+        pattern: Directory (every file in it is an input) or glob pattern
+
+    Returns:
+        List of file paths
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*")
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def run_file(file_path, out_path, num_sites, num_variables, output_format):
+    """
+    Run one input file with a fresh SiteManager, TransactionManager and Simulator.
+    Executed in a worker process.
+
+    Parameters:
+        file_path: Input file
+        out_path: Output file, unused for the null format
+        num_sites: Number of sites
+        num_variables: Number of variables
+        output_format: text, jsonl or null
+
+    Returns:
+        Dict with file, commits, aborts, seconds and error
+    """
+    start = time.perf_counter()
+    summary = {"file": file_path, "commits": 0, "aborts": 0, "seconds": 0.0, "error": None}
+    output = create_sink(output_format, out_path)
+    try:
+        site_manager = SiteManager(num_sites, num_variables, output)
+        transaction_manager = TransactionManager(num_variables, num_sites, site_manager)
+        Simulator(file_path, site_manager, transaction_manager).run()
+        for txn in transaction_manager.transaction_map.values():
+            if txn.get_status() == TransactionStatus.COMMITTED:
+                summary["commits"] += 1
+            elif txn.get_status() == TransactionStatus.ABORTED:
+                summary["aborts"] += 1
+    except Exception as error:
+        summary["error"] = repr(error)
+    finally:
+        output.close()
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def run_batch(file_paths, out_dir, num_sites=config['NUM_SITES'], num_variables=config['NUM_VARIABLES'],
+              output_format="text", workers=None):
+    """
+    Run every input file in a process pool
+
+    Parameters:
+        file_paths: List of input files
+        out_dir: Directory receiving one output file per input
+        num_sites: Number of sites
+        num_variables: Number of variables
+        output_format: text, jsonl or null
+        workers: Number of worker processes, number of CPUs if None
+
+    Returns:
+        List of summaries returned by run_file, in the order of file_paths
+    """
+    if output_format != "null":
+        os.makedirs(out_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for file_path in file_paths:
+            out_path = os.path.join(out_dir, os.path.basename(file_path) + OUTPUT_EXTENSIONS[output_format])
+            futures.append(executor.submit(run_file, file_path, out_path, num_sites, num_variables, output_format))
+        return [future.result() for future in futures]
+
+
+def format_summary(summaries, wall_time):
+    """
+    Aggregate summary table of a batch
+
+    Parameters:
+        summaries: List of summaries returned by run_file
+        wall_time: Wall time of the whole batch
+
+    Returns:
+        Summary as a string
+    """
+    width = max([len(summary["file"]) for summary in summaries] + [4])
+    lines = ["%-*s %8s %8s %10s" % (width, "file", "commits", "aborts", "seconds")]
+    for summary in summaries:
+        line = "%-*s %8d %8d %10.4f" % (width, summary["file"], summary["commits"], summary["aborts"], summary["seconds"])
+        if summary["error"]:
+            line += "  ERROR " + summary["error"]
+        lines.append(line)
+    lines.append("%-*s %8d %8d %10.4f" % (width, "TOTAL (%d files, wall time)" % len(summaries),
+                                          sum(summary["commits"] for summary in summaries),
+                                          sum(summary["aborts"] for summary in summaries), wall_time))
+    return "\n".join(lines)
+
+
+@plac.annotations(
+    inputs=("Directory or glob of input files", "positional", None, str),
+    out_dir=("Directory for the output files", "option", "o", str),
+    num_sites=("Number of Sites", "option", "n", int),
+    num_variables=("Number of variables", "option", "v", int),
+    output_format=("Output format", "option", "f", str, BATCH_OUTPUT_FORMATS),
+    workers=("Number of worker processes, number of CPUs by default", "option", "w", int))
+def main(inputs, out_dir="batch_output", num_sites=config['NUM_SITES'], num_variables=config['NUM_VARIABLES'],
+         output_format="text", workers=None):
+    """
+    Run many input files in parallel, one output file per input, and print a summary
+    """
+    file_paths = find_inputs(inputs)
+    if not file_paths:
+        print("No input files found for " + inputs)
+        return
+    start = time.perf_counter()
+    summaries = run_batch(file_paths, out_dir, num_sites, num_variables, output_format, workers)
+    print(format_summary(summaries, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    plac.call(main)
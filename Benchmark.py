@@ -0,0 +1,747 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import collections
+import contextlib
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import plac
+
+from RepCRec.config import config
+from RepCRec.Output import LoggingSink, TextSink, JsonLinesSink, NullSink, RecordingSink
+from RepCRec.Result import DumpResult
+from RepCRec.Metrics import Metrics, NullMetrics
+from RepCRec.SiteManager import SiteManager
+from RepCRec.TransactionManager import TransactionManager
+from RepCRec.Simulator import Simulator
+from RepCRec.Checkpoint import save_checkpoint, load_checkpoint, dumps_state
+from RepCRec.Fork import clone_state, run_branches
+from RepCRec.Daemon import DaemonClient
+from RepCRec.Scheduler import RetryScheduler
+from RepCRec.Shard import ShardRouter
+from RepCRec.Replication import LazyReplication
+from RepCRec.Placement import AdaptivePlacement
+from RepCRec.Rebalance import SiteRebalancer
+from RepCRec.Cost import CostModel
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+
+def generate_workload(num_txns, ops_per_txn=4, concurrency=4, num_sites=config['NUM_SITES'],
+                      num_variables=config['NUM_VARIABLES'], write_ratio=0.5, fail_every=0, seed=0,
+                      hot_reads=(), hot_writes=(), skew=0.0, site_changes=()):
+    """
+    Generate a random input trace
+
+    Parameters:
+        num_txns: Number of transactions
+        ops_per_txn: Number of reads and writes per transaction
+        concurrency: Number of transactions running at the same time
+        num_sites: Number of sites
+        num_variables: Number of variables
+        write_ratio: Fraction of operations which are writes
+        fail_every: If > 0, a random site fails every fail_every instructions and recovers fail_every / 2 instructions later
+        seed: Seed of the random generator
+        hot_reads: Variable ids a read goes to with probability skew
+        hot_writes: Variable ids a write goes to with probability skew
+        skew: Fraction of the reads and writes which go to hot_reads and hot_writes
+        site_changes: (position, instruction) pairs, e.g. (100, "add_site()"), the instruction is added
+            once the trace has position lines
+
+    Returns:
+        List of instruction lines
+    """
+    rng = random.Random(seed)
+    lines = []
+    running = {}
+    next_txn = 1
+    down_site = None
+    recover_at = None
+    site_changes = sorted(site_changes)
+
+    while next_txn <= num_txns or running:
+        while site_changes and len(lines) >= site_changes[0][0]:
+            lines.append(site_changes.pop(0)[1])
+        while len(running) < concurrency and next_txn <= num_txns:
+            lines.append("begin(T%d)" % next_txn)
+            running[next_txn] = 0
+            next_txn += 1
+
+        txn = rng.choice(list(running.keys()))
+        if running[txn] == ops_per_txn:
+            lines.append("end(T%d)" % txn)
+            del running[txn]
+        else:
+            var = rng.randint(1, num_variables)
+            is_write = rng.random() < write_ratio
+            hot = hot_writes if is_write else hot_reads
+            if hot and rng.random() < skew:
+                var = rng.choice(hot)
+            if is_write:
+                lines.append("W(T%d,x%d,%d)" % (txn, var, rng.randint(0, 1000)))
+            else:
+                lines.append("R(T%d,x%d)" % (txn, var))
+            running[txn] += 1
+
+        if fail_every > 0:
+            if down_site is None and len(lines) % fail_every == 0:
+                down_site = rng.randint(1, num_sites)
+                recover_at = len(lines) + max(1, fail_every // 2)
+                lines.append("fail(%d)" % down_site)
+            elif down_site is not None and len(lines) >= recover_at:
+                lines.append("recover(%d)" % down_site)
+                down_site = None
+
+    if down_site is not None:
+        lines.append("recover(%d)" % down_site)
+    lines.extend(instruction for _, instruction in site_changes)
+    lines.append("dump()")
+    return lines
+
+
+def group_ends(lines, group_size):
+    """
+    Delay end() instructions and put every group_size of them on one ;-separated line.
+    Pending ends are written before fail, recover and dump instructions
+
+    Returns:
+        List of instruction lines
+    """
+    grouped = []
+    ends = []
+    for line in lines:
+        if line.startswith("end("):
+            ends.append(line)
+            if len(ends) < group_size:
+                continue
+        elif ends and not line.startswith(("fail(", "recover(", "dump(")):
+            grouped.append(line)
+            continue
+        if ends:
+            grouped.append(";".join(ends))
+            ends = []
+        if not line.startswith("end("):
+            grouped.append(line)
+    if ends:
+        grouped.append(";".join(ends))
+    return grouped
+
+
+def batch_ops(lines, batch_size):
+    """
+    Merge runs of consecutive reads, or of consecutive writes, of the same transaction into batched
+    instructions of at most batch_size variables, R(T1,x1,x2) and W(T1,x2=5,x4=9)
+
+    Returns:
+        List of instruction lines
+    """
+    batched = []
+    run = []
+    for line in lines + [""]:
+        kind, _, params = line.partition("(")
+        params = params.rstrip(")").split(",")
+        if run and (kind != run[0][0] or params[0] != run[0][1][0] or len(run) == batch_size):
+            txn_name = run[0][1][0]
+            if run[0][0] == "R":
+                batched.append("R(%s,%s)" % (txn_name, ",".join(params_[1] for _, params_ in run)))
+            else:
+                batched.append("W(%s,%s)" % (txn_name, ",".join("%s=%s" % (params_[1], params_[2]) for _, params_ in run)))
+            run = []
+        if kind in ("R", "W"):
+            run.append((kind, params))
+        elif line:
+            batched.append(line)
+    return batched
+
+
+def write_workload(lines, directory, name="workload.txt"):
+    """
+    Write a trace to a file
+
+    Returns:
+        Path of the file
+    """
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='UTF-8') as trace_file:
+        trace_file.write("\n".join(lines) + "\n")
+    return path
+
+
+def run_trace(path, output, num_sites=config['NUM_SITES'], num_variables=config['NUM_VARIABLES'], metrics=None):
+    """
+    Run a trace end to end with fresh managers
+
+    Returns:
+        Wall time in seconds
+    """
+    start = time.perf_counter()
+    site_manager = SiteManager(num_sites, num_variables, output, metrics=metrics)
+    transaction_manager = TransactionManager(num_variables, num_sites, site_manager)
+    Simulator(path, site_manager, transaction_manager).run()
+    output.close()
+    return time.perf_counter() - start
+
+
+def bench_sinks(directory, num_txns, repeat):
+    """
+    End to end time of the same trace with each output sink
+    """
+    path = write_workload(generate_workload(num_txns, fail_every=50), directory)
+    out_path = os.path.join(directory, "out")
+    root = logging.getLogger()
+
+    def log_sink():
+        handler = logging.FileHandler(out_path, mode='w', encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+        root.handlers = [handler]
+        root.setLevel(logging.INFO)
+        return LoggingSink()
+
+    sinks = [
+        ("log", log_sink),
+        ("text", lambda: TextSink(open(out_path, 'w', encoding='UTF-8'))),
+        ("jsonl", lambda: JsonLinesSink(open(out_path, 'w', encoding='UTF-8'))),
+        ("null", NullSink),
+    ]
+    print("%-8s %10s" % ("sink", "seconds"))
+    for name, make_sink in sinks:
+        # LoggingSink prints dump() to std output
+        with open(os.devnull, 'w', encoding='UTF-8') as devnull, contextlib.redirect_stdout(devnull):
+            best = min(run_trace(path, make_sink()) for _ in range(repeat))
+        print("%-8s %10.4f" % (name, best))
+    root.handlers = []
+
+
+def bench_metrics(directory, num_txns, repeat):
+    """
+    End to end time of the same trace with metrics disabled and enabled
+    """
+    path = write_workload(generate_workload(num_txns, fail_every=50), directory)
+    print("%-8s %10s" % ("metrics", "seconds"))
+    for name, make_metrics in [("off", NullMetrics), ("on", Metrics)]:
+        best = min(run_trace(path, NullSink(), metrics=make_metrics()) for _ in range(repeat))
+        print("%-8s %10.4f" % (name, best))
+
+
+def bench_checkpoint(directory, num_txns, repeat):
+    """
+    Time to reach the middle of a trace by replaying its first half against restoring a checkpoint
+    """
+    path = write_workload(generate_workload(num_txns, fail_every=50), directory)
+    checkpoint_path = os.path.join(directory, "checkpoint")
+    with open(path, encoding='UTF-8') as trace:
+        half = sum(1 for line in trace if line.strip()) // 2
+
+    def replay():
+        start = time.perf_counter()
+        site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'], NullSink())
+        transaction_manager = TransactionManager(config['NUM_VARIABLES'], config['NUM_SITES'], site_manager)
+        simulator = Simulator(path, site_manager, transaction_manager)
+        simulator.run(half)
+        return time.perf_counter() - start, simulator
+
+    def restore():
+        start = time.perf_counter()
+        load_checkpoint(checkpoint_path, NullSink())
+        return time.perf_counter() - start
+
+    replay_time, simulator = min((replay() for _ in range(repeat)), key=lambda result: result[0])
+    size = save_checkpoint(checkpoint_path, simulator)
+    restore_time = min(restore() for _ in range(repeat))
+    print("%d instructions replayed, checkpoint of %d bytes" % (half, size))
+    print("%-8s %10s" % ("method", "seconds"))
+    print("%-8s %10.4f" % ("replay", replay_time))
+    print("%-8s %10.4f" % ("restore", restore_time))
+
+
+def bench_fork(directory, num_txns, repeat):
+    """
+    Cost of forking the state of a run against its size, compared with copying it in process
+    """
+    print("%8s %12s %10s %10s" % ("txns", "state bytes", "fork (s)", "copy (s)"))
+    for size in [num_txns // 4, num_txns // 2, num_txns]:
+        path = write_workload(generate_workload(size, fail_every=50), directory, "fork_%d.txt" % size)
+        site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'], NullSink())
+        transaction_manager = TransactionManager(config['NUM_VARIABLES'], config['NUM_SITES'], site_manager)
+        simulator = Simulator(path, site_manager, transaction_manager)
+        simulator.run()
+
+        fork_time = min(run_branches(simulator, [None])[0]["fork_seconds"] for _ in range(repeat))
+        copy_time = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            clone_state(simulator)
+            copy_time = min(copy_time, time.perf_counter() - start)
+        print("%8d %12d %10.4f %10.4f" % (size, len(dumps_state(simulator)), fork_time, copy_time))
+
+
+def bench_daemon(directory, num_txns, repeat):
+    """
+    Per job latency of tiny traces run by a cold start of start.py against a warm daemon.
+    num_txns is the number of jobs, every trace has 5 transactions
+    """
+    paths = [write_workload(generate_workload(5, seed=seed), directory, "job_%d.txt" % seed) for seed in range(num_txns)]
+    # Directory containing the RepCRec package
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    socket_path = os.path.join(directory, "daemon.sock")
+
+    cold = []
+    for path in paths[:max(1, min(len(paths), 50))]:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "RepCRec.start", path, "-f", "text"], cwd=root, check=True, stdout=subprocess.DEVNULL)
+        cold.append(time.perf_counter() - start)
+
+    daemon = subprocess.Popen([sys.executable, "-m", "RepCRec.Daemon", "-s", socket_path], cwd=root)
+    try:
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        client = DaemonClient(socket_path)
+        warm = []
+        for _ in range(repeat):
+            for path in paths:
+                start = time.perf_counter()
+                client.submit(path)
+                warm.append(time.perf_counter() - start)
+        client.close()
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    print("%-8s %8s %12s %12s" % ("mode", "jobs", "mean (ms)", "median (ms)"))
+    for name, latencies in [("cold", cold), ("daemon", warm)]:
+        print("%-8s %8d %12.3f %12.3f" % (name, len(latencies), 1000 * statistics.mean(latencies), 1000 * statistics.median(latencies)))
+
+
+def bench_retry(directory, num_txns, repeat):
+    """
+    Commits and aborts of a trace with transient site failures when waiting transactions abort at
+    end() against deferring their end with retry timeouts of increasing length
+    """
+    path = write_workload(generate_workload(num_txns, fail_every=20), directory)
+    print("%-10s %8s %8s %10s %12s" % ("timeout", "commits", "aborts", "seconds", "commits/s"))
+    for timeout in [None, 5, 20, 80]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'], NullSink())
+            transaction_manager = TransactionManager(config['NUM_VARIABLES'], config['NUM_SITES'], site_manager,
+                                                     scheduler=RetryScheduler(timeout) if timeout else None)
+            Simulator(path, site_manager, transaction_manager).run()
+            best = min(best, time.perf_counter() - start)
+        statuses = [txn.get_status() for txn in transaction_manager.transaction_map.values()]
+        commits = statuses.count(TransactionStatus.COMMITTED)
+        print("%-10s %8d %8d %10.4f %12.1f" % (timeout or "off", commits, statuses.count(TransactionStatus.ABORTED), best, commits / best))
+
+
+def bench_group_commit(directory, num_txns, repeat):
+    """
+    Commits per second of a trace whose ends come in groups of 8 on one line, ending them one at
+    a time against group commit
+    """
+    path = write_workload(group_ends(generate_workload(num_txns, concurrency=16, fail_every=200), 8), directory)
+    print("%-10s %8s %8s %10s %12s" % ("commit", "commits", "aborts", "seconds", "commits/s"))
+    for name, group_commit in [("single", False), ("group", True)]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'], NullSink())
+            transaction_manager = TransactionManager(config['NUM_VARIABLES'], config['NUM_SITES'], site_manager)
+            Simulator(path, site_manager, transaction_manager, group_commit).run()
+            best = min(best, time.perf_counter() - start)
+        statuses = [txn.get_status() for txn in transaction_manager.transaction_map.values()]
+        commits = statuses.count(TransactionStatus.COMMITTED)
+        print("%-10s %8d %8d %10.4f %12.1f" % (name, commits, statuses.count(TransactionStatus.ABORTED), best, commits / best))
+
+
+def scan_dump_as_of(site_manager, timestamp):
+    """
+    dump_asof() of all sites scanning the snapshot list of every variable instead of the snapshot time index.
+    Does the same work as SiteManager.get_dump_as_of otherwise
+
+    Returns:
+        DumpResult
+    """
+    site_manager.replication.drain(site_manager, site_manager.current_time)
+    sites = {}
+    for site in site_manager.get_all_sites():
+        committed_variables = site.get_data_manager().get_committed_variables()
+        values = {}
+        for key, variable in committed_variables.items():
+            value = None
+            for commit_time, committed_value in variable.get_snapshots_list():
+                if commit_time > timestamp:
+                    break
+                value = committed_value
+            values[key] = value
+        sites[site.get_id()] = values
+    return DumpResult(sites)
+
+
+def bench_as_of(directory, num_txns, repeat):
+    """
+    dump_asof() at random past times using the snapshot time index against scanning the snapshot lists, for
+    histories of num_txns / 10, num_txns and 10 * num_txns transactions (pivot validation, which keeps long traces
+    fast). Both build the same DumpResult,
+    the index only pays off once the histories are long enough for a binary search to beat a short Python loop
+    """
+    print("%-8s %10s %-8s %10s %12s" % ("txns", "snapshots", "lookup", "seconds", "queries/s"))
+    for history in [max(1, num_txns // 10), num_txns, 10 * num_txns]:
+        path = write_workload(generate_workload(history, write_ratio=0.8), directory, "as_of_%d.txt" % history)
+        site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'], NullSink())
+        transaction_manager = TransactionManager(config['NUM_VARIABLES'], config['NUM_SITES'], site_manager, validation="pivot")
+        simulator = Simulator(path, site_manager, transaction_manager)
+        simulator.run()
+
+        rng = random.Random(0)
+        times = [rng.randint(0, simulator.current_time) for _ in range(200)]
+        snapshots = sum(len(variable.get_snapshots_list()) for site in site_manager.get_all_sites()
+                        for variable in site.get_data_manager().get_committed_variables().values())
+        for timestamp in times[:10]:
+            assert scan_dump_as_of(site_manager, timestamp).sites == site_manager.get_dump_as_of(timestamp).sites
+        for name, query in [("scan", lambda timestamp: scan_dump_as_of(site_manager, timestamp)), ("index", site_manager.get_dump_as_of)]:
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for timestamp in times:
+                    query(timestamp)
+                best = min(best, time.perf_counter() - start)
+            print("%-8d %10d %-8s %10.4f %12.1f" % (history, snapshots, name, best, len(times) / best))
+
+
+def bench_ssi(directory, num_txns, repeat):
+    """
+    Mean end() latency and aborts of the serialization graph engine against the pivot flag engine
+    on the same traces. An abort is a false positive if the transaction committed under the graph engine
+    """
+    print("%-12s %-7s %8s %8s %8s %12s %10s" % ("concurrency", "engine", "commits", "aborts", "false+", "end us", "seconds"))
+    for concurrency in [4, 16, 64]:
+        path = write_workload(generate_workload(num_txns, concurrency=concurrency), directory, "ssi_%d.txt" % concurrency)
+        committed = {}
+        for engine in ["graph", "pivot"]:
+            best = float('inf')
+            for _ in range(repeat):
+                metrics = Metrics()
+                start = time.perf_counter()
+                site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'], NullSink(), metrics=metrics)
+                transaction_manager = TransactionManager(config['NUM_VARIABLES'], config['NUM_SITES'], site_manager, validation=engine)
+                Simulator(path, site_manager, transaction_manager).run()
+                best = min(best, time.perf_counter() - start)
+            end_latency = metrics.histograms[("instruction_latency_seconds", (("type", "end"),))]
+            statuses = {txn_id: txn.get_status() for txn_id, txn in transaction_manager.transaction_map.items()}
+            aborted = [txn_id for txn_id, status in statuses.items() if status == TransactionStatus.ABORTED]
+            false_positives = sum(1 for txn_id in aborted if committed.get(txn_id))
+            committed = {txn_id: status == TransactionStatus.COMMITTED for txn_id, status in statuses.items()}
+            print("%-12d %-7s %8d %8d %8d %12.1f %10.4f" % (concurrency, engine, sum(committed.values()), len(aborted),
+                                                          false_positives, end_latency.sum / end_latency.count * 1e6, best))
+
+
+def bench_sites(directory, num_txns, repeat):
+    """
+    Time per instruction against the number of sites, with pivot validation so that the serialization
+    graph does not dominate, and time to fail a rack of half the sites at once against one by one
+    """
+    print("%-8s %10s %12s %12s %12s" % ("sites", "seconds", "us/instr", "rack ms", "one by one ms"))
+    for num_sites in [10, 100, 500]:
+        lines = generate_workload(num_txns, num_sites=num_sites, fail_every=100)
+        path = write_workload(lines, directory, "sites_%d.txt" % num_sites)
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            site_manager = SiteManager(num_sites, config['NUM_VARIABLES'], NullSink())
+            transaction_manager = TransactionManager(config['NUM_VARIABLES'], num_sites, site_manager, validation="pivot")
+            Simulator(path, site_manager, transaction_manager).run()
+            best = min(best, time.perf_counter() - start)
+
+        rack = list(range(1, num_sites // 2 + 1))
+        timings = []
+        for batched in [True, False]:
+            site_manager = SiteManager(num_sites, config['NUM_VARIABLES'], NullSink())
+            start = time.perf_counter()
+            if batched:
+                site_manager.fail_sites(rack)
+            else:
+                for site_id in rack:
+                    site_manager.fail_site(site_id)
+            site_manager.get_available_sites()
+            timings.append(time.perf_counter() - start)
+        print("%-8d %10.4f %12.1f %12.3f %12.3f" % (num_sites, best, best / len(lines) * 1e6, timings[0] * 1e3, timings[1] * 1e3))
+
+
+def bench_lazy(directory, num_txns, repeat):
+    """
+    Mean end() latency and mean time of its commit phase with eager replication against lazy replication,
+    which commits the primary copy only, and the distribution of the replication lag (ticks from a commit to its propagation to a replica)
+    """
+    print("%-8s %-6s %10s %10s %10s %8s %8s %8s %8s" % ("sites", "mode", "end us", "commit us", "seconds", "lag p50", "lag p90", "lag p99", "lag max"))
+    for num_sites in [10, 100, 500]:
+        path = write_workload(generate_workload(num_txns, num_sites=num_sites, write_ratio=0.8, fail_every=100),
+                              directory, "lazy_%d.txt" % num_sites)
+        for mode in ["eager", "lazy"]:
+            best = float('inf')
+            for _ in range(repeat):
+                metrics = Metrics()
+                replication = LazyReplication() if mode == "lazy" else None
+                start = time.perf_counter()
+                site_manager = SiteManager(num_sites, config['NUM_VARIABLES'], NullSink(), metrics=metrics, replication=replication)
+                transaction_manager = TransactionManager(config['NUM_VARIABLES'], num_sites, site_manager, validation="pivot")
+                Simulator(path, site_manager, transaction_manager).run()
+                best = min(best, time.perf_counter() - start)
+            end_latency = metrics.histograms[("instruction_latency_seconds", (("type", "end"),))]
+            commit_latency = metrics.histograms[("phase_seconds", (("phase", "commit"),))]
+            lags = ["-"] * 4
+            if replication is not None:
+                lags = [replication.lag_percentile(50), replication.lag_percentile(90), replication.lag_percentile(99), max(replication.lag_counts)]
+            print("%-8d %-6s %10.1f %10.1f %10.4f %8s %8s %8s %8s" % (num_sites, mode, end_latency.sum / end_latency.count * 1e6,
+                                                                   commit_latency.sum / commit_latency.count * 1e6, best, *lags))
+
+
+def bench_placement(directory, num_txns, repeat):
+    """
+    Static against adaptive placement on a skewed workload: most reads go to a few odd variables, which
+    are stored on a single site each, and most writes to a few even variables, which are committed on every
+    site. Reports the mean end() latency and commit phase, the commits, the share of the reads served by the
+    busiest site and the copies placed, refreshed and dropped by the adaptive placement
+    """
+    print("%-8s %-9s %10s %10s %8s %10s %6s %6s %6s" % ("sites", "placement", "end us", "commit us", "commits", "top site", "added", "fresh", "dropped"))
+    for num_sites in [10, 100]:
+        path = write_workload(generate_workload(num_txns, concurrency=8, num_sites=num_sites, write_ratio=0.4, fail_every=100,
+                                                hot_reads=(1, 3, 5, 7, 9), hot_writes=(2, 4, 6), skew=0.6),
+                              directory, "placement_%d.txt" % num_sites)
+        for mode in ["static", "adaptive"]:
+            for _ in range(repeat):
+                metrics = Metrics()
+                sink = RecordingSink()
+                placement = AdaptivePlacement() if mode == "adaptive" else None
+                site_manager = SiteManager(num_sites, config['NUM_VARIABLES'], sink, metrics=metrics, placement=placement)
+                transaction_manager = TransactionManager(config['NUM_VARIABLES'], num_sites, site_manager, validation="pivot")
+                Simulator(path, site_manager, transaction_manager).run()
+            end_latency = metrics.histograms[("instruction_latency_seconds", (("type", "end"),))]
+            commit_latency = metrics.histograms[("phase_seconds", (("phase", "commit"),))]
+            reads_by_site = collections.Counter(fields["site"] for event, _, _, fields in sink.events if event == "read")
+            commits = sum(1 for event, _, _, fields in sink.events if event == "commit")
+            moved = ["-"] * 3
+            if placement is not None:
+                moved = [placement.replicas_added, placement.replicas_refreshed, placement.replicas_dropped]
+            print("%-8d %-9s %10.1f %10.1f %8d %9.1f%% %6s %6s %6s" % (num_sites, mode, end_latency.sum / end_latency.count * 1e6,
+                                                                  commit_latency.sum / commit_latency.count * 1e6, commits,
+                                                                  100 * max(reads_by_site.values()) / sum(reads_by_site.values()), *moved))
+
+
+def bench_rebalance(directory, num_txns, repeat):
+    """
+    Online rebalancing: a site is added after a quarter of the trace and site 1 is decommissioned after half
+    of it, with 200 variables and several chunk sizes, against the same trace without the site changes.
+    Reports the time per instruction and the mean end() latency of the concurrent transactions, the ticks
+    the rebalances took, the copies and snapshots moved, and the rebalance throughput and mean pause per chunk
+    """
+    num_sites, num_variables = 10, 200
+    lines = generate_workload(num_txns, concurrency=8, num_sites=num_sites, num_variables=num_variables)
+    changes = [(len(lines) // 4, "add_site()"), (len(lines) // 2, "decommission_site(1)")]
+    traces = {"none": write_workload(lines, directory, "rebalance_none.txt")}
+    traces["chunks"] = write_workload(generate_workload(num_txns, concurrency=8, num_sites=num_sites, num_variables=num_variables,
+                                                        site_changes=changes), directory, "rebalance.txt")
+    print("%-8s %10s %10s %10s %8s %8s %8s %10s %12s %10s" % ("chunk", "seconds", "us/instr", "end us", "commits", "ticks",
+                                                               "copies", "snapshots", "snapshots/s", "chunk us"))
+    for chunk_size in [None, 16, 128, 1024]:
+        path = traces["none" if chunk_size is None else "chunks"]
+        best = float('inf')
+        for _ in range(repeat):
+            metrics = Metrics()
+            rebalancer = SiteRebalancer(chunk_size=chunk_size or 1)
+            start = time.perf_counter()
+            site_manager = SiteManager(num_sites, num_variables, NullSink(), metrics=metrics, rebalancer=rebalancer)
+            transaction_manager = TransactionManager(num_variables, num_sites, site_manager, validation="pivot")
+            Simulator(path, site_manager, transaction_manager).run()
+            best = min(best, time.perf_counter() - start)
+        end_latency = metrics.histograms[("instruction_latency_seconds", (("type", "end"),))]
+        statuses = [txn.get_status() for txn in transaction_manager.transaction_map.values()]
+        instructions = len(lines) + (0 if chunk_size is None else len(changes))
+        row = ["-"] * 5
+        if chunk_size is not None:
+            pauses = metrics.histograms[("phase_seconds", (("phase", "rebalance"),))]
+            row = [rebalancer.ticks, rebalancer.copies_moved, rebalancer.snapshots_moved,
+                   "%.0f" % (rebalancer.snapshots_moved / pauses.sum), "%.1f" % (pauses.sum / max(rebalancer.chunks, 1) * 1e6)]
+        print("%-8s %10.4f %10.1f %10.1f %8d %8s %8s %10s %12s %10s" % (chunk_size or "none", best, best / instructions * 1e6,
+                                                                     end_latency.sum / end_latency.count * 1e6,
+                                                                     statuses.count(TransactionStatus.COMMITTED), *row))
+
+
+def bench_batch(directory, num_txns, repeat):
+    """
+    Transactions of 50 reads and writes, each variable in its own R or W instruction against runs of them
+    batched in one instruction. Reports the wall time, the variables read or written per second and the speedup
+    """
+    num_sites, num_variables = 10, 1000
+    lines = generate_workload(max(num_txns // 10, 1), ops_per_txn=50, concurrency=1, num_sites=num_sites,
+                              num_variables=num_variables, write_ratio=0.3, fail_every=400)
+    num_ops = sum(1 for line in lines if line.startswith(("R(", "W(")))
+    print("%-8s %10s %12s %10s %10s" % ("batch", "seconds", "instr", "vars/s", "speedup"))
+    baseline = None
+    for batch_size in [1, 10, 50]:
+        trace = lines if batch_size == 1 else batch_ops(lines, batch_size)
+        path = write_workload(trace, directory, "batch_%d.txt" % batch_size)
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            site_manager = SiteManager(num_sites, num_variables, NullSink())
+            transaction_manager = TransactionManager(num_variables, num_sites, site_manager, validation="pivot")
+            Simulator(path, site_manager, transaction_manager).run()
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        print("%-8d %10.4f %12d %10.0f %10.2f" % (batch_size, best, len(trace), num_ops / best, baseline / best))
+
+
+def bench_scan(directory, num_txns, repeat):
+    """
+    Reading every variable in one transaction, after a trace in which two sites failed and recovered, with
+    one R() per variable against one S() over all of them. Reports the time and the variables read per second
+    """
+    print("%-10s %-6s %10s %12s" % ("variables", "read", "seconds", "vars/s"))
+    for num_variables in [1000, 10000, 100000]:
+        # About 6 lines per transaction, so two sites fail
+        path = write_workload(generate_workload(num_txns, num_variables=num_variables, write_ratio=0.8, fail_every=2 * num_txns),
+                              directory, "scan_%d.txt" % num_variables)
+        site_manager = SiteManager(config['NUM_SITES'], num_variables, NullSink())
+        transaction_manager = TransactionManager(num_variables, config['NUM_SITES'], site_manager)
+        simulator = Simulator(path, site_manager, transaction_manager)
+        simulator.run()
+        var_names = ["x%d" % var_index for var_index in range(1, num_variables + 1)]
+        txn_id = num_txns
+        for mode in ["R", "S"]:
+            best = float('inf')
+            for _ in range(repeat):
+                txn_id += 1
+                txn_name = "T%d" % txn_id
+                transaction_manager.current_time += 1
+                transaction_manager.begin([txn_name])
+                transaction_manager.current_time += 1
+                start = time.perf_counter()
+                if mode == "R":
+                    for var_name in var_names:
+                        transaction_manager.read_req([txn_name, var_name])
+                else:
+                    transaction_manager.scan([txn_name, var_names[0], var_names[-1]])
+                best = min(best, time.perf_counter() - start)
+            print("%-10d %-6s %10.4f %12.0f" % (num_variables, mode, best, num_variables / best))
+
+
+def bench_cost(directory, num_txns, repeat):
+    """
+    Simulated transaction latency of the supported replication and placement strategies on the skewed workload of
+    bench_placement, with 1 ms round trips, 100 values per ms and site 2, which stores x1 and x11, 10 times
+    slower for the whole run. Reports the commits and the percentiles of the simulated latency per transaction.
+    The cost model is deterministic, so every configuration runs once
+    """
+    print("%-8s %-6s %-9s %8s %8s %8s %8s %8s" % ("sites", "repl", "placement", "commits", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for num_sites in [10, 100]:
+        path = write_workload(generate_workload(num_txns, concurrency=8, num_sites=num_sites, write_ratio=0.4, fail_every=100,
+                                                hot_reads=(1, 3, 5, 7, 9), hot_writes=(2, 4, 6), skew=0.6),
+                              directory, "cost_%d.txt" % num_sites)
+        # Lazy replication can not be combined with adaptive placement
+        for replication, placement in [("eager", "static"), ("eager", "adaptive"), ("lazy", "static")]:
+            sink = RecordingSink()
+            site_manager = SiteManager(num_sites, config['NUM_VARIABLES'], sink,
+                                       replication=LazyReplication() if replication == "lazy" else None,
+                                       placement=AdaptivePlacement() if placement == "adaptive" else None,
+                                       cost=CostModel(bandwidth=[100.0], slow_sites={2: [(10.0, 0, float('inf'))]}))
+            transaction_manager = TransactionManager(config['NUM_VARIABLES'], num_sites, site_manager, validation="pivot")
+            Simulator(path, site_manager, transaction_manager).run()
+            cost = site_manager.cost
+            commits = sum(1 for event, _, _, fields in sink.events if event == "commit")
+            print("%-8d %-6s %-9s %8d %8.2f %8.2f %8.2f %8.2f" % (num_sites, replication, placement, commits, cost.percentile(50),
+                                                                 cost.percentile(90), cost.percentile(99), max(cost.latencies)))
+
+
+def bench_shards(directory, num_txns, repeat):
+    """
+    Throughput of the sharded transaction manager against one pivot transaction manager, for 1 to 8
+    shard processes. Many sites and long transactions make reads and writes dominate, which is the
+    part the shards can run in parallel. The router, the messages and the end() round trips are extra work,
+    on one core every shard count is slower than one transaction manager
+    """
+    num_sites = 200
+    lines = generate_workload(num_txns, ops_per_txn=16, concurrency=16, num_sites=num_sites, fail_every=200)
+    path = write_workload(lines, directory, "shards.txt")
+    print("cores: %s" % os.cpu_count())
+    print("%-8s %10s %14s %10s" % ("shards", "seconds", "instr/s", "speedup"))
+    baseline = None
+    for num_shards in [0, 1, 2, 4, 8]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if num_shards == 0:
+                site_manager = SiteManager(num_sites, config['NUM_VARIABLES'], NullSink())
+                transaction_manager = TransactionManager(config['NUM_VARIABLES'], num_sites, site_manager, validation="pivot")
+                Simulator(path, site_manager, transaction_manager).run()
+            else:
+                router = ShardRouter(num_shards, config['NUM_VARIABLES'], num_sites, NullSink())
+                Simulator(path, router=router).run()
+                router.close()
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        print("%-8s %10.4f %14.0f %10.2f" % (num_shards or "single", best, len(lines) / best, baseline / best))
+
+
+SUITES = {
+    "sinks": bench_sinks,
+    "metrics": bench_metrics,
+    "checkpoint": bench_checkpoint,
+    "fork": bench_fork,
+    "daemon": bench_daemon,
+    "retry": bench_retry,
+    "group": bench_group_commit,
+    "asof": bench_as_of,
+    "ssi": bench_ssi,
+    "sites": bench_sites,
+    "shards": bench_shards,
+    "lazy": bench_lazy,
+    "placement": bench_placement,
+    "rebalance": bench_rebalance,
+    "batch": bench_batch,
+    "scan": bench_scan,
+    "cost": bench_cost,
+}
+
+
+def write_artifacts(directory, artifact_dir, num_txns):
+    """
+    Run the default generated trace once with metrics enabled and write the metrics
+    (including the process_instr scoped timers) as CI artifacts
+
+    Parameters:
+        directory: Scratch directory for the trace
+        artifact_dir: Directory receiving metrics.json and metrics.prom
+        num_txns: Number of transactions in the generated trace
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    path = write_workload(generate_workload(num_txns, fail_every=50), directory, "artifact_workload.txt")
+    metrics = Metrics()
+    run_trace(path, NullSink(), metrics=metrics)
+    metrics.export(os.path.join(artifact_dir, "metrics.json"), "json")
+    metrics.export(os.path.join(artifact_dir, "metrics.prom"), "prometheus")
+
+
+@plac.annotations(
+    suite=("Benchmark to run", "positional", None, str, list(SUITES.keys())),
+    num_txns=("Number of transactions in the generated trace", "option", "t", int),
+    repeat=("Number of runs, best time is reported", "option", "r", int),
+    artifact_dir=("Directory to write metrics of an instrumented run to", "option", "a", str))
+def main(suite, num_txns=1000, repeat=3, artifact_dir=None):
+    """
+    Run one of the benchmark suites on a generated trace
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        SUITES[suite](directory, num_txns, repeat)
+        if artifact_dir:
+            write_artifacts(directory, artifact_dir, num_txns)
+
+
+if __name__ == "__main__":
+    plac.call(main)
@@ -0,0 +1,128 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import io
+import pickle
+import struct
+import zlib
+
+from RepCRec.Output import OutputSink, LoggingSink
+from RepCRec.Dump import DumpWriter
+from RepCRec.Metrics import Metrics, NullMetrics
+from RepCRec.Tracer import Tracer, NullTracer
+from RepCRec.Analytics import ConflictAnalytics, NullAnalytics
+
+CHECKPOINT_MAGIC = b"RCCK"
+CHECKPOINT_VERSION = 9
+HEADER = struct.Struct("<4sH")
+
+# Runtime attachments are not part of the state. They are written as references and
+# replaced with the attachments passed to load_checkpoint. Order matters, Null variants first.
+ATTACHMENT_TYPES = [
+    ("output", OutputSink),
+    ("dump_writer", DumpWriter),
+    ("null_metrics", NullMetrics),
+    ("metrics", Metrics),
+    ("null_tracer", NullTracer),
+    ("tracer", Tracer),
+    ("null_analytics", NullAnalytics),
+    ("analytics", ConflictAnalytics),
+]
+
+
+class CheckpointError(Exception):
+    """
+    Raised when a checkpoint can not be read
+    """
+
+
+class _StatePickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        for name, attachment_type in ATTACHMENT_TYPES:
+            if isinstance(obj, attachment_type):
+                return name
+        return None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, attachments):
+        super().__init__(file)
+        self.attachments = attachments
+
+    def persistent_load(self, pid):
+        if pid not in self.attachments:
+            raise CheckpointError("Unknown attachment " + str(pid))
+        return self.attachments[pid]
+
+
+def dumps_state(obj):
+    """
+    Serialize a Simulator (or an Engine, or any object holding the managers) without its
+    output sink, dump writer, metrics, tracer and analytics
+
+    Returns:
+        Checkpoint as bytes: magic, version and the zlib compressed state
+    """
+    buffer = io.BytesIO()
+    _StatePickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION) + zlib.compress(buffer.getvalue())
+
+
+def loads_state(data, output=None, dump_writer=None, metrics=None, tracer=None, analytics=None):
+    """
+    Restore an object serialized by dumps_state. The attachments which are not passed are
+    replaced with their defaults: LoggingSink, no dump writer, metrics, tracing and analytics disabled.
+
+    Returns:
+        Restored object
+    """
+    if len(data) < HEADER.size:
+        raise CheckpointError("Truncated checkpoint")
+    magic, version = HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC:
+        raise CheckpointError("Not a RepCRec checkpoint")
+    if version != CHECKPOINT_VERSION:
+        raise CheckpointError("Unsupported checkpoint version " + str(version))
+
+    null_metrics = NullMetrics()
+    null_tracer = NullTracer()
+    null_analytics = NullAnalytics()
+    attachments = {
+        "output": output if output is not None else LoggingSink(),
+        "dump_writer": dump_writer,
+        "null_metrics": metrics if metrics is not None else null_metrics,
+        "metrics": metrics if metrics is not None else null_metrics,
+        "null_tracer": tracer if tracer is not None else null_tracer,
+        "tracer": tracer if tracer is not None else null_tracer,
+        "null_analytics": analytics if analytics is not None else null_analytics,
+        "analytics": analytics if analytics is not None else null_analytics,
+    }
+    return _StateUnpickler(io.BytesIO(zlib.decompress(data[HEADER.size:])), attachments).load()
+
+
+def save_checkpoint(file_path, obj):
+    """
+    Write a checkpoint of obj (see dumps_state) to file_path
+
+    Returns:
+        Size of the checkpoint in bytes
+    """
+    data = dumps_state(obj)
+    with open(file_path, 'wb') as checkpoint_file:
+        checkpoint_file.write(data)
+    return len(data)
+
+
+def load_checkpoint(file_path, output=None, dump_writer=None, metrics=None, tracer=None, analytics=None):
+    """
+    Read a checkpoint written by save_checkpoint (see loads_state).
+    A restored Simulator continues reading its input file at the first line it did not read,
+    the prefix which was already executed is not parsed again.
+
+    Returns:
+        Restored object
+    """
+    with open(file_path, 'rb') as checkpoint_file:
+        return loads_state(checkpoint_file.read(), output, dump_writer, metrics, tracer, analytics)
@@ -0,0 +1,161 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import re
+
+
+def parse_site_values(spec):
+    """
+    Parse a value per site, e.g. "2" for every site or "1,1,5" for sites 1, 2 and 3. The last value
+    also applies to the sites after it
+
+    Returns:
+        List of floats, the value of site i is at index i - 1
+    """
+    try:
+        values = [float(value) for value in spec.split(",")]
+    except ValueError:
+        raise ValueError("Invalid value per site " + spec) from None
+    if any(value <= 0 for value in values):
+        raise ValueError("Values per site must be positive " + spec)
+    return values
+
+
+def parse_slow_sites(spec):
+    """
+    Parse slow sites, e.g. "3x10" (site 3 is 10 times slower) or "3x10@100-200,5x4" (site 3 is
+    10 times slower from tick 100 to tick 200, site 5 is 4 times slower for the whole run)
+
+    Returns:
+        Dict with KEY as site id and VALUE as list of (factor, first tick, last tick)
+    """
+    slow_sites = {}
+    for part in spec.split(","):
+        match = re.fullmatch(r"\s*(\d+)x([\d.]+)(?:@(\d+)-(\d+))?\s*", part)
+        if match is None:
+            raise ValueError("Invalid slow site " + part)
+        site_id, factor, first, last = match.groups()
+        window = (float(factor), int(first), int(last)) if first else (float(factor), 0, float('inf'))
+        slow_sites.setdefault(int(site_id), []).append(window)
+    return slow_sites
+
+
+class CostModel:
+    """
+    Simulated latency of the site accesses of transactions. A site access costs the round trip time of
+    the site plus the values transferred divided by its bandwidth, both in simulated milliseconds. A slow
+    site multiplies its round trip time and divides its bandwidth by its factor while the tick is in its window.
+
+    Every transaction has a clock of simulated milliseconds, advanced by its accesses in instruction order:
+        - a read served by a site: one access of one value to that site
+        - a write: one value sent to every copy it is written to in parallel, the slowest copy counts
+        - a commit: the writes of every site sent to the sites in parallel, the slowest site counts.
+          With lazy replication only the primary copies are committed in end()
+    The latency of a transaction is its clock when it commits or aborts. Costs are computed from the tick
+    of the instruction, so the simulated latencies do not change the order of the instructions or their results.
+
+    Parameters:
+        rtt: Round trip times in ms per site, see parse_site_values
+        bandwidth: Values transferred per ms per site, see parse_site_values
+        slow_sites: Dict with KEY as site id and VALUE as list of (factor, first tick, last tick), see parse_slow_sites
+
+    Attributes:
+        clocks ( Dict ) : KEY is txn id and VALUE is the simulated ms of the transaction so far
+        latencies ( List ) : Simulated latency in ms of every finished transaction, in finish order
+        site_time ( Dict ) : KEY is site id and VALUE is the simulated ms spent in accesses to the site
+    """
+    enabled = True
+
+    def __init__(self, rtt=(1.0,), bandwidth=(1000.0,), slow_sites=None):
+        self.rtt = list(rtt)
+        self.bandwidth = list(bandwidth)
+        self.slow_sites = slow_sites or {}
+        self.clocks = {}
+        self.latencies = []
+        self.site_time = {}
+
+    def _site_value(self, values, site_id):
+        return values[min(site_id, len(values)) - 1]
+
+    def access_cost(self, site_id, num_values, current_time):
+        """
+        Returns:
+            Simulated ms of one access transferring num_values values to or from the site at current_time
+        """
+        factor = 1.0
+        for slow_factor, first, last in self.slow_sites.get(site_id, ()):
+            if first <= current_time <= last:
+                factor *= slow_factor
+        cost = factor * (self._site_value(self.rtt, site_id) + num_values / self._site_value(self.bandwidth, site_id))
+        self.site_time[site_id] = self.site_time.get(site_id, 0.0) + cost
+        return cost
+
+    def _fan_out(self, txn_id, values_by_site, current_time):
+        if values_by_site:
+            cost = max(self.access_cost(site_id, num_values, current_time) for site_id, num_values in values_by_site.items())
+            self.clocks[txn_id] = self.clocks.get(txn_id, 0.0) + cost
+
+    def read(self, txn_id, site_id, current_time):
+        self._fan_out(txn_id, {site_id: 1}, current_time)
+
+    def write(self, txn_id, site_ids, current_time):
+        self._fan_out(txn_id, dict.fromkeys(site_ids, 1), current_time)
+
+    def commit(self, txn_id, values_by_site, current_time):
+        self._fan_out(txn_id, values_by_site, current_time)
+
+    def finish(self, txn_id, metrics):
+        """
+        Record the latency of a transaction which committed or aborted
+        """
+        latency = self.clocks.pop(txn_id, 0.0)
+        self.latencies.append(latency)
+        metrics.observe("txn_simulated_latency_ms", latency)
+
+    def percentile(self, percentile):
+        """
+        Returns:
+            The simulated latency in ms below which percentile % of the finished transactions were, None if none finished
+        """
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[max(0, -(-percentile * len(latencies) // 100) - 1)]
+
+    def format_summary(self):
+        """
+        Returns:
+            Summary of the simulated latencies of the finished transactions and the busiest sites
+        """
+        if not self.latencies:
+            return "Simulated latency: no transaction finished"
+        lines = ["Simulated latency of %d transactions (ms): p50 %.2f, p90 %.2f, p99 %.2f, max %.2f, mean %.2f" % (
+            len(self.latencies), self.percentile(50), self.percentile(90), self.percentile(99), max(self.latencies),
+            sum(self.latencies) / len(self.latencies))]
+        busiest = sorted(self.site_time.items(), key=lambda item: (-item[1], item[0]))[:5]
+        lines.append("Simulated time per site (ms): " + ", ".join("site %s %.2f" % item for item in busiest))
+        return "\n".join(lines)
+
+
+class NullCostModel(CostModel):
+    """
+    Site accesses are free, no latency is recorded. Used when the cost model is disabled
+    """
+    enabled = False
+
+    def access_cost(self, site_id, num_values, current_time):
+        return 0.0
+
+    def read(self, txn_id, site_id, current_time):
+        return
+
+    def write(self, txn_id, site_ids, current_time):
+        return
+
+    def commit(self, txn_id, values_by_site, current_time):
+        return
+
+    def finish(self, txn_id, metrics):
+        return
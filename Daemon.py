@@ -0,0 +1,127 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import io
+import json
+import os
+import socket
+import socketserver
+import time
+import plac
+
+from RepCRec.config import config
+from RepCRec.Output import TextSink, JsonLinesSink
+from RepCRec.SiteManager import SiteManager
+from RepCRec.TransactionManager import TransactionManager
+from RepCRec.Simulator import Simulator
+
+DEFAULT_SOCKET = "repcrec.sock"
+DAEMON_OUTPUT_FORMATS = {"text": TextSink, "jsonl": JsonLinesSink}
+
+
+def run_job(request):
+    """
+    Run one job. The engine state is rebuilt for every job, which only costs the construction
+    of the managers since the interpreter and all modules are already loaded.
+
+    Parameters:
+        request: Dict with input (path of the input file) and optionally num_sites,
+            num_variables and format (text or jsonl)
+
+    Returns:
+        Dict with output, seconds and error
+    """
+    start = time.perf_counter()
+    response = {"output": "", "seconds": 0.0, "error": None}
+    try:
+        num_sites = int(request.get("num_sites", config['NUM_SITES']))
+        num_variables = int(request.get("num_variables", config['NUM_VARIABLES']))
+        buffer = io.StringIO()
+        output = DAEMON_OUTPUT_FORMATS[request.get("format", "text")](buffer)
+        site_manager = SiteManager(num_sites, num_variables, output)
+        transaction_manager = TransactionManager(num_variables, num_sites, site_manager)
+        Simulator(request["input"], site_manager, transaction_manager).run()
+        output.flush()
+        response["output"] = buffer.getvalue()
+    except Exception as error:
+        response["error"] = repr(error)
+    response["seconds"] = time.perf_counter() - start
+    return response
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """
+    Serves the jobs of one connection. Requests and responses are JSON objects, one per line
+    """
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = run_job(json.loads(line))
+            except ValueError as error:
+                response = {"output": "", "seconds": 0.0, "error": repr(error)}
+            self.wfile.write(json.dumps(response).encode('UTF-8') + b"\n")
+            self.wfile.flush()
+
+
+def serve(socket_path=DEFAULT_SOCKET):
+    """
+    Serve jobs on a Unix domain socket until interrupted
+
+    Parameters:
+        socket_path: Path of the socket
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with socketserver.UnixStreamServer(socket_path, JobHandler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+class DaemonClient:
+    """
+    Client submitting jobs to a running daemon over one connection
+
+    Parameters:
+        socket_path: Path of the socket of the daemon
+    """
+    def __init__(self, socket_path=DEFAULT_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.rfile = self.sock.makefile('rb')
+
+    def submit(self, input_path, num_sites=config['NUM_SITES'], num_variables=config['NUM_VARIABLES'], output_format="text"):
+        """
+        Run a job and wait for its result
+
+        Returns:
+            Dict with output, seconds and error
+        """
+        request = {"input": os.path.abspath(input_path), "num_sites": num_sites,
+                   "num_variables": num_variables, "format": output_format}
+        self.sock.sendall(json.dumps(request).encode('UTF-8') + b"\n")
+        return json.loads(self.rfile.readline())
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+@plac.annotations(
+    socket_path=("Path of the Unix domain socket", "option", "s", str))
+def main(socket_path=DEFAULT_SOCKET):
+    """
+    Run the daemon
+    """
+    serve(socket_path)
+
+
+if __name__ == "__main__":
+    plac.call(main)
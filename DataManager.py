@@ -4,8 +4,9 @@ Authors:
 2) Sahil Bakshi (sb8916)
 """
 import logging
-from collections import defaultdict
 from RepCRec.Variable import Variable
+from RepCRec.Output import LoggingSink
+from RepCRec.config import config
 
 log = logging.getLogger(__name__)
 
@@ -15,34 +16,24 @@ class DataManager:
 
     Parameters:
         site_id: site_id of the site on which current data manager is
+        output: OutputSink for the output events, LoggingSink if not passed
+        num_variables: Number of total variables present
 
     Attributes:
         committed_variables ( Dict ) : KEY is variable index and VALUE is the Variable Object
-        local_copies_per_txn ( Dict ) : Stores for each txn, another Dict with KEY as variable index and VALUE as written value
+        dirty_variables ( Set ) : Variable indices committed since they were last dumped. Initially all variables
     """
-    def __init__(self, site_id):
-        def get_default_dict():
-            return defaultdict(lambda: 0)
-
+    def __init__(self, site_id, output=None, num_variables=config['NUM_VARIABLES']):
         self.site_id = site_id
+        self.output = output if output is not None else LoggingSink()
         self.committed_variables = {}
-        self.local_copies_per_txn = defaultdict(get_default_dict)
 
-        for i in range(1, 21):
+        for i in range(1, num_variables + 1):
             if i % 2 == 0 or (1 + i % 10) == site_id:
                 variable = Variable(i, 'x' + str(i), 10 * i, self.site_id)
                 self.committed_variables[i] = variable
 
-    def update_local_copy(self, transaction_id, variable_id, value):
-        """
-        Update the value written by the transaction to its local copy.
-
-        Paramters:
-            transaction_id : ID of transaction
-            variable_id : ID of Variable
-            value : New Value
-        """
-        self.local_copies_per_txn[transaction_id][variable_id] = value
+        self.dirty_variables = set(self.committed_variables.keys())
 
     def get_committed_variables(self):
         """
@@ -68,7 +59,7 @@ class DataManager:
         """
         return self.committed_variables[variable_id].most_recent_snapshot_time()
 
-    def commit_txn(self, transaction_id, timestamp):
+    def commit_txn(self, transaction_id, timestamp, writes):
         """
         Commit a transaction if it is valid (did not abort earlier due to error conditions)
         And it has no conflicts in the serialization graph.
@@ -76,18 +67,70 @@ class DataManager:
         Paramters:
             transaction_id : ID of transaction
             timestamp : timestamp when the transaction has to be committed
+            writes : Dict with KEY as variable index and VALUE as the value the transaction wrote to this site
         """
-        # get the dict of variables for that txn
-        local_copies = self.local_copies_per_txn[transaction_id]
-
-        for variable_index in local_copies.keys():
+        for variable_index, value in writes.items():
             curr_varr = self.committed_variables[variable_index]
-            curr_varr.set_value(local_copies[variable_index])
-            curr_varr.update_snapshot(timestamp, local_copies[variable_index])
+            curr_varr.set_value(value)
+            curr_varr.update_snapshot(timestamp, value)
+
+        self.dirty_variables.update(writes.keys())
+
+    def commit_batch(self, commits):
+        """
+        Commit the writes of several transactions in commit order
+
+        Paramters:
+            commits : List of (transaction_id, timestamp, writes) in commit order, see commit_txn
+        """
+        dirty = set()
+        for transaction_id, timestamp, writes in commits:
+            for variable_index, value in writes.items():
+                curr_varr = self.committed_variables[variable_index]
+                curr_varr.set_value(value)
+                curr_varr.update_snapshot(timestamp, value)
+            dirty.update(writes.keys())
+        self.dirty_variables.update(dirty)
+
+    def add_variable(self, variable):
+        """
+        Store a copy of a variable moved to this site with its snapshot history
+
+        Paramters:
+            variable : Variable object
+        """
+        self.committed_variables[variable.index] = variable
+        self.dirty_variables.add(variable.index)
+
+    def remove_variable(self, variable_id):
+        """
+        Remove the copy of a variable which was moved away from this site
 
-        self.local_copies_per_txn[transaction_id] = {}
+        Paramters:
+            variable_id : ID of Variable
+        """
+        del self.committed_variables[variable_id]
+        self.dirty_variables.discard(variable_id)
 
-    def find_most_recent_snapshot(self, timestamp, variable_id, txn_id):
+    def pop_dirty_variables(self, variables=None):
+        """
+        Returns the variables committed since they were last popped and marks them clean
+
+        Paramters:
+            variables : If passed, only these variable indices are considered
+
+        Returns:
+            Sorted list of variable indices
+        """
+        if variables is None:
+            dirty = self.dirty_variables
+            self.dirty_variables = set()
+        else:
+            dirty = self.dirty_variables.intersection(variables)
+            self.dirty_variables.difference_update(dirty)
+        return sorted(dirty)
+
+    def find_most_recent_snapshot(self, timestamp, variable_id, txn_id, write_buffer=None):
         """
         Get the most recent snapshot of a variable that was committed before a transaction T begins
 
@@ -95,19 +138,35 @@ class DataManager:
             txn_id : ID of transaction
             variable_id : ID of Variable
             timestamp : start time of Transaction T
+            write_buffer : Write buffer of T (see Transaction.get_write_buffer)
 
         Returns:
             The value that was committed before the Transaction T began
         """
         # Check if T first updated the value on this site. If yes, then that should be returned
-        if variable_id in self.local_copies_per_txn[txn_id].keys() :
+        entry = write_buffer.get(variable_id) if write_buffer else None
+        if entry is not None and self.site_id in entry[1]:
             # T updated the varaible on this site. It should read the updated value
-            log.info("Returning local copy value as T%s can see its own changes", str(txn_id))
-            return self.local_copies_per_txn[txn_id][variable_id]
+            self.output.emit("info", "Returning local copy value as T%s can see its own changes", str(txn_id))
+            return entry[2].get(self.site_id, entry[0]) if entry[2] else entry[0]
 
         # T did not update this variable, so it should read the commited value before T began
         return self.committed_variables[variable_id].find_snapshot_before_time(timestamp)
 
+    def scan(self, timestamp, variable_ids):
+        """
+        Get the values of several variables committed before a transaction T begins, without the writes of T
+
+        Paramters:
+            timestamp : start time of Transaction T
+            variable_ids : IDs of Variables stored on this site, in id order
+
+        Returns:
+            List of the values in the order of variable_ids
+        """
+        committed_variables = self.committed_variables
+        return [committed_variables[variable_id].find_snapshot_before_time(timestamp) for variable_id in variable_ids]
+
     def get_committed_variable_before_time(self, timestamp, variable_id):
         """
         Get the time of the most recent snapshot of a variable that was committed before a transaction T begins
@@ -121,12 +180,6 @@ class DataManager:
         """
         return self.committed_variables[variable_id].find_time_of_snapshot_before(timestamp)
 
-    def get_local_variables(self, transaction_id):
-        """
-        Returns the local copies of variables that were written by some Transactions.
-        """
-        return self.local_copies_per_txn[transaction_id]
-
     def check_commit_btw_time_range(self, timestamp1, timestamp2, variable_id):
         """
         Check if a commit happened between the timestamp1 and timestamp2 on variable_id
@@ -140,11 +193,20 @@ class DataManager:
             True : if Commit happened
             False : Otherwise
         """
+        return self.committed_variables[variable_id].committed_between(timestamp1, timestamp2)
 
-        variable_snapshots = self.committed_variables[variable_id].get_snapshots_list()
+    def read_as_of(self, timestamp, variable_id):
+        """
+        Get the value of a variable committed at or before timestamp on this site
 
-        for time, committed_val in variable_snapshots :
-            if time > timestamp1 and time < timestamp2 :
-                return True
+        Paramters:
+            timestamp : Any past time
+            variable_id : ID of Variable
 
-        return False
+        Returns:
+            The committed value, None if the variable is not stored on this site
+        """
+        variable = self.committed_variables.get(variable_id)
+        if variable is None:
+            return None
+        return variable.find_snapshot_as_of(timestamp)
@@ -0,0 +1,149 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import json
+import struct
+
+BINARY_MAGIC = b"RCRD"
+BINARY_VERSION = 1
+# Header: magic, version
+BINARY_HEADER = struct.Struct("<4sH")
+# Every dump: time, number of records
+BINARY_DUMP_HEADER = struct.Struct("<qI")
+# Every record: site_id, variable_id, value
+BINARY_RECORD = struct.Struct("<IIq")
+
+
+class DumpWriter:
+    """
+    Base class for writers saving dump() snapshots to a file instead of printing them.
+    Every dump() is appended to the same file.
+
+    Parameters:
+        file_path: Path of the snapshot file
+    """
+    mode = 'w'
+
+    def __init__(self, file_path):
+        if 'b' in self.mode:
+            self.file = open(file_path, self.mode)
+        else:
+            self.file = open(file_path, self.mode, encoding='UTF-8', newline='')
+        self.write_header()
+
+    def write_header(self):
+        """
+        Write anything which comes once at the start of the file
+        """
+        return
+
+    def write(self, timestamp, dump_result):
+        """
+        Append a snapshot
+
+        Parameters:
+            timestamp: Time of the dump
+            dump_result: DumpResult to be written
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close the snapshot file
+        """
+        self.file.close()
+
+
+class JsonDumpWriter(DumpWriter):
+    """
+    One JSON object per dump and line: {"time": t, "sites": {site_id: {variable_id: value}}}
+    """
+    def write(self, timestamp, dump_result):
+        self.file.write(json.dumps({"time": timestamp, "sites": dump_result.sites}, separators=(',', ':')) + "\n")
+
+
+class CsvDumpWriter(DumpWriter):
+    """
+    One row per site and variable: time,site,variable,value
+    """
+    def write_header(self):
+        self.file.write("time,site,variable,value\n")
+
+    def write(self, timestamp, dump_result):
+        prefix = str(timestamp) + ","
+        rows = []
+        for site_id, variables in dump_result.sites.items():
+            site_prefix = prefix + str(site_id) + ","
+            rows.extend([site_prefix + str(key) + "," + str(value) + "\n" for key, value in variables.items()])
+        self.file.write("".join(rows))
+
+
+class BinaryDumpWriter(DumpWriter):
+    """
+    Little endian binary snapshots. The file starts with BINARY_HEADER, every dump is a
+    BINARY_DUMP_HEADER followed by one BINARY_RECORD per site and variable.
+    """
+    mode = 'wb'
+
+    def write_header(self):
+        self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION))
+
+    def write(self, timestamp, dump_result):
+        records = [BINARY_RECORD.pack(site_id, key, value)
+                   for site_id, variables in dump_result.sites.items() for key, value in variables.items()]
+        self.file.write(BINARY_DUMP_HEADER.pack(timestamp, len(records)) + b"".join(records))
+
+
+def read_binary_dumps(file_path):
+    """
+    Read back a file written by BinaryDumpWriter
+
+    Parameters:
+        file_path: Path of the snapshot file
+
+    Returns:
+        List of (time, sites) tuples, sites being dict of site_id -> dict of variable_id -> value
+    """
+    with open(file_path, 'rb') as dump_file:
+        data = dump_file.read()
+
+    magic, version = BINARY_HEADER.unpack_from(data, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not a RepCRec binary dump file (version " + str(BINARY_VERSION) + ")")
+
+    dumps = []
+    offset = BINARY_HEADER.size
+    while offset < len(data):
+        timestamp, count = BINARY_DUMP_HEADER.unpack_from(data, offset)
+        offset += BINARY_DUMP_HEADER.size
+        sites = {}
+        for site_id, key, value in BINARY_RECORD.iter_unpack(data[offset:offset + count * BINARY_RECORD.size]):
+            sites.setdefault(site_id, {})[key] = value
+        offset += count * BINARY_RECORD.size
+        dumps.append((timestamp, sites))
+    return dumps
+
+
+DUMP_FORMATS = {
+    "json": JsonDumpWriter,
+    "csv": CsvDumpWriter,
+    "binary": BinaryDumpWriter,
+}
+
+
+def create_dump_writer(dump_format, file_path):
+    """
+    Create a writer for one of DUMP_FORMATS
+
+    Parameters:
+        dump_format: json, csv or binary
+        file_path: Path of the snapshot file
+
+    Returns:
+        DumpWriter
+    """
+    if dump_format not in DUMP_FORMATS:
+        raise ValueError("Unknown dump format " + str(dump_format))
+    return DUMP_FORMATS[dump_format](file_path)
@@ -0,0 +1,306 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+from RepCRec.config import config
+from RepCRec.SiteManager import SiteManager
+from RepCRec.TransactionManager import TransactionManager
+
+
+class Engine:
+    """
+    Library API for embedding RepCRec. Every method advances the global time by one tick,
+    exactly like one instruction of the input file, and returns a structured result object
+    instead of requiring callers to read the log output.
+
+    Output events go to the output sink. The default LoggingSink formats nothing unless logging is
+    configured for INFO level; pass NullSink() to drop the output altogether.
+
+    With a RetryScheduler, end() of a transaction waiting on a read returns a WAITING EndResult and the
+    deferred end is retried after the following operations, as Simulator does after every instruction.
+    take_deferred_ends() returns the EndResult of its commit or TIMEOUT abort.
+
+    Parameters:
+        num_sites: Number of sites
+        num_variables: Number of variables
+        output: OutputSink for the output events, LoggingSink if not passed
+        metrics: Metrics collecting instrumentation, NullMetrics if not passed
+        tracer: Tracer recording transaction lifecycles, NullTracer if not passed
+        analytics: ConflictAnalytics aggregating conflict hotspots, NullAnalytics if not passed
+        scheduler: RetryScheduler deferring ends of waiting transactions, NullScheduler if not passed
+        validation: Serializability validation engine, graph or pivot
+        replication: LazyReplication to commit primary copies only and propagate replicas later, EagerReplication if not passed
+        placement: AdaptivePlacement to move the copies of hot variables, StaticPlacement if not passed
+        cost: CostModel simulating the latency of site accesses, NullCostModel if not passed
+
+    Attributes:
+        site_manager : Instance of Site Manager
+        transaction_manager : Instance of Transaction Manager
+        current_time (int) : The global time at this point
+        deferred_ends ( List ) : EndResult of the deferred ends which committed or aborted since the last take_deferred_ends
+    """
+    def __init__(self, num_sites=config['NUM_SITES'], num_variables=config['NUM_VARIABLES'], output=None, metrics=None, tracer=None, analytics=None, scheduler=None, validation="graph", replication=None, placement=None, cost=None):
+        self.site_manager = SiteManager(num_sites, num_variables, output, metrics=metrics, tracer=tracer, replication=replication, placement=placement, cost=cost)
+        self.transaction_manager = TransactionManager(num_variables, num_sites, self.site_manager, analytics=analytics, scheduler=scheduler, validation=validation)
+        # Simulator starts its clock at 1 before the first instruction
+        self.current_time = 1
+        self.deferred_ends = []
+
+    def _tick(self, ticks=1):
+        """
+        Increment global time and propagate it to the managers
+        """
+        self.current_time += ticks
+        self.transaction_manager.current_time = self.current_time
+        self.site_manager.current_time = self.current_time
+
+    def _after(self):
+        """
+        What Simulator does after every instruction, in the same order: retry the deferred ends, which time out
+        as the clock advances, then move data in the background (lazy replication, adaptive placement, site rebalancing)
+
+        Returns:
+            List of EndResult of the deferred ends which committed or aborted at this tick
+        """
+        ends = self.transaction_manager.retry_deferred()
+        self.deferred_ends.extend(ends)
+        self.site_manager.replication.propagate(self.site_manager, self.current_time)
+        self.transaction_manager.rebalance_placement()
+        self.transaction_manager.rebalance_sites()
+        return ends
+
+    def _step(self, operation, *args):
+        """
+        Execute one operation at the next tick of the global time
+
+        Returns:
+            Result of the operation
+        """
+        self._tick()
+        result = operation(*args)
+        self._after()
+        return result
+
+    def take_deferred_ends(self):
+        """
+        Outcome of the deferred ends: end() of a transaction waiting on a read returns a WAITING EndResult,
+        its commit or TIMEOUT abort happens at a later tick
+
+        Returns:
+            List of EndResult of the deferred ends which committed or aborted since the last call, in end order
+        """
+        ends = self.deferred_ends
+        self.deferred_ends = []
+        return ends
+
+    def begin(self, txn_name):
+        """
+        Begin a transaction
+
+        Parameters:
+            txn_name: Name of the transaction (T1, T2, etc)
+
+        Returns:
+            BeginResult
+        """
+        return self._step(self.transaction_manager.begin, [txn_name])
+
+    def read(self, txn_name, var_name):
+        """
+        Read a variable in a transaction
+
+        Parameters:
+            txn_name: Name of the transaction (T1, T2, etc)
+            var_name: Name of the variable (x1, x2, etc)
+
+        Returns:
+            ReadResult
+        """
+        return self._step(self.transaction_manager.read_req, [txn_name, var_name])
+
+    def write(self, txn_name, var_name, value):
+        """
+        Write a variable in a transaction
+
+        Parameters:
+            txn_name: Name of the transaction (T1, T2, etc)
+            var_name: Name of the variable (x1, x2, etc)
+            value: New value
+
+        Returns:
+            WriteResult
+        """
+        return self._step(self.transaction_manager.write_req, [txn_name, var_name, value])
+
+    def read_many(self, txn_name, var_names):
+        """
+        Read several variables in a transaction at one tick, like R(T1, x1, x2, x7)
+
+        Parameters:
+            txn_name: Name of the transaction (T1, T2, etc)
+            var_names: Names of the variables in read order
+
+        Returns:
+            List of ReadResult
+        """
+        return self._step(self.transaction_manager.read_batch, [txn_name] + list(var_names))
+
+    def scan(self, txn_name, first_var, last_var):
+        """
+        Read every variable from first_var to last_var in a transaction at one tick, like S(T1, x1, x100)
+
+        Parameters:
+            txn_name: Name of the transaction (T1, T2, etc)
+            first_var: Name of the first variable
+            last_var: Name of the last variable
+
+        Returns:
+            List of ReadResult in variable order
+        """
+        return self._step(self.transaction_manager.scan, [txn_name, first_var, last_var])
+
+    def write_many(self, txn_name, values):
+        """
+        Write several variables in a transaction at one tick, like W(T1, x2=5, x4=9)
+
+        Parameters:
+            txn_name: Name of the transaction (T1, T2, etc)
+            values: List of (variable name, new value) in write order
+
+        Returns:
+            List of WriteResult
+        """
+        return self._step(self.transaction_manager.write_batch, [txn_name] + ["%s=%s" % (var_name, value) for var_name, value in values])
+
+    def end(self, txn_name):
+        """
+        End a transaction, committing or aborting it
+
+        Parameters:
+            txn_name: Name of the transaction (T1, T2, etc)
+
+        Returns:
+            EndResult
+        """
+        return self._step(self.transaction_manager.end_txn, [txn_name])
+
+    def end_group(self, txn_names):
+        """
+        End several transactions at consecutive ticks as one group commit. The results are the
+        same as calling end() for each of them
+
+        Parameters:
+            txn_names: Names of the transactions in end order
+
+        Returns:
+            List of EndResult
+        """
+        start_time = self.current_time + 1
+        self._tick(len(txn_names))
+        results = self.transaction_manager.end_group(txn_names, start_time)
+        self._after()
+        return results
+
+    def fail(self, site_id):
+        """
+        Fail a site
+
+        Parameters:
+            site_id: ID of the site
+
+        Returns:
+            SiteResult
+        """
+        return self._step(self.site_manager.fail_site, int(site_id))
+
+    def fail_sites(self, site_ids):
+        """
+        Fail several sites at the same time
+
+        Parameters:
+            site_ids: IDs of the sites
+
+        Returns:
+            List of SiteResult
+        """
+        return self._step(self.site_manager.fail_sites, [int(site_id) for site_id in site_ids])
+
+    def recover(self, site_id):
+        """
+        Recover a site
+
+        Parameters:
+            site_id: ID of the site
+
+        Returns:
+            SiteResult containing the pending reads served on recovery, and in ends the EndResult of the deferred
+            ends retried after it, which are also returned by take_deferred_ends
+        """
+        self._tick()
+        result = self.site_manager.recover_site(int(site_id))
+        result.ends = self._after()
+        return result
+
+    def add_site(self):
+        """
+        Add an empty site, variables are moved to it in chunks at the following ticks
+
+        Returns:
+            SiteResult of the new site
+        """
+        return self._step(self.site_manager.add_site)
+
+    def decommission_site(self, site_id):
+        """
+        Decommission a site, its variables are moved to the other sites in chunks at the following ticks
+
+        Parameters:
+            site_id: ID of the site
+
+        Returns:
+            SiteResult of the site
+        """
+        return self._step(self.site_manager.decommission_site, int(site_id))
+
+    def dump(self, site_ids=None, variable_ids=None, changed_only=False):
+        """
+        Committed values of the sites. Nothing is printed.
+
+        Parameters:
+            site_ids: List of site ids to dump, all sites if None
+            variable_ids: List of variable ids to dump, all variables if None
+            changed_only: If True, only variables committed since the previous dump are returned
+
+        Returns:
+            DumpResult
+        """
+        return self._step(self.site_manager.get_dump, site_ids, variable_ids, changed_only)
+
+    def read_as_of(self, var_name, timestamp, site_id=None):
+        """
+        Read the value of a variable committed at or before a past time, outside of any transaction
+
+        Parameters:
+            var_name: Name of the variable (x1, x2, etc)
+            timestamp: Any past time
+            site_id: Site to read from. If None, the copy with the latest commit at or before timestamp
+
+        Returns:
+            AsOfReadResult
+        """
+        return self._step(self.site_manager.read_as_of, var_name, timestamp, site_id)
+
+    def dump_as_of(self, timestamp, site_ids=None, variable_ids=None):
+        """
+        Values of the sites committed at or before a past time. Nothing is printed.
+
+        Parameters:
+            timestamp: Any past time
+            site_ids: List of site ids to dump, all sites if None
+            variable_ids: List of variable ids to dump, all variables if None
+
+        Returns:
+            DumpResult
+        """
+        return self._step(self.site_manager.get_dump_as_of, timestamp, site_ids, variable_ids)
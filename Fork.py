@@ -0,0 +1,180 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import multiprocessing
+import os
+import time
+import plac
+
+from RepCRec.config import config
+from RepCRec.Checkpoint import dumps_state, loads_state, load_checkpoint
+from RepCRec.Output import NullSink, TextSink
+from RepCRec.SiteManager import SiteManager
+from RepCRec.TransactionManager import TransactionManager
+from RepCRec.Simulator import Simulator
+
+
+def clone_state(obj, output=None):
+    """
+    In process copy of a Simulator or an Engine, sharing nothing with the original.
+    Used where fork() is not available
+
+    Parameters:
+        obj: Simulator or Engine
+        output: OutputSink of the copy, NullSink if not passed
+
+    Returns:
+        Independent copy of obj
+    """
+    return loads_state(dumps_state(obj), output if output is not None else NullSink())
+
+
+def outcome(transaction_manager):
+    """
+    Returns:
+        Dict with KEY as txn name and VALUE as name of its TransactionStatus
+    """
+    return {txn.name: txn.get_status().name for txn in transaction_manager.transaction_map.values()}
+
+
+def _run_branch(conn, simulator, branch, out_file, forked_at):
+    """
+    Body of a forked child. The child starts with a copy-on-write view of the parent's
+    memory, so the state of the common prefix is shared until the branch writes to it.
+    """
+    started = time.monotonic()
+    result = {"branch": branch, "fork_seconds": started - forked_at, "seconds": 0.0, "statuses": {}, "error": None}
+    output = TextSink(open(out_file, 'w', encoding='UTF-8')) if out_file else NullSink()
+    try:
+        simulator.site_manager.set_output(output)
+        simulator.transaction_manager.output = output
+        if branch is not None:
+            simulator.set_input(branch)
+            simulator.run()
+        result["statuses"] = outcome(simulator.transaction_manager)
+    except Exception as error:
+        result["error"] = repr(error)
+    finally:
+        output.close()
+    result["seconds"] = time.monotonic() - started
+    conn.send(result)
+    conn.close()
+
+
+def run_branches(simulator, branches, out_dir=None, workers=None):
+    """
+    Continue the state of simulator with every branch input in a forked child process.
+    Branches run in parallel and do not affect simulator or each other.
+
+    Parameters:
+        simulator: Simulator which executed the common prefix
+        branches: List of input files, each continuing the prefix with its own fail/recover schedule.
+            None runs no instruction, which measures the bare cost of a fork
+        out_dir: If present, the output of every branch is written to out_dir/<branch name>.out
+        workers: Number of branches running at the same time, number of CPUs if None
+
+    Returns:
+        List of dicts with branch, statuses, fork_seconds, seconds and error, in the order of branches
+    """
+    context = multiprocessing.get_context("fork")
+    workers = workers or os.cpu_count()
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    # Buffered output of the prefix must not be written again by every child
+    simulator.site_manager.output.flush()
+
+    results = [None] * len(branches)
+    running = []
+    for index, branch in enumerate(branches):
+        if len(running) == workers:
+            done_index, process, conn = running.pop(0)
+            results[done_index] = conn.recv()
+            process.join()
+        out_file = os.path.join(out_dir, os.path.basename(str(branch)) + ".out") if out_dir and branch is not None else None
+        parent_conn, child_conn = context.Pipe(duplex=False)
+        process = context.Process(target=_run_branch, args=(child_conn, simulator, branch, out_file, time.monotonic()))
+        process.start()
+        child_conn.close()
+        running.append((index, process, parent_conn))
+    for done_index, process, conn in running:
+        results[done_index] = conn.recv()
+        process.join()
+    return results
+
+
+def compare_outcomes(results):
+    """
+    Transactions whose outcome depends on the branch
+
+    Parameters:
+        results: List returned by run_branches
+
+    Returns:
+        Dict with KEY as txn name and VALUE as list of statuses, one per branch
+    """
+    txn_names = set()
+    for result in results:
+        txn_names.update(result["statuses"].keys())
+    differences = {}
+    for txn_name in sorted(txn_names, key=lambda name: (len(name), name)):
+        statuses = [result["statuses"].get(txn_name, "-") for result in results]
+        if len(set(statuses)) > 1:
+            differences[txn_name] = statuses
+    return differences
+
+
+def format_comparison(results):
+    """
+    Table of commits and aborts per branch followed by the transactions whose outcome differs
+
+    Parameters:
+        results: List returned by run_branches
+
+    Returns:
+        Comparison as a string
+    """
+    names = [os.path.basename(str(result["branch"])) for result in results]
+    width = max([len(name) for name in names] + [6])
+    lines = ["%-*s %8s %8s %10s %10s" % (width, "branch", "commits", "aborts", "fork (s)", "run (s)")]
+    for name, result in zip(names, results):
+        statuses = list(result["statuses"].values())
+        line = "%-*s %8d %8d %10.4f %10.4f" % (width, name, statuses.count("COMMITTED"), statuses.count("ABORTED"),
+                                              result["fork_seconds"], result["seconds"])
+        if result["error"]:
+            line += "  ERROR " + result["error"]
+        lines.append(line)
+    differences = compare_outcomes(results)
+    lines.append("")
+    lines.append("Transactions with different outcomes : " + (str(len(differences)) if differences else "none"))
+    for txn_name, statuses in differences.items():
+        lines.append("%s : %s" % (txn_name, ", ".join(name + "=" + status for name, status in zip(names, statuses))))
+    return "\n".join(lines)
+
+
+@plac.annotations(
+    prefix=("Input file with the common prefix", "positional", None, str),
+    branches=("Input files continuing the prefix", "positional", None, str),
+    resume=("Start from this checkpoint instead of running prefix", "flag", "r"),
+    num_sites=("Number of Sites", "option", "n", int),
+    num_variables=("Number of variables", "option", "v", int),
+    out_dir=("Directory for the output of every branch", "option", "o", str),
+    workers=("Number of branches running at the same time, number of CPUs by default", "option", "w", int))
+def main(prefix, resume=False, num_sites=config['NUM_SITES'], num_variables=config['NUM_VARIABLES'],
+         out_dir=None, workers=None, *branches):
+    """
+    Run the common prefix once, fork the state for every branch and compare their outcomes
+    """
+    if resume:
+        simulator = load_checkpoint(prefix, NullSink())
+    else:
+        site_manager = SiteManager(num_sites, num_variables, NullSink())
+        transaction_manager = TransactionManager(num_variables, num_sites, site_manager)
+        simulator = Simulator(prefix, site_manager, transaction_manager)
+        simulator.run()
+    print(format_comparison(run_branches(simulator, list(branches), out_dir, workers)))
+
+
+if __name__ == "__main__":
+    plac.call(main)
@@ -21,7 +21,7 @@ class Instruction:
 
         self.params = re.search(self.PARAM_MATCHER, instruction).group()
         self.params = self.params.strip('()')
-        self.params = map(lambda x: x.strip(), self.params.split(','))
+        self.params = [param.strip() for param in self.params.split(',')]
 
     def get_params(self):
         """
@@ -0,0 +1,274 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import bisect
+import contextlib
+import json
+import time
+
+METRIC_PREFIX = "repcrec_"
+
+LATENCY_BUCKETS = [1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0]
+DEPTH_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+LAG_BUCKETS = [0, 1, 2, 4, 8, 16, 32, 64, 128, 256]
+SIMULATED_MS_BUCKETS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+# KEY is metric name and VALUE is (type, help, buckets)
+METRIC_DEFINITIONS = {
+    "instruction_latency_seconds": ("histogram", "Latency of instructions by type", LATENCY_BUCKETS),
+    "phase_seconds": ("histogram", "Time spent in phases of read and end, and in lazy replication propagation, adaptive placement and site rebalancing", LATENCY_BUCKETS),
+    "process_instr_seconds": ("histogram", "Time spent in process_instr of the managers", LATENCY_BUCKETS),
+    "wait_queue_depth": ("histogram", "Depth of the wait queue of a site when a read is added to it", DEPTH_BUCKETS),
+    "replication_lag_ticks": ("histogram", "Ticks between the commit of a replica write and its propagation (lazy replication)", LAG_BUCKETS),
+    "txn_simulated_latency_ms": ("histogram", "Simulated latency of finished transactions in ms (cost model)", SIMULATED_MS_BUCKETS),
+    "aborts_total": ("counter", "Aborted transactions by reason", None),
+    "deferred_ends_total": ("counter", "Ends of waiting transactions deferred, retried and timed out", None),
+    "rebalanced_copies_total": ("counter", "Copies of variables placed by the site rebalancer", None),
+    "rebalanced_snapshots_total": ("counter", "Snapshots copied by the site rebalancer", None),
+}
+
+METRICS_FORMATS = ["json", "prometheus"]
+
+
+class Histogram:
+    """
+    Histogram with fixed upper bounds
+
+    Parameters:
+        buckets: Sorted list of upper bounds
+
+    Attributes:
+        counts : Number of observations per bucket, the last one counts values above all bounds
+        sum : Sum of all observations
+        count : Number of observations
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Record an observation
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """
+        Returns:
+            List of (upper bound, number of observations <= upper bound), ending with +Inf
+        """
+        result = []
+        total = 0
+        for bound, bucket_count in zip(self.buckets + [float('inf')], self.counts):
+            total += bucket_count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        """
+        Returns:
+            Dict representation of the histogram
+        """
+        return {
+            "buckets": {("+Inf" if bound == float('inf') else repr(bound)): total for bound, total in self.cumulative_counts()},
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class ScopedTimer:
+    """
+    Context manager recording the time spent in its block in a histogram
+
+    Parameters:
+        metrics: Metrics to record to
+        name: Metric name from METRIC_DEFINITIONS
+        labels: Labels of the metric
+    """
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+NULL_TIMER = contextlib.nullcontext()
+
+
+class Metrics:
+    """
+    Collects instrumentation of the engine: latency histograms of instructions and phases,
+    abort counts by reason and wait queue depths. Metrics are keyed by name and labels.
+
+    Attributes:
+        enabled (bool) : True, NullMetrics is used when metrics are disabled
+        histograms ( Dict ) : KEY is (name, labels) and VALUE is Histogram
+        counters ( Dict ) : KEY is (name, labels) and VALUE is the count
+    """
+    enabled = True
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+
+    def clock(self):
+        """
+        Returns:
+            Current time to be passed to observe_time
+        """
+        return time.perf_counter()
+
+    def observe(self, name, value, **labels):
+        """
+        Record an observation in a histogram
+
+        Parameters:
+            name : Metric name from METRIC_DEFINITIONS
+            value : Observed value
+            labels : Labels of the metric
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(METRIC_DEFINITIONS[name][2])
+        histogram.observe(value)
+
+    def observe_time(self, name, start, **labels):
+        """
+        Record the time elapsed since start in a histogram
+
+        Parameters:
+            name : Metric name from METRIC_DEFINITIONS
+            start : Value returned by clock()
+            labels : Labels of the metric
+        """
+        self.observe(name, time.perf_counter() - start, **labels)
+
+    def timer(self, name, **labels):
+        """
+        Scoped timer recording the time spent in a with block
+
+        Parameters:
+            name : Metric name from METRIC_DEFINITIONS
+            labels : Labels of the metric
+
+        Returns:
+            ScopedTimer
+        """
+        return ScopedTimer(self, name, labels)
+
+    def inc(self, name, amount=1, **labels):
+        """
+        Increment a counter
+
+        Parameters:
+            name : Metric name from METRIC_DEFINITIONS
+            amount : Increment
+            labels : Labels of the metric
+        """
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def to_dict(self):
+        """
+        Returns:
+            Dict with KEY as metric name and VALUE as list of {"labels": ..., ...} entries
+        """
+        result = {}
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            entry = {"labels": dict(labels)}
+            entry.update(histogram.to_dict())
+            result.setdefault(name, []).append(entry)
+        for (name, labels), value in sorted(self.counters.items()):
+            result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return result
+
+    def to_json(self):
+        """
+        Returns:
+            Metrics as a JSON string
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """
+        Returns:
+            Metrics in Prometheus text exposition format
+        """
+        def format_labels(labels, extra=()):
+            pairs = ['%s="%s"' % (key, value) for key, value in tuple(labels) + tuple(extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        for name, (metric_type, help_text, _) in METRIC_DEFINITIONS.items():
+            full_name = METRIC_PREFIX + name
+            if metric_type == "histogram":
+                entries = sorted((labels, histogram) for (key, labels), histogram in self.histograms.items() if key == name)
+            else:
+                entries = sorted((labels, value) for (key, labels), value in self.counters.items() if key == name)
+            if not entries:
+                continue
+            lines.append("# HELP %s %s" % (full_name, help_text))
+            lines.append("# TYPE %s %s" % (full_name, metric_type))
+            for labels, entry in entries:
+                if metric_type == "histogram":
+                    for bound, total in entry.cumulative_counts():
+                        le = "+Inf" if bound == float('inf') else repr(bound)
+                        lines.append("%s_bucket%s %d" % (full_name, format_labels(labels, [("le", le)]), total))
+                    lines.append("%s_sum%s %r" % (full_name, format_labels(labels), entry.sum))
+                    lines.append("%s_count%s %d" % (full_name, format_labels(labels), entry.count))
+                else:
+                    lines.append("%s%s %d" % (full_name, format_labels(labels), entry))
+        return "\n".join(lines) + "\n"
+
+    def export(self, file_path, metrics_format="json"):
+        """
+        Write the metrics collected so far to a file
+
+        Parameters:
+            file_path : Path of the file
+            metrics_format : json or prometheus
+        """
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError("Unknown metrics format " + str(metrics_format))
+        with open(file_path, 'w', encoding='UTF-8') as metrics_file:
+            metrics_file.write(self.to_json() if metrics_format == "json" else self.to_prometheus())
+
+
+class NullMetrics(Metrics):
+    """
+    Metrics which records nothing. Used when metrics are disabled
+    """
+    enabled = False
+
+    def clock(self):
+        return 0
+
+    def observe(self, name, value, **labels):
+        return
+
+    def observe_time(self, name, start, **labels):
+        return
+
+    def timer(self, name, **labels):
+        return NULL_TIMER
+
+    def inc(self, name, amount=1, **labels):
+        return
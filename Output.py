@@ -0,0 +1,248 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import json
+import logging
+import sys
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+def format_dump(sites):
+    """
+    Format the committed values of all sites the way dump() prints them
+
+    Parameters:
+        sites: Dict with KEY as site_id and VALUE as dict of variable_id -> committed value
+
+    Returns:
+        String containing the whole dump
+    """
+    parts = []
+    for site_id, variables in sites.items():
+        parts.append("\nSite " + str(site_id) + " - ")
+        parts.append("".join(["x" + str(key) + " : " + str(value) + ", " for key, value in variables.items()]))
+        parts.append("\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+class OutputSink:
+    """
+    Base class of the output layer. Transaction Manager and Site Manager emit events to a sink
+    with the message format, its arguments and structured fields kept separate, so that the
+    record is only built by sinks which consume it.
+
+    Attributes:
+        enabled (bool) : False if the sink discards all events. Callers can skip building expensive arguments
+    """
+    enabled = True
+
+    def emit(self, event, message, *args, **fields):
+        """
+        Emit an event
+
+        Parameters:
+            event : Name of the event (begin, read, write, commit, abort, fail, recover, info etc)
+            message : %-format string of the human readable message
+            args : Arguments of the message
+            fields : Structured fields of the event
+        """
+        raise NotImplementedError
+
+    def dump(self, dump_result):
+        """
+        Output the committed values of all sites
+
+        Parameters:
+            dump_result : DumpResult
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """
+        Write out anything buffered
+        """
+        return
+
+    def close(self):
+        """
+        Flush and release the sink
+        """
+        self.flush()
+
+
+class LoggingSink(OutputSink):
+    """
+    Sink forwarding messages to the logging module at INFO level. dump() is printed to std output.
+    This is the default sink and keeps the original output of the project.
+    """
+    @property
+    def enabled(self):
+        return log.isEnabledFor(logging.INFO)
+
+    def emit(self, event, message, *args, **fields):
+        log.info(message, *args)
+
+    def dump(self, dump_result):
+        sys.stdout.write(format_dump(dump_result.sites))
+
+
+class BufferedSink(OutputSink):
+    """
+    Base class for sinks writing lines to a stream. Lines are collected in memory and
+    written in chunks of roughly buffer_size characters.
+
+    Parameters:
+        stream : File like object to write to
+        buffer_size : Number of characters collected before they are written to the stream
+
+    Attributes:
+        buffer : List of pending strings
+        buffered_chars : Number of characters in buffer
+    """
+    def __init__(self, stream, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered_chars = 0
+
+    def write(self, text):
+        """
+        Add text to the buffer, writing out the buffer if it is full
+
+        Parameters:
+            text : String to be written
+        """
+        self.buffer.append(text)
+        self.buffered_chars += len(text)
+        if self.buffered_chars >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write("".join(self.buffer))
+            self.buffer = []
+            self.buffered_chars = 0
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+
+class TextSink(BufferedSink):
+    """
+    Buffered plain text sink. Writes one line per message and dump() in the same format as it is printed.
+    """
+    def emit(self, event, message, *args, **fields):
+        self.write((message % args if args else message) + "\n")
+
+    def dump(self, dump_result):
+        self.write(format_dump(dump_result.sites))
+
+
+class JsonLinesSink(BufferedSink):
+    """
+    Buffered JSON Lines sink. Events with structured fields are written as {"event": ..., **fields},
+    other events as {"event": ..., "message": ...}.
+    """
+    def emit(self, event, message, *args, **fields):
+        if fields:
+            record = {"event": event}
+            record.update(fields)
+        else:
+            record = {"event": event, "message": message % args if args else message}
+        self.write(json.dumps(record, default=str) + "\n")
+
+    def dump(self, dump_result):
+        self.write(json.dumps({"event": "dump", "sites": dump_result.sites}) + "\n")
+
+
+class NullSink(OutputSink):
+    """
+    Sink discarding all events
+    """
+    enabled = False
+
+    def emit(self, event, message, *args, **fields):
+        return
+
+    def dump(self, dump_result):
+        return
+
+
+class RecordingSink(OutputSink):
+    """
+    Sink keeping the events in memory to replay them to another sink later, e.g. in another process
+
+    Parameters:
+        enabled : If False, events are discarded like NullSink
+
+    Attributes:
+        events : List of (event, message, args, fields) in emit order
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.events = []
+
+    def emit(self, event, message, *args, **fields):
+        if self.enabled:
+            self.events.append((event, message, args, fields))
+
+    def dump(self, dump_result):
+        if self.enabled:
+            self.events.append(("dump", None, (dump_result,), {}))
+
+    def take(self):
+        """
+        Returns:
+            The recorded events, which are removed from the sink
+        """
+        events = self.events
+        self.events = []
+        return events
+
+
+def replay(events, sink):
+    """
+    Emit events recorded by a RecordingSink to sink
+    """
+    for event, message, args, fields in events:
+        if message is None:
+            sink.dump(*args)
+        else:
+            sink.emit(event, message, *args, **fields)
+
+
+OUTPUT_FORMATS = ["log", "text", "jsonl", "null"]
+
+
+def create_sink(output_format="log", out_file=None, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Create a sink for one of OUTPUT_FORMATS
+
+    Parameters:
+        output_format : log, text, jsonl or null
+        out_file : File path the text and jsonl sinks write to, std output if None
+        buffer_size : Buffer size of the text and jsonl sinks
+
+    Returns:
+        OutputSink
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Unknown output format " + str(output_format))
+    if output_format == "log":
+        return LoggingSink()
+    elif output_format == "null":
+        return NullSink()
+
+    stream = open(out_file, 'w', encoding='UTF-8') if out_file else sys.stdout
+    if output_format == "text":
+        return TextSink(stream, buffer_size)
+    return JsonLinesSink(stream, buffer_size)
@@ -0,0 +1,306 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import logging
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+# static : odd variables on site 1 + i % 10 and even variables everywhere, adaptive : replicas follow the access rates
+PLACEMENT_MODES = ["static", "adaptive"]
+
+
+class StaticPlacement:
+    """
+    Fixed placement of the project: xi with i odd is stored on site 1 + i % 10 only, xi with i even on every site.
+    Used when adaptive placement is disabled. Once sites are added or decommissioned, every variable is
+    pinned to its sites in replicas and the site rebalancer moves its copies, see Rebalance
+
+    Attributes:
+        replicas ( Dict ) : KEY is variable id and VALUE is the list of Site objects storing it in id order.
+                        Only variables which were placed again, the others follow the fixed placement
+        placed ( Dict ) : KEY is (variable id, site id) and VALUE is (start time of the oldest transaction the copy
+                        can serve, time the copy was placed on the site)
+    """
+    enabled = False
+
+    def __init__(self):
+        self.replicas = {}
+        self.placed = {}
+
+    def is_replicated(self, variable_id):
+        """
+        Returns:
+            True if the variable has more than one copy, its reads and writes follow the available copies rules
+        """
+        sites = self.replicas.get(variable_id)
+        return len(sites) > 1 if sites is not None else variable_id % 2 == 0
+
+    def sites_of(self, site_manager, variable_id):
+        """
+        Returns:
+            List of the Site objects storing the variable, in id order. The list may be shared and must not be modified
+        """
+        sites = self.replicas.get(variable_id)
+        if sites is not None:
+            return sites
+        if variable_id % 2 == 0:
+            return site_manager.get_all_sites()
+        return [site_manager.get_site(1 + variable_id % 10)]
+
+    def read_order(self, site_manager, variable_id):
+        """
+        Returns:
+            The sites storing the variable in the order they are tried by a read
+        """
+        return self.sites_of(site_manager, variable_id)
+
+    def placed_at(self, variable_id, site_id):
+        """
+        Returns:
+            Time when the copy of the variable was placed on the site, 0 for the copies of the initial placement.
+            Failures and recoveries of the site before it do not count for the copy
+        """
+        placed = self.placed.get((variable_id, site_id))
+        return placed[1] if placed is not None else 0
+
+    def valid_from(self, variable_id, site_id):
+        """
+        Returns:
+            Start time of the oldest transaction the copy of the variable on the site can serve
+        """
+        placed = self.placed.get((variable_id, site_id))
+        return placed[0] if placed is not None else 0
+
+    def record_read(self, variable_id):
+        return
+
+    def record_write(self, variable_id):
+        return
+
+    def rebalance(self, site_manager, writers, waiting, horizon, current_time):
+        return
+
+    def pin(self, site_manager):
+        """
+        Store the current sites of every variable in replicas, before the set of sites changes
+        """
+        for variable_id in range(1, site_manager.num_variables + 1):
+            if variable_id not in self.replicas:
+                self.replicas[variable_id] = list(self.sites_of(site_manager, variable_id))
+
+    def is_stable(self, site_manager, site, variable_id, horizon):
+        """
+        Check if every transaction which began at or after horizon can read the copy of a variable on a site:
+        the site is available and never failed, or the copy is the only one, or the variable was committed
+        on it between its last recovery and horizon, or the copy was placed after its last recovery
+
+        Parameters:
+            site_manager: Instance of Site Manager
+            site: Site object storing the variable
+            variable_id: ID of the variable
+            horizon: Start time of the oldest active transaction
+
+        Returns:
+            True if the copy can be kept as the only copy or copied to other sites
+        """
+        if not site_manager.is_site_available(site.get_id()):
+            return False
+        recover_history = site_manager.get_site_recover_history(site.get_id())
+        if len(recover_history) == 1 or not self.is_replicated(variable_id):
+            # The only copy of a variable can be read as soon as its site recovers
+            return True
+        last_recovery = recover_history[-1]
+        if self.placed_at(variable_id, site.get_id()) > last_recovery:
+            return self.valid_from(variable_id, site.get_id()) <= horizon
+        return site.get_data_manager().check_commit_btw_time_range(last_recovery, horizon, variable_id)
+
+    def copy_replicas(self, variable_id, source, sites, horizon, current_time):
+        """
+        Copy a variable with its snapshot history from a stable copy to other sites. The new copies
+        only serve transactions which began at or after horizon
+
+        Parameters:
+            variable_id: ID of the variable
+            source: Site object of the stable copy
+            sites: Site objects the variable is copied to
+            horizon: Start time of the oldest active transaction
+            current_time: The global time at this point
+        """
+        variable = source.get_data_manager().get_committed_variables()[variable_id]
+        for site in sites:
+            site.get_data_manager().add_variable(variable.copy_to(site.get_id()))
+            self.placed[(variable_id, site.get_id())] = (horizon, current_time)
+
+    def remove_replicas(self, variable_id, sites):
+        """
+        Remove the copies of a variable from sites
+        """
+        for site in sites:
+            site.get_data_manager().remove_variable(variable_id)
+            self.placed.pop((variable_id, site.get_id()), None)
+
+
+class AdaptivePlacement(StaticPlacement):
+    """
+    Placement which follows the read and write rates of the variables. Every interval ticks, a variable
+    read at least hot_threshold times (decayed counts, see decay) and at least read_ratio times as often as
+    it is written gets copies on read_replicas sites, so a hot odd variable is no longer a single site
+    bottleneck and its reads are spread over its copies. The copies of a read hot variable, or of a variable
+    placed again, on sites which failed since it was last committed are refreshed from a stable copy, as they
+    could not serve reads until the next commit of the variable otherwise. A variable written at least hot_threshold times and
+    at least as often as it is read keeps write_replicas copies, so its commits are not fanned out to every site.
+
+    A copy is moved between data managers with its snapshot history. A variable a pending read waits on is
+    not placed again. A variable written by an active transaction does not get new copies, as the buffered
+    write would miss them, but it can lose copies: the copies kept are among the sites every active writer
+    wrote it to and the buffered writes to the other copies are dropped. The copies which are kept and the source
+    of new copies are stable: every active or later transaction can read them under the available copies
+    rules, see is_stable. A new copy only serves transactions which began after the oldest transaction
+    active when it was placed, and the failures and recoveries of its site before it was placed do not count for it.
+
+    Parameters:
+        interval: Number of ticks between two rebalances
+        hot_threshold: Decayed number of reads or writes above which a variable is hot
+        read_ratio: A variable is read hot if it is read at least this many times as often as it is written
+        read_replicas: Number of copies of a read hot variable
+        write_replicas: Number of copies of a write hot variable
+        decay: Factor applied to the access counts after every rebalance
+
+    Attributes:
+        reads ( Counter ) : Decayed number of reads served per variable
+        writes ( Counter ) : Decayed number of write instructions per variable
+        replicas_added ( int ) : Number of copies placed since the start
+        replicas_refreshed ( int ) : Number of copies replaced by a copy of a stable copy since the start
+        replicas_dropped ( int ) : Number of copies removed since the start
+    """
+    enabled = True
+
+    def __init__(self, interval=50, hot_threshold=8, read_ratio=4, read_replicas=3, write_replicas=1, decay=0.5):
+        self.interval = interval
+        self.hot_threshold = hot_threshold
+        self.read_ratio = read_ratio
+        self.read_replicas = read_replicas
+        self.write_replicas = write_replicas
+        self.decay = decay
+        super().__init__()
+        self.reads = Counter()
+        self.writes = Counter()
+        self.replicas_added = 0
+        self.replicas_refreshed = 0
+        self.replicas_dropped = 0
+
+    def read_order(self, site_manager, variable_id):
+        # Successive reads start at successive copies so they are spread over all copies
+        sites = self.sites_of(site_manager, variable_id)
+        start = int(self.reads[variable_id]) % len(sites) if len(sites) > 1 else 0
+        return sites[start:] + sites[:start] if start else sites
+
+    def record_read(self, variable_id):
+        self.reads[variable_id] += 1
+
+    def record_write(self, variable_id):
+        self.writes[variable_id] += 1
+
+    def _preferred(self, site_manager, variable_id, sites):
+        """
+        Returns:
+            The sites in the order they are preferred for the variable, starting at site 1 + i % num_sites
+        """
+        first = variable_id % site_manager.num_sites
+        return sorted(sites, key=lambda site: (site.get_id() - 1 - first) % site_manager.num_sites)
+
+    def rebalance(self, site_manager, writers, waiting, horizon, current_time):
+        """
+        Place the hot variables again and decay the access counts
+
+        Parameters:
+            site_manager: Instance of Site Manager
+            writers: Dict with KEY as variable id and VALUE as the active transactions which wrote it
+            waiting: Ids of the variables a pending read waits on
+            horizon: Start time of the oldest active transaction, or a time after current_time if there is none
+            current_time: The global time at this point
+        """
+        for variable_id in sorted(set(self.reads) | set(self.writes) | set(self.replicas)):
+            if variable_id in waiting:
+                continue
+            reads, writes = self.reads[variable_id], self.writes[variable_id]
+            sites = self.sites_of(site_manager, variable_id)
+            read_hot = reads >= self.hot_threshold and reads >= self.read_ratio * writes
+            if not read_hot and writes >= self.hot_threshold and writes >= reads and len(sites) > self.write_replicas:
+                self._drop_replicas(site_manager, variable_id, sites, writers.get(variable_id, ()), horizon)
+            elif variable_id in writers:
+                continue
+            elif read_hot and len(sites) < min(self.read_replicas, len(site_manager.get_service_sites())):
+                self._add_replicas(site_manager, variable_id, sites, min(self.read_replicas, len(site_manager.get_service_sites())), horizon, current_time)
+            if variable_id not in writers and (read_hot or variable_id in self.replicas):
+                # Copies placed again are kept readable even when they cool down
+                self._refresh_replicas(site_manager, variable_id, horizon, current_time)
+
+        for counts in (self.reads, self.writes):
+            for variable_id in list(counts):
+                counts[variable_id] *= self.decay
+                if counts[variable_id] < 1:
+                    del counts[variable_id]
+
+    def _add_replicas(self, site_manager, variable_id, sites, target, horizon, current_time):
+        """
+        Copy a variable from a stable copy to available sites which do not store it, until it has target copies
+        """
+        source = next((site for site in sites if self.is_stable(site_manager, site, variable_id, horizon)), None)
+        if source is None:
+            return
+        holders = {site.get_id() for site in sites}
+        candidates = [site for site in site_manager.get_available_sites()
+                      if site.get_id() not in holders and site_manager.is_in_service(site.get_id())]
+        added = self._preferred(site_manager, variable_id, candidates)[:target - len(sites)]
+        if not added:
+            return
+        self.copy_replicas(variable_id, source, added, horizon, current_time)
+        self.replicas[variable_id] = sorted(list(sites) + added, key=lambda site: site.get_id())
+        self.replicas_added += len(added)
+        log.debug("x%s placed on sites %s", variable_id, [site.get_id() for site in added])
+
+    def _refresh_replicas(self, site_manager, variable_id, horizon, current_time):
+        """
+        Replace the copies of a replicated variable which are not stable on available sites by a copy of a stable copy
+        """
+        sites = self.sites_of(site_manager, variable_id)
+        if len(sites) < 2:
+            return
+        stale = []
+        source = None
+        for site in sites:
+            if self.is_stable(site_manager, site, variable_id, horizon):
+                source = source or site
+            elif site_manager.is_site_available(site.get_id()):
+                stale.append(site)
+        if source is None or not stale:
+            return
+        self.copy_replicas(variable_id, source, stale, horizon, current_time)
+        self.replicas_refreshed += len(stale)
+
+    def _drop_replicas(self, site_manager, variable_id, sites, writers, horizon):
+        """
+        Remove copies of a variable until it has write_replicas copies. The copies kept are stable ones
+        written by every active writer of the variable, and the writes buffered for the others are dropped
+        """
+        written = None
+        for txn_obj in writers:
+            site_ids = set(txn_obj.get_write_buffer()[variable_id][1])
+            written = site_ids if written is None else written & site_ids
+        kept = [site for site in self._preferred(site_manager, variable_id, sites)
+                if (written is None or site.get_id() in written) and self.is_stable(site_manager, site, variable_id, horizon)]
+        kept = kept[:self.write_replicas]
+        if not kept:
+            return
+        kept_ids = {site.get_id() for site in kept}
+        dropped = [site for site in sites if site.get_id() not in kept_ids]
+        self.remove_replicas(variable_id, dropped)
+        self.replicas_dropped += len(dropped)
+        for txn_obj in writers:
+            txn_obj.retain_write_sites(variable_id, kept_ids)
+        self.replicas[variable_id] = sorted(kept, key=lambda site: site.get_id())
+        log.debug("x%s kept on sites %s", variable_id, sorted(kept_ids))
@@ -0,0 +1,119 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import cProfile
+import logging
+import os
+import sys
+import threading
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+PROFILE_MODES = ["cprofile", "sample"]
+DEFAULT_PROFILE_FILES = {
+    "cprofile": "repcrec.pstats",
+    "sample": "repcrec.collapsed",
+}
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler. A background thread records the stack of the profiled thread every
+    interval seconds. Stacks are written in collapsed format ("frame;frame;frame count" per line)
+    which flamegraph.pl, speedscope and inferno read directly.
+
+    Parameters:
+        interval: Seconds between two samples
+
+    Attributes:
+        stack_counts ( Dict ) : KEY is collapsed stack and VALUE is the number of samples
+    """
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stack_counts = defaultdict(int)
+        self.thread_id = None
+        self.stop_event = threading.Event()
+        self.sampler = None
+        self.switch_interval = None
+
+    def _sample(self):
+        """
+        Sampler thread loop
+        """
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stack_counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """
+        Start sampling the calling thread
+        """
+        self.thread_id = threading.get_ident()
+        self.stop_event.clear()
+        # The sampler needs the GIL at least once per interval
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.switch_interval, self.interval))
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+        self.sampler.start()
+
+    def stop(self):
+        """
+        Stop sampling
+        """
+        self.stop_event.set()
+        self.sampler.join()
+        sys.setswitchinterval(self.switch_interval)
+
+    def write_collapsed(self, file_path):
+        """
+        Write the samples in collapsed stack format
+
+        Parameters:
+            file_path: Output file
+        """
+        with open(file_path, 'w', encoding='UTF-8') as out:
+            for stack, count in sorted(self.stack_counts.items()):
+                out.write("%s %d\n" % (stack, count))
+
+
+def run_profiled(func, mode, out_file=None):
+    """
+    Run func under a profiler and write the profile
+
+    Parameters:
+        func: Function without arguments to be profiled, e.g. Simulator.run
+        mode: cprofile (writes .pstats) or sample (writes collapsed stacks)
+        out_file: Output file, DEFAULT_PROFILE_FILES[mode] if not passed
+
+    Returns:
+        Return value of func
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError("Unknown profile mode " + str(mode))
+    out_file = out_file or DEFAULT_PROFILE_FILES[mode]
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            profiler.dump_stats(out_file)
+            log.info("cProfile stats written to %s", out_file)
+
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        return func()
+    finally:
+        profiler.stop()
+        profiler.write_collapsed(out_file)
+        log.info("Collapsed stacks written to %s", out_file)
@@ -0,0 +1,177 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class SiteRebalancer:
+    """
+    Moves the copies of the variables to a new layout when sites are added or decommissioned, while
+    transactions keep running. add_site and decommission_site of the Site Manager pin every variable to its
+    current sites and queue all variables, then step() moves a chunk of them every interval ticks. The target
+    sites of a variable, among the n sites in service in id order:
+        - a variable stored on every site in service when the rebalance started is stored on every site in service
+        - a variable with one copy is stored on site number i % n, site 1 + i % 10 for xi with the 10 initial sites
+        - other variables keep their number of copies, the decommissioned sites are replaced by sites in service
+
+    A chunk copies at most chunk_size snapshots, and at least one variable. The new copies of all variables of
+    the chunk are copied with their snapshot history first, then their sites are switched in the placement and
+    the copies which are not used anymore are removed, so a read or write goes either to the old or to the new
+    sites. The rules of adaptive placement keep the reads correct: new copies are copied from stable copies and
+    serve the transactions which began after the oldest active one, and variables a pending read waits on are not
+    moved. The buffered writes of the active writers of a variable are extended to its new copies and dropped
+    for its removed copies, and a variable is only moved if each of them keeps one of its writes. Variables
+    which can not be moved yet stay queued. A decommissioned site leaves the system once no variable is queued.
+
+    Parameters:
+        interval: Number of ticks between two chunks
+        chunk_size: Maximum number of snapshots copied by one chunk
+
+    Attributes:
+        pending ( List ) : Ids of the variables which may not be on their target sites yet, in id order
+        full ( Set ) : Ids of the variables stored on every site in service when the rebalance started
+        draining ( Set ) : Ids of the decommissioned sites which did not leave yet
+        started_at ( int ) : Time the running rebalance started, None if there is none
+        chunks ( int ) : Number of chunks moved since the start
+        copies_moved ( int ) : Number of copies of variables placed since the start
+        snapshots_moved ( int ) : Number of snapshots copied since the start
+        ticks ( int ) : Number of ticks the finished rebalances took
+    """
+
+    def __init__(self, interval=2, chunk_size=64):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.full = set()
+        self.draining = set()
+        self.started_at = None
+        self.chunks = 0
+        self.copies_moved = 0
+        self.snapshots_moved = 0
+        self.ticks = 0
+
+    def plan(self, site_manager, current_time):
+        """
+        Queue every variable. Called before the set of sites in service changes
+
+        Parameters:
+            site_manager: Instance of Site Manager
+            current_time: The global time at this point
+        """
+        service_ids = {site.get_id() for site in site_manager.get_service_sites()}
+        for variable_id in range(1, site_manager.num_variables + 1):
+            site_ids = {site.get_id() for site in site_manager.get_variable_sites(variable_id)}
+            if len(site_ids) > 1 and service_ids <= site_ids:
+                self.full.add(variable_id)
+        self.pending = list(range(1, site_manager.num_variables + 1))
+        if self.started_at is None:
+            self.started_at = current_time
+
+    def step(self, site_manager, writers, waiting, horizon, current_time):
+        """
+        Move the next chunk of variables to their target sites, and end the rebalance once every variable was moved
+
+        Parameters:
+            site_manager: Instance of Site Manager
+            writers: Dict with KEY as variable id and VALUE as the active transactions which wrote it
+            waiting: Ids of the variables a pending read waits on
+            horizon: Start time of the oldest active transaction, or a time after current_time if there is none
+            current_time: The global time at this point
+        """
+        placement = site_manager.placement
+        service = site_manager.get_service_sites()
+        chunk = []
+        queued = []
+        budget = self.chunk_size
+        for position, variable_id in enumerate(self.pending):
+            move = self._target(site_manager, variable_id, service, writers.get(variable_id, ()), waiting, horizon)
+            if move is None:
+                queued.append(variable_id)
+                continue
+            target, added, removed, source = move
+            size = len(source.get_data_manager().get_committed_variables()[variable_id].snapshots) * len(added) if added else 0
+            if chunk and size > budget:
+                queued.extend(self.pending[position:])
+                break
+            budget -= size
+            chunk.append((variable_id, target, added, removed, source, size))
+        self.pending = queued
+
+        # Copy first, then switch the sites of the whole chunk, then remove the old copies
+        for variable_id, target, added, removed, source, size in chunk:
+            if added:
+                placement.copy_replicas(variable_id, source, added, horizon, current_time)
+                # Active writers write the new copies too, a failure of their sites aborts them
+                for txn_obj in writers.get(variable_id, ()):
+                    txn_obj.add_write_sites(variable_id, [site.get_id() for site in added], current_time)
+        for variable_id, target, added, removed, source, size in chunk:
+            placement.replicas[variable_id] = target
+        for variable_id, target, added, removed, source, size in chunk:
+            if removed:
+                placement.remove_replicas(variable_id, removed)
+                target_ids = {site.get_id() for site in target}
+                for txn_obj in writers.get(variable_id, ()):
+                    txn_obj.retain_write_sites(variable_id, target_ids)
+            if added or removed:
+                self.copies_moved += len(added)
+                self.snapshots_moved += size
+                site_manager.metrics.inc("rebalanced_copies_total", len(added))
+                site_manager.metrics.inc("rebalanced_snapshots_total", size)
+                log.debug("x%s moved to sites %s", variable_id, [site.get_id() for site in target])
+        if chunk:
+            self.chunks += 1
+
+        if not self.pending:
+            for site_id in sorted(self.draining):
+                site_manager.retire_site(site_id)
+            self.ticks += current_time - self.started_at
+            site_manager.output.emit("info", "Rebalance of the sites finished after %s ticks", current_time - self.started_at)
+            self.draining.clear()
+            self.full.clear()
+            self.started_at = None
+
+    def _target(self, site_manager, variable_id, service, writers, waiting, horizon):
+        """
+        Target sites of a variable and the copies to add and remove to get there
+
+        Returns:
+            (target sites, sites to copy the variable to, sites to remove it from, stable copy to copy it from),
+            None if the variable can not be moved now
+        """
+        placement = site_manager.placement
+        sites = placement.sites_of(site_manager, variable_id)
+        if variable_id in self.full:
+            target = list(service)
+        elif len(sites) == 1:
+            target = [service[variable_id % len(service)]]
+        else:
+            kept = [site for site in sites if site_manager.is_in_service(site.get_id())]
+            kept_ids = {site.get_id() for site in kept}
+            others = [site for site in service if site.get_id() not in kept_ids]
+            target = sorted(kept + others[:len(sites) - len(kept)], key=lambda site: site.get_id())
+
+        site_ids = {site.get_id() for site in sites}
+        target_ids = {site.get_id() for site in target}
+        added = [site for site in target if site.get_id() not in site_ids]
+        removed = [site for site in sites if site.get_id() not in target_ids]
+        if not added and not removed:
+            return target, added, removed, None
+        if variable_id in waiting:
+            return None
+        source = None
+        if added:
+            if not all(site_manager.is_site_available(site.get_id()) for site in added):
+                return None
+            source = next((site for site in sites if placement.is_stable(site_manager, site, variable_id, horizon)), None)
+            if source is None:
+                return None
+        elif not any(site.get_id() in target_ids and placement.is_stable(site_manager, site, variable_id, horizon) for site in sites):
+            return None
+        for txn_obj in writers:
+            if target_ids.isdisjoint(txn_obj.get_write_buffer()[variable_id][1]):
+                return None
+        return target, added, removed, source
@@ -0,0 +1,207 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+from collections import Counter, defaultdict, deque
+
+# eager : end() commits to every available copy, lazy : end() commits to the primary copy and queues the replicas
+REPLICATION_MODES = ["eager", "lazy"]
+
+
+class LazyReplication:
+    """
+    Primary copy replication with lazy propagation. end(T) commits every variable written by T on its
+    primary copy only, site 1 + i % num_sites for xi, or the first site T wrote xi to if that site is
+    not available. The writes to the other copies are appended to a replication log, and propagate(),
+    which runs after every instruction, applies the log to every available site in batches of at most
+    batch_size commits every interval ticks. Commits keep their original commit times on the replicas.
+
+    Every site has a cursor in the log. Its applied-up-to watermark is the commit time of the first entry
+    it did not apply, minus one. A site can serve the read of a transaction which began after its watermark
+    only once it caught up. DOWN sites apply the log when they recover.
+
+    Parameters:
+        interval: Number of ticks between two propagations
+        batch_size: Maximum number of log entries applied to a site by one propagation
+
+    Attributes:
+        log ( deque ) : (txn id, commit time, replicated) in commit order, replicated has KEY as variable id and
+                        VALUE as (value, ids of the sites which do not get it, values per site which differ or None)
+        log_start ( int ) : Position of the first entry of log, entries applied by every site are dropped
+        cursors ( Dict ) : KEY is site id and VALUE is the position of the next log entry to apply to it
+        lag_counts ( Counter ) : KEY is the replication lag in ticks of a commit applied to a replica and VALUE is how often it occurred
+    """
+    enabled = True
+
+    def __init__(self, interval=4, batch_size=16):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.log = deque()
+        self.log_start = 0
+        self.cursors = defaultdict(int)
+        self.lag_counts = Counter()
+
+    def primary_of(self, variable_id, site_ids, num_sites):
+        """
+        Primary copy of a variable among the available sites a transaction wrote it to
+
+        Parameters:
+            variable_id: ID of the variable
+            site_ids: Ids of the sites written, in id order
+            num_sites: Number of sites
+
+        Returns:
+            ID of the primary site
+        """
+        designated = 1 + variable_id % num_sites
+        return designated if designated in site_ids else site_ids[0]
+
+    def defer(self, site_manager, txn_obj, commit_time):
+        """
+        Split the writes of a committing transaction into the writes to its primary copies, which are
+        returned to be committed now, and the writes to the replicas, which are appended to the log
+
+        Parameters:
+            site_manager: Instance of Site Manager
+            txn_obj: Transaction object of the committing transaction
+            commit_time: Commit time of the transaction
+
+        Returns:
+            Dict with KEY as site id and VALUE as dict of variable_id -> value to commit now on that site
+        """
+        num_sites = site_manager.num_sites
+        all_available = not site_manager.has_down_sites()
+        direct = defaultdict(dict)
+        replicated = {}
+        for variable_id, (value, site_ids, stale) in txn_obj.get_write_buffer().items():
+            if not all_available:
+                site_ids = [site_id for site_id in site_ids if site_manager.is_site_available(site_id)]
+                if not site_ids:
+                    continue
+            primary = self.primary_of(variable_id, site_ids, num_sites)
+            direct[primary][variable_id] = stale.get(primary, value) if stale else value
+            if len(site_ids) > 1:
+                if len(site_ids) == num_sites:
+                    excluded = {primary}
+                else:
+                    excluded = set(range(1, num_sites + 1)).difference(site_ids)
+                    excluded.add(primary)
+                replicated[variable_id] = (value, excluded, stale)
+
+        for site_id in direct:
+            # Commits are appended to the snapshots in time order, the site applies the older log entries first
+            self.catch_up(site_manager, site_id, commit_time)
+        if replicated:
+            self.log.append((txn_obj.get_id(), commit_time, replicated))
+        return direct
+
+    def applied_up_to(self, site_id, current_time):
+        """
+        Returns:
+            The watermark of the site: every commit at or before it was applied to the site
+        """
+        position = self.cursors[site_id] - self.log_start
+        return self.log[position][1] - 1 if position < len(self.log) else current_time
+
+    def is_visible(self, site_id, start_time):
+        """
+        Returns:
+            True if every commit made before start_time was applied to the site
+        """
+        position = self.cursors[site_id] - self.log_start
+        return position >= len(self.log) or self.log[position][1] > start_time
+
+    def catch_up(self, site_manager, site_id, current_time, before_time=None, limit=None):
+        """
+        Apply the log entries of commits made before before_time to a site, all of them if not passed
+
+        Parameters:
+            site_manager: Instance of Site Manager
+            site_id: ID of the site
+            current_time: The global time at this point
+            before_time: Commit time of the first entry which is not applied
+            limit: Maximum number of entries applied
+        """
+        position = self.cursors[site_id]
+        end = self.log_start + len(self.log)
+        if limit is not None:
+            end = min(end, position + limit)
+        commits = []
+        while position < end:
+            txn_id, commit_time, replicated = self.log[position - self.log_start]
+            if before_time is not None and commit_time >= before_time:
+                break
+            writes = {variable_id: stale.get(site_id, value) if stale else value
+                      for variable_id, (value, excluded, stale) in replicated.items() if site_id not in excluded}
+            if writes:
+                commits.append((txn_id, commit_time, writes))
+            position += 1
+        self.cursors[site_id] = position
+        if commits:
+            site_manager.get_site(site_id).get_data_manager().commit_batch(commits)
+            for _, commit_time, _ in commits:
+                self.lag_counts[current_time - commit_time] += 1
+                site_manager.metrics.observe("replication_lag_ticks", current_time - commit_time)
+
+    def propagate(self, site_manager, current_time):
+        """
+        Apply a batch of log entries to every available site, every interval ticks, and drop the
+        entries every site applied
+        """
+        if current_time % self.interval or not self.log:
+            return
+        for site in site_manager.get_available_sites():
+            self.catch_up(site_manager, site.get_id(), current_time, limit=self.batch_size)
+        applied = min(self.cursors[site_id] for site_id in range(1, site_manager.num_sites + 1))
+        while self.log_start < applied:
+            self.log.popleft()
+            self.log_start += 1
+
+    def drain(self, site_manager, current_time):
+        """
+        Apply the whole log to every site, e.g. before a dump
+        """
+        if self.log:
+            for site_id in range(1, site_manager.num_sites + 1):
+                self.catch_up(site_manager, site_id, current_time)
+
+    def lag_percentile(self, percentile):
+        """
+        Returns:
+            The replication lag in ticks below which percentile % of the applied commits were, None if nothing was applied
+        """
+        total = sum(self.lag_counts.values())
+        if total == 0:
+            return None
+        seen = 0
+        for lag in sorted(self.lag_counts):
+            seen += self.lag_counts[lag]
+            if seen * 100 >= percentile * total:
+                return lag
+        return None
+
+
+class EagerReplication(LazyReplication):
+    """
+    Every available copy is committed in end(), nothing is queued. Used when lazy replication is disabled
+    """
+    enabled = False
+
+    def __init__(self):
+        super().__init__(1, 0)
+
+    def defer(self, site_manager, txn_obj, commit_time):
+        return txn_obj.get_writes_by_site()
+
+    def is_visible(self, site_id, start_time):
+        return True
+
+    def propagate(self, site_manager, current_time):
+        return
+
+    def catch_up(self, site_manager, site_id, current_time, before_time=None, limit=None):
+        return
+
+    def drain(self, site_manager, current_time):
+        return
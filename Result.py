@@ -0,0 +1,160 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+
+class BeginResult:
+    """
+    Result of a begin() instruction
+
+    Parameters:
+        txn_name: Name of the transaction (T1, T2, etc)
+        start_time: Time when the transaction began
+    """
+    def __init__(self, txn_name, start_time):
+        self.txn_name = txn_name
+        self.start_time = start_time
+
+    def __repr__(self):
+        return "BeginResult(%s, start_time=%s)" % (self.txn_name, self.start_time)
+
+
+class ReadResult:
+    """
+    Result of a R() instruction
+
+    Parameters:
+        txn_name: Name of the transaction (T1, T2, etc)
+        var_name: Name of the variable read (x1, x2, etc)
+        status: TransactionStatus.RUNNING if the read was served,
+                TransactionStatus.WAITING if it is pending on a down site,
+                TransactionStatus.ABORTED if no site could serve it
+        value: Value read, None unless the read was served
+        site_id: Site that served the read, None unless the read was served
+        reason: AbortReason when status is ABORTED
+    """
+    def __init__(self, txn_name, var_name, status, value=None, site_id=None, reason=None):
+        self.txn_name = txn_name
+        self.var_name = var_name
+        self.status = status
+        self.value = value
+        self.site_id = site_id
+        self.reason = reason
+
+    def is_served(self):
+        """
+        Returns:
+            True if the read returned a value
+        """
+        return self.status == TransactionStatus.RUNNING
+
+    def __repr__(self):
+        return "ReadResult(%s, %s, status=%s, value=%s, site=%s)" % (self.txn_name, self.var_name, self.status.name, self.value, self.site_id)
+
+
+class AsOfReadResult:
+    """
+    Result of a R_asof() instruction
+
+    Parameters:
+        var_name: Name of the variable read (x1, x2, etc)
+        time: Time the value was read as of
+        value: Value committed at or before time, None if no site could serve the read
+        site_id: Site the value was read from, None if no site could serve the read
+    """
+    def __init__(self, var_name, time, value=None, site_id=None):
+        self.var_name = var_name
+        self.time = time
+        self.value = value
+        self.site_id = site_id
+
+    def __repr__(self):
+        return "AsOfReadResult(%s, time=%s, value=%s, site=%s)" % (self.var_name, self.time, self.value, self.site_id)
+
+
+class WriteResult:
+    """
+    Result of a W() instruction
+
+    Parameters:
+        txn_name: Name of the transaction (T1, T2, etc)
+        var_name: Name of the variable written (x1, x2, etc)
+        value: Value written
+        sites: List of site ids on which the write was recorded
+    """
+    def __init__(self, txn_name, var_name, value, sites):
+        self.txn_name = txn_name
+        self.var_name = var_name
+        self.value = value
+        self.sites = sites
+
+    def __repr__(self):
+        return "WriteResult(%s, %s, value=%s, sites=%s)" % (self.txn_name, self.var_name, self.value, self.sites)
+
+
+class EndResult:
+    """
+    Result of an end() instruction
+
+    Parameters:
+        txn_name: Name of the transaction (T1, T2, etc)
+        status: TransactionStatus.COMMITTED or TransactionStatus.ABORTED, TransactionStatus.WAITING if the end was deferred
+        reason: AbortReason when status is ABORTED
+        time: Time at which the transaction ended
+    """
+    def __init__(self, txn_name, status, reason=None, time=None):
+        self.txn_name = txn_name
+        self.status = status
+        self.reason = reason
+        self.time = time
+
+    def is_committed(self):
+        """
+        Returns:
+            True if the transaction committed
+        """
+        return self.status == TransactionStatus.COMMITTED
+
+    def __repr__(self):
+        if self.reason is None:
+            return "EndResult(%s, status=%s)" % (self.txn_name, self.status.name)
+        return "EndResult(%s, status=%s, reason=%s)" % (self.txn_name, self.status.name, self.reason.name)
+
+
+class SiteResult:
+    """
+    Result of a fail() or recover() instruction
+
+    Parameters:
+        site_id: ID of the site
+        status: SiteStatus of the site after the instruction
+        reads: List of ReadResult for pending reads served because the site recovered
+        ends: List of EndResult for deferred ends retried because the site recovered
+    """
+    def __init__(self, site_id, status, reads=None, ends=None):
+        self.site_id = site_id
+        self.status = status
+        self.reads = reads if reads is not None else []
+        self.ends = ends if ends is not None else []
+
+    def __repr__(self):
+        if self.ends:
+            return "SiteResult(%s, status=%s, reads=%s, ends=%s)" % (self.site_id, self.status.name, self.reads, self.ends)
+        return "SiteResult(%s, status=%s, reads=%s)" % (self.site_id, self.status.name, self.reads)
+
+
+class DumpResult:
+    """
+    Result of a dump() instruction
+
+    Parameters:
+        sites: Dict with KEY as site_id and VALUE as dict of variable_id -> committed value
+    """
+    def __init__(self, sites):
+        self.sites = sites
+
+    def __repr__(self):
+        return "DumpResult(%s)" % self.sites
@@ -0,0 +1,87 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import bisect
+
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+
+class RetryScheduler:
+    """
+    Defers end() of transactions which are waiting on a read of a down site, instead of aborting
+    them. A deferred end is retried once recover() served the pending read, and aborted once
+    timeout ticks of the global time passed without it. Deferred ends are kept ordered by the start
+    time of their transactions, so the oldest transactions are retried (and commit) first.
+
+    Parameters:
+        timeout: Number of ticks a deferred end waits for its read before the transaction aborts
+        capacity: Maximum number of deferred ends. If it is reached, end() aborts waiting transactions
+
+    Attributes:
+        deferred ( List ) : Sorted list of (start time, txn id, deadline)
+    """
+    enabled = True
+
+    def __init__(self, timeout=10, capacity=1000):
+        self.timeout = timeout
+        self.capacity = capacity
+        self.deferred = []
+
+    def defer(self, txn_obj, current_time):
+        """
+        Defer the end of a waiting transaction
+
+        Parameters:
+            txn_obj: Transaction object
+            current_time: The global time at this point
+
+        Returns:
+            Deadline of the deferred end, None if the scheduler is full
+        """
+        if len(self.deferred) >= self.capacity:
+            return None
+        deadline = current_time + self.timeout
+        bisect.insort(self.deferred, (txn_obj.get_start_time(), txn_obj.get_id(), deadline))
+        return deadline
+
+    def pop_due(self, current_time, transaction_map):
+        """
+        Remove the deferred ends which can be retried or timed out
+
+        Parameters:
+            current_time: The global time at this point
+            transaction_map: KEY is txn id and VALUE is Transaction object
+
+        Returns:
+            List of (Transaction object, timed out) oldest transaction first
+        """
+        due = []
+        remaining = []
+        for entry in self.deferred:
+            txn_obj = transaction_map[entry[1]]
+            if txn_obj.get_status() != TransactionStatus.WAITING:
+                due.append((txn_obj, False))
+            elif entry[2] <= current_time:
+                due.append((txn_obj, True))
+            else:
+                remaining.append(entry)
+        self.deferred = remaining
+        return due
+
+
+class NullScheduler(RetryScheduler):
+    """
+    Scheduler deferring nothing: end() aborts waiting transactions. Used when retries are disabled
+    """
+    enabled = False
+
+    def __init__(self):
+        super().__init__(0, 0)
+
+    def defer(self, txn_obj, current_time):
+        return None
+
+    def pop_due(self, current_time, transaction_map):
+        return []
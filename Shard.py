@@ -0,0 +1,566 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import multiprocessing
+from collections import defaultdict
+
+from RepCRec.config import config
+from RepCRec.Output import LoggingSink, RecordingSink, replay
+from RepCRec.SiteManager import SiteManager
+from RepCRec.TransactionManager import TransactionManager
+from RepCRec.Result import DumpResult, EndResult
+from RepCRec.enums.AbortReason import AbortReason
+from RepCRec.enums.TransactionStatus import TransactionStatus
+from RepCRec.enums.SiteStatus import SiteStatus
+from RepCRec.constants import (BEGIN_FUNC, READ_FUNC, WRITE_FUNC, DUMP_FUNC, FAIL_FUNC, RECOVER_FUNC,
+                               READ_AS_OF_FUNC, DUMP_AS_OF_FUNC, SITE_MANAGER_FUNCS)
+
+# Instructions queued for a shard are sent once this many are pending, or at the next end() or dump()
+SHARD_BATCH_SIZE = 64
+# Second phase of the commit, queued to the shards of the transaction, and sites made UP by a commit
+END_COMMIT = "end_commit"
+END_ABORT = "end_abort"
+SITES_UP = "sites_up"
+# Written by every shard with pending reads on a recovered site, only once by the router
+SHARED_MESSAGES = {"Executing Pending reads for odd indexed variables as site recovered"}
+
+
+def shard_of(variable_id, num_shards):
+    """
+    Shard owning a variable. x1 and x2, x3 and x4 etc go to the same shard, so every shard
+    gets unreplicated and replicated variables
+
+    Returns:
+        Index of the shard
+    """
+    return ((variable_id - 1) // 2) % num_shards
+
+
+class Shard:
+    """
+    Transaction manager of one shard, running in its own process. It holds every site, but only the
+    variables of its shard are ever read or written on them. Failures and recoveries are applied to all
+    shards, so site histories are the same everywhere. Output events are recorded with the sequence
+    number of their instruction and sent back to the router, which writes them in instruction order.
+
+    Parameters:
+        rank: Index of the shard
+        num_shards: Number of shards
+        num_sites: Number of sites
+        num_variables: Number of variables
+        record_output: If False, output events are not recorded
+
+    Attributes:
+        results ( List ) : (sequence number, events) of the instructions executed since the last sync
+        status_changes ( Dict ) : KEY is txn id and VALUE is (sequence number, status) of its last status change since the last sync
+        readers ( Set ) : IDs of the transactions which read since the last sync
+        reported_targets ( Dict ) : KEY is txn id and VALUE is the number of rw_out_targets the router knows of
+    """
+    def __init__(self, rank, num_shards, num_sites, num_variables, record_output=True):
+        self.rank = rank
+        self.num_shards = num_shards
+        self.output = RecordingSink(record_output)
+        self.site_manager = SiteManager(num_sites, num_variables, self.output)
+        self.transaction_manager = TransactionManager(num_variables, num_sites, self.site_manager, validation="pivot")
+        self.results = []
+        self.status_changes = {}
+        self.readers = set()
+        self.reported_targets = {}
+
+    def execute(self, seq, current_time, instruction_type, params):
+        """
+        Execute one queued instruction. Events of instructions without a sequence number are dropped
+        """
+        tm = self.transaction_manager
+        tm.current_time = current_time
+        self.site_manager.current_time = current_time
+        if instruction_type == READ_FUNC:
+            txn_index = int(params[0][1:])
+            if len(params) > 2:
+                # Batched read, the last parameter is the position of every variable in the batch of the router
+                positions = params[-1]
+                results = tm.read_batch(params[:-1])
+            else:
+                positions = [0]
+                results = [tm.read_req(params)]
+            self.readers.add(txn_index)
+            for position, result in zip(positions, results):
+                if not result.is_served():
+                    # The read made the transaction wait or abort
+                    self.status_changes[txn_index] = ((seq, position), result.status)
+        elif instruction_type == WRITE_FUNC:
+            if "=" in params[1]:
+                tm.write_batch(params)
+            else:
+                tm.write_req(params)
+        elif instruction_type == BEGIN_FUNC:
+            tm.begin(params)
+        elif instruction_type == FAIL_FUNC:
+            self.site_manager.fail_sites(params)
+        elif instruction_type == RECOVER_FUNC:
+            # Pending reads are served if the transaction is waiting on all shards, not only on this one
+            site_id, statuses = params
+            for txn_index, status in statuses.items():
+                if txn_index in tm.transaction_map:
+                    tm.transaction_map[txn_index].set_status(status)
+            for read in self.site_manager.recover_site(site_id).reads:
+                self.status_changes[int(read.txn_name[1:])] = ((seq, 0), TransactionStatus.RUNNING)
+        elif instruction_type == READ_AS_OF_FUNC:
+            self.site_manager.read_as_of(*params)
+        elif instruction_type == END_COMMIT:
+            # The last parameter is the start time of the oldest transaction of the router which may still end
+            tm.pivot_horizon = params[-1]
+            txn_obj = tm.transaction_map[params[0]]
+            tm.pivot_commit(txn_obj, [])
+            tm.commit(txn_obj)
+            self.reported_targets.pop(params[0], None)
+        elif instruction_type == END_ABORT:
+            tm.pivot_horizon = params[-1]
+            tm._abort(tm.transaction_map[params[0]], params[1])
+            self.reported_targets.pop(params[0], None)
+        elif instruction_type == SITES_UP:
+            for site_id in params:
+                self.site_manager.mark_site_up(site_id)
+
+        events = self.output.take()
+        if seq is not None:
+            # fail and recover are written by the router, once for all shards
+            self.results.append((seq, [event for event in events if event[0] not in (FAIL_FUNC, RECOVER_FUNC)]))
+
+    def sync(self):
+        """
+        Returns:
+            (results, status changes, new rw_out_targets) since the last sync
+        """
+        rw_out_targets = self.transaction_manager.rw_out_targets
+        targets = {}
+        for txn_index in self.readers:
+            txn_targets = rw_out_targets.get(txn_index)
+            if txn_targets and len(txn_targets) != self.reported_targets.get(txn_index):
+                self.reported_targets[txn_index] = len(txn_targets)
+                targets[txn_index] = list(txn_targets)
+        reply = (self.results, self.status_changes, targets)
+        self.results = []
+        self.status_changes = {}
+        self.readers = set()
+        return reply
+
+    def prepare(self, txn_index):
+        """
+        First phase of the commit of a transaction: the checks which only need the variables of this shard
+
+        Returns:
+            Dict with site_failed, ssi_conflict, readers (pivot_readers) and written_sites
+        """
+        tm = self.transaction_manager
+        txn_obj = tm.transaction_map[txn_index]
+        return {"site_failed": tm.check_site_failure(txn_obj),
+                "ssi_conflict": tm.check_ssi(txn_obj),
+                "readers": tm.pivot_readers(txn_obj),
+                "written_sites": list(txn_obj.get_writes_by_site())}
+
+    def get_dump(self, dump_result):
+        """
+        Keep the variables of this shard in a dump of its sites
+
+        Returns:
+            Dict with KEY as site_id and VALUE as dict of variable_id -> value
+        """
+        return {site_id: {var: value for var, value in variables.items() if shard_of(var, self.num_shards) == self.rank}
+                for site_id, variables in dump_result.sites.items()}
+
+
+def _serve_shard(conn, rank, num_shards, num_sites, num_variables, record_output):
+    """
+    Main loop of a shard process. Messages are ("batch", items), ("sync",), ("prepare", txn id),
+    ("dump", site ids, variable ids, changed only), ("dump_as_of", time, site ids, variable ids) and ("stop",).
+    Batches are not answered, every other message is.
+    """
+    shard = Shard(rank, num_shards, num_sites, num_variables, record_output)
+    while True:
+        message = conn.recv()
+        kind = message[0]
+        if kind == "batch":
+            for item in message[1]:
+                shard.execute(*item)
+        elif kind == "sync":
+            conn.send(shard.sync())
+        elif kind == "prepare":
+            conn.send(shard.sync() + (shard.prepare(message[1]),))
+        elif kind == "dump":
+            conn.send(shard.get_dump(shard.site_manager.get_dump(*message[1:])))
+        elif kind == "dump_as_of":
+            conn.send(shard.get_dump(shard.site_manager.get_dump_as_of(*message[1:])))
+        elif kind == "stop":
+            conn.close()
+            return
+
+
+class ShardRouter(TransactionManager):
+    """
+    Sharded transaction manager. Variables are partitioned over num_shards TransactionManager shards
+    running in separate processes, and the router dispatches every instruction to the shard of its variable.
+    Reads and writes of different shards run in parallel between two end() instructions.
+
+    The router is the coordinator of an atomic commit: end(T) asks the shards T touched to prepare
+    (available copies and first-committer-wins checks, readers of the variables T wrote), decides with
+    the conflict metadata it keeps for all shards, and queues the outcome to those shards. A transaction
+    of a single shard takes the fast path, one round trip to its shard. Serializability is validated with
+    the pivot engine, whose inConflict/outConflict flags are merged from all shards. Before an end() the
+    router waits for every shard to finish the instructions sent to it, so decisions do not depend on
+    timing. Deferred ends, tracing and checkpoints are not available in sharded mode, and reads and
+    writes return None, their results are only written to the output.
+
+    Parameters:
+        num_shards: Number of shard processes
+        num_variables: Number of variables
+        num_sites: Number of sites
+        output: OutputSink for the output events, LoggingSink if not passed
+        dump_writer: DumpWriter saving dump() snapshots to a file, if not passed dump() goes to the output sink
+        dump_diff: If True, dump() only contains variables committed since the previous dump()
+        metrics: Metrics for the router, NullMetrics if not passed
+        batch_size: Number of instructions queued for a shard before they are sent
+
+    Attributes:
+        sink : OutputSink the output is written to, in instruction order
+        site_manager : Site manager of the router. Tracks the status and histories of the sites and writes fail and recover
+        txn_shards ( Dict ) : KEY is txn id and VALUE is the set of shards the transaction touched
+        status_seq ( Dict ) : KEY is txn id and VALUE is (sequence number, position in a batched read) of the last status change applied
+        pending ( List ) : Per shard, (seq, time, instruction type, params) items which were not sent yet
+        unsynced ( Set ) : Shards which were sent instructions since they were last synced
+        results ( List ) : (seq, rank, events) waiting to be written, rank -1 is the router
+        seq ( int ) : Sequence number of the current instruction
+    """
+    def __init__(self, num_shards, num_variables=config['NUM_VARIABLES'], num_sites=config['NUM_SITES'], output=None,
+                 dump_writer=None, dump_diff=False, metrics=None, batch_size=SHARD_BATCH_SIZE):
+        self.sink = output if output is not None else LoggingSink()
+        site_manager = SiteManager(num_sites, num_variables, RecordingSink(self.sink.enabled), dump_writer, dump_diff, metrics)
+        super().__init__(num_variables, num_sites, site_manager, validation="pivot")
+        self.num_shards = num_shards
+        self.batch_size = batch_size
+        self.txn_shards = defaultdict(set)
+        self.status_seq = {}
+        self.pending = [[] for _ in range(num_shards)]
+        self.unsynced = set()
+        self.results = []
+        self.seq = 0
+
+        context = multiprocessing.get_context()
+        self.connections = []
+        self.processes = []
+        for rank in range(num_shards):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_serve_shard, args=(child_conn, rank, num_shards, num_sites, num_variables, self.sink.enabled), daemon=True)
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+    def dispatch(self, current_time, instruction):
+        """
+        Route one instruction. Called by Simulator for every instruction in sharded mode
+
+        Parameters:
+            current_time : The global time at this point
+            instruction : object of class Instruction
+        """
+        self.seq += 1
+        if instruction.get_instruction_type() in SITE_MANAGER_FUNCS:
+            self.current_time = current_time
+            self._site_instruction(instruction)
+        else:
+            self.process_instr(current_time, instruction)
+        self._collect_own_events()
+
+    def _collect_own_events(self):
+        events = self.output.take()
+        if events:
+            self.results.append((self.seq, -1, events))
+
+    def _queue(self, shard, seq, instruction_type, params, current_time=None):
+        """
+        Queue an instruction for a shard, sending the queue once it is full
+        """
+        self.pending[shard].append((seq, self.current_time if current_time is None else current_time, instruction_type, params))
+        if len(self.pending[shard]) >= self.batch_size:
+            self._send(shard)
+
+    def _send(self, shard):
+        if self.pending[shard]:
+            self.connections[shard].send(("batch", self.pending[shard]))
+            self.pending[shard] = []
+            self.unsynced.add(shard)
+
+    def _touch(self, txn_obj, shard):
+        """
+        Begin the transaction on a shard the first time it accesses one of its variables, at its start time
+        """
+        shards = self.txn_shards[txn_obj.get_id()]
+        if shard not in shards:
+            shards.add(shard)
+            self._queue(shard, None, BEGIN_FUNC, [txn_obj.get_name()], txn_obj.get_start_time())
+
+    def _barrier(self, requests=None):
+        """
+        Wait until every shard executed the instructions sent to it and merge what they report
+
+        Parameters:
+            requests: Dict with KEY as shard and VALUE as the message to send instead of a plain sync
+
+        Returns:
+            Dict with KEY as shard and VALUE as the extra part of the reply to its request
+        """
+        requests = requests or {}
+        for shard in range(self.num_shards):
+            self._send(shard)
+        waiting = sorted(self.unsynced.union(requests))
+        for shard in waiting:
+            self.connections[shard].send(requests.get(shard, ("sync",)))
+        replies = {}
+        for shard in waiting:
+            reply = self.connections[shard].recv()
+            results, status_changes, targets = reply[:3]
+            self.results.extend((seq, shard, events) for seq, events in results)
+            for txn_index, (seq, status) in status_changes.items():
+                # The status of a transaction is the one set by its latest read or recover, on any shard
+                if seq >= self.status_seq.get(txn_index, (0, 0)):
+                    self.status_seq[txn_index] = seq
+                    self.transaction_map[txn_index].set_status(status)
+            for reader, writers in targets.items():
+                # rw edges noted by reads: the reader read an older version than a committed writer wrote
+                self.rw_out_targets[reader].update(writers)
+                self.out_conflict.add(reader)
+                self.in_conflict.update(writers)
+            if len(reply) > 3:
+                replies[shard] = reply[3]
+        self.unsynced = set()
+        return replies
+
+    def _write_results(self):
+        """
+        Write the output collected so far in instruction order
+        """
+        self.results.sort(key=lambda result: (result[0], result[1]))
+        written = set()
+        for seq, rank, events in self.results:
+            if rank >= 0:
+                shared = [(seq, event[1]) for event in events if event[1] in SHARED_MESSAGES]
+                events = [event for event in events if (seq, event[1]) not in written]
+                written.update(shared)
+            replay(events, self.sink)
+        self.results = []
+
+    def sync(self):
+        """
+        Wait for all shards and write out the output
+        """
+        self._barrier()
+        self._collect_own_events()
+        self._write_results()
+        self.sink.flush()
+
+    def close(self):
+        """
+        Write out the output and stop the shard processes
+        """
+        self.sync()
+        for conn, process in zip(self.connections, self.processes):
+            conn.send(("stop",))
+            conn.close()
+            process.join()
+
+    def read_req(self, params):
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        shard = shard_of(int(params[1][1:]), self.num_shards)
+        self._touch(txn_obj, shard)
+        self._queue(shard, self.seq, READ_FUNC, params)
+        return None
+
+    def write_req(self, params):
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        shard = shard_of(int(params[1][1:]), self.num_shards)
+        self._touch(txn_obj, shard)
+        self._queue(shard, self.seq, WRITE_FUNC, params)
+        return None
+
+    def read_batch(self, params):
+        # The variables of every shard are sent as one batched read, their output is written shard by shard
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        for shard, reads in self._split_batch(params[1:]):
+            self._touch(txn_obj, shard)
+            self._queue(shard, self.seq, READ_FUNC, [params[0]] + [var_name for _, var_name in reads] + [[position for position, _ in reads]])
+        return None
+
+    def write_batch(self, params):
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        for shard, writes in self._split_batch(params[1:]):
+            self._touch(txn_obj, shard)
+            self._queue(shard, self.seq, WRITE_FUNC, [params[0]] + [pair for _, pair in writes])
+        return None
+
+    def scan(self, params):
+        # Every shard reads its variables of the range as one batched read
+        first = max(int(params[1][1:]), 1)
+        last = min(int(params[2][1:]), self.number_of_variables)
+        return self.read_batch([params[0]] + ["x%s" % var_index for var_index in range(first, last + 1)])
+
+    def _split_batch(self, items):
+        """
+        Split the variables of a batched read or write by shard, keeping their order
+
+        Parameters:
+            items : Variable names, or var=value pairs
+
+        Returns:
+            List of (shard, (position in the batch, item) of the items of the shard) in shard order
+        """
+        by_shard = defaultdict(list)
+        for position, item in enumerate(items):
+            by_shard[shard_of(int(item.split("=")[0].strip()[1:]), self.num_shards)].append((position, item))
+        return sorted(by_shard.items())
+
+    def end_txn(self, params):
+        """
+        Atomic commit of a transaction over the shards it touched
+
+        Parameters:
+            params : list of parameters of the parsed instruction, containing instruction name
+
+        Returns:
+            EndResult
+        """
+        txn_name = params[0]
+        txn_index = int(txn_name[1:])
+        txn_obj = self.transaction_map[txn_index]
+        shards = sorted(self.txn_shards.pop(txn_index, ()))
+
+        # Phase 1 : prepare on the shards of T, every other shard only finishes what it was sent
+        start = self.metrics.clock()
+        votes = list(self._barrier({shard: ("prepare", txn_index) for shard in shards}).values())
+        self.metrics.observe_time("phase_seconds", start, phase="shard_prepare")
+        self.output.emit("info", "Txn %s : END. Checking whether to COMMIT/ABORT.....", txn_name)
+
+        if txn_obj.get_status() == TransactionStatus.ABORTED:
+            self.output.emit("abort", "Txn %s : was ABORTED as READ failed", txn_name, txn=txn_name, reason=AbortReason.READ_FAILED.name, time=self.current_time)
+            result = EndResult(txn_name, TransactionStatus.ABORTED, AbortReason.READ_FAILED, self.current_time)
+            self._pivot_finish(txn_obj)
+        elif txn_obj.get_status() == TransactionStatus.WAITING:
+            self.output.emit("abort", "Txn %s : is wating on some read. has to be ABORTED", txn_name, txn=txn_name, reason=AbortReason.WAITING.name, time=self.current_time)
+            result = self._abort(txn_obj, AbortReason.WAITING)
+        elif any(vote["site_failed"] for vote in votes):
+            result = self._abort_site_failure(txn_obj)
+        else:
+            ssi_conflict = next((vote["ssi_conflict"] for vote in votes if vote["ssi_conflict"] is not None), None)
+            if ssi_conflict is not None:
+                result = self._abort_ssi(txn_obj, ssi_conflict)
+            else:
+                start = self.metrics.clock()
+                rw_edges = self.pivot_check(txn_obj, [reader for vote in votes for reader in vote["readers"]])
+                self.metrics.observe_time("phase_seconds", start, phase="pivot_detection")
+                if rw_edges is None:
+                    result = self._abort_pivot(txn_obj)
+                else:
+                    self.pivot_commit(txn_obj, rw_edges)
+                    result = self._commit_shards(txn_obj, votes)
+
+        # Phase 2 : the outcome is queued, the shards apply it before any instruction sent after it
+        horizon = self._pivot_oldest_start()
+        for shard in shards:
+            if result.is_committed():
+                self._queue(shard, None, END_COMMIT, [txn_index, horizon])
+            else:
+                self._queue(shard, None, END_ABORT, [txn_index, result.reason, horizon])
+        self._collect_own_events()
+        self._write_results()
+        return result
+
+    def _commit_shards(self, txn_obj, votes):
+        """
+        Commit decision for T. The RECOVERED sites T wrote to become UP, on the router and on every shard
+
+        Returns:
+            EndResult
+        """
+        written_sites = sorted(set(site_id for vote in votes for site_id in vote["written_sites"]))
+        sites_up = []
+        for site_id in written_sites:
+            if self.site_manager.is_site_available(site_id):
+                if self.site_manager.get_site(site_id).get_status() == SiteStatus.RECOVERED:
+                    sites_up.append(site_id)
+                self._bring_site_up(txn_obj.get_name(), site_id)
+        if sites_up:
+            for shard in range(self.num_shards):
+                self._queue(shard, None, SITES_UP, sites_up)
+        self._mark_committed(txn_obj)
+        return EndResult(txn_obj.get_name(), TransactionStatus.COMMITTED, time=self.current_time)
+
+    def end_group(self, txn_names, start_time):
+        """
+        The ends of a group are committed one by one, each end is already one round trip to its shards
+
+        Returns:
+            List of EndResult
+        """
+        results = []
+        for offset, txn_name in enumerate(txn_names):
+            self.seq += 1
+            self.current_time = start_time + offset
+            results.append(self.end_txn([txn_name]))
+        return results
+
+    def _site_instruction(self, instruction):
+        """
+        fail and recover are applied to the router and to every shard, R_asof is sent to the shard of its
+        variable, dump and dump_asof collect the variables of all shards. Sites can not be added or decommissioned
+        """
+        instruction_type = instruction.get_instruction_type()
+        params = instruction.get_params()
+        if instruction_type == FAIL_FUNC:
+            self.site_manager.process_instr(self.current_time, instruction)
+            for shard in range(self.num_shards):
+                self._queue(shard, None, FAIL_FUNC, [int(param) for param in params])
+        elif instruction_type == RECOVER_FUNC:
+            self.site_manager.process_instr(self.current_time, instruction)
+            # The shards serve the pending reads with the statuses of the transactions over all shards
+            self._barrier()
+            statuses = {txn_index: self.transaction_map[txn_index].get_status() for txn_index in self.txn_shards}
+            for shard in range(self.num_shards):
+                self._queue(shard, self.seq, RECOVER_FUNC, [int(params[0]), statuses])
+        elif instruction_type == READ_AS_OF_FUNC:
+            args = [params[0], int(params[1]), int(params[2]) if len(params) > 2 else None]
+            self._queue(shard_of(int(params[0][1:]), self.num_shards), self.seq, READ_AS_OF_FUNC, args)
+        elif instruction_type == DUMP_FUNC:
+            self.output.emit("info", "Site DUMP from SiteManager")
+            site_ids = [int(param) for param in params if param.isdigit()] or None
+            variable_ids = [int(param[1:]) for param in params if param.startswith("x")] or None
+            dump_result = self._gather(("dump", site_ids, variable_ids, self.site_manager.dump_diff))
+            if self.site_manager.dump_writer is not None:
+                self.site_manager.dump_writer.write(self.current_time, dump_result)
+            else:
+                self.output.dump(dump_result)
+        elif instruction_type == DUMP_AS_OF_FUNC:
+            timestamp = int(params[0])
+            site_ids = [int(param) for param in params[1:] if param.isdigit()] or None
+            variable_ids = [int(param[1:]) for param in params[1:] if param.startswith("x")] or None
+            self.output.emit("info", "Site DUMP as of time %s from SiteManager", timestamp)
+            self.output.dump(self._gather(("dump_as_of", timestamp, site_ids, variable_ids)))
+        else:
+            raise ValueError("%s is not available with shards" % instruction_type)
+
+    def _gather(self, message):
+        """
+        Send a dump request to every shard and merge the variables of all shards per site
+
+        Returns:
+            DumpResult
+        """
+        self._barrier()
+        for conn in self.connections:
+            conn.send(message)
+        sites = {}
+        for conn in self.connections:
+            for site_id, variables in conn.recv().items():
+                sites.setdefault(site_id, {}).update(variables)
+        return DumpResult({site_id: dict(sorted(variables.items())) for site_id, variables in sites.items()})
@@ -6,7 +6,7 @@ Authors:
 import logging
 from RepCRec.Instruction import Instruction
 # from Variable import Variable
-from RepCRec.constants import SITE_MANAGER_FUNCS
+from RepCRec.constants import SITE_MANAGER_FUNCS, END_FUNC
 
 log = logging.getLogger(__name__)
 
@@ -15,17 +15,58 @@ class Simulator:
     Simulator for the project. Runs a discreate event simulator
 
     Parameters:
-        file_name : input file to read instrcutions from
+        file_name : input file to read instrcutions from, or a file like object (e.g. sys.stdin) to stream them from
         site_manager : Instance of Site Manager
         transaction_manager : Instance of Transaction Manager
+        group_commit : If True, consecutive end() instructions of one line are committed as a group
+        router : ShardRouter dispatching every instruction to shard processes. If passed, site_manager
+            and transaction_manager are the ones of the router
+
+    Attributes:
+        streaming ( bool ) : True if instructions are streamed from a file like object. Every instruction
+            is executed as soon as its line arrives and the output is flushed after it
+        offset ( int ) : Byte offset in the input file of the first line which was not read yet
+        pending ( List ) : Instructions of the current line which were not executed yet
+        instructions_executed ( int ) : Number of instructions executed so far
     """
-    def __init__(self, file_name, site_manager, transaction_manager):
+    def __init__(self, file_name, site_manager=None, transaction_manager=None, group_commit=False, router=None):
 
         self.file_name = file_name
+        self.streaming = hasattr(file_name, 'readline')
+        self.offset = 0
+        self.pending = []
+        self.instructions_executed = 0
+        self.line_generator = self._get_line_generator()
+        self.router = router
+        self.site_manager = router.site_manager if router is not None else site_manager
+        self.transaction_manager = router if router is not None else transaction_manager
+        self.group_commit = group_commit
+        self.current_time = 1
+
+    def __getstate__(self):
+        # The line generator holds an open file. It is recreated from offset when restored
+        state = self.__dict__.copy()
+        del state['line_generator']
+        if self.streaming:
+            # A stream can not be restored, the resumed run has to be given its input
+            state['file_name'] = None
+            state['streaming'] = False
+            state['offset'] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.line_generator = self._get_line_generator()
+
+    def set_input(self, file_name, offset=0):
+        """
+        Continue reading instructions from file_name (path or file like object) at the byte offset.
+        The offset is ignored for file like objects
+        """
+        self.file_name = file_name
+        self.streaming = hasattr(file_name, 'readline')
+        self.offset = offset
         self.line_generator = self._get_line_generator()
-        self.site_manager = site_manager
-        self.transaction_manager = transaction_manager
-        self.current_time = 0
 
     def get_next_instruction(self):
         """
@@ -44,15 +85,29 @@ class Simulator:
 
     def _get_line_generator(self):
         """
-        Fetch the next instruction from the input file
+        Fetch the next instruction from the input file, starting at offset
 
         Returns:
             Line from the input file
         """
-        with open(self.file_name, 'r', encoding='UTF-8') as input_file:
-            for line in input_file:
+        if self.file_name is None:
+            return
+        if self.streaming:
+            # readline returns as soon as a whole line arrived, unlike iteration over a pipe.
+            # readline(0) is '' or b'' depending on the mode of the stream
+            for line in iter(self.file_name.readline, self.file_name.readline(0)):
+                self.offset += len(line)
+                if isinstance(line, bytes):
+                    line = line.decode('UTF-8')
                 if len(line) > 1:
                     yield line
+            return
+        with open(self.file_name, 'rb') as input_file:
+            input_file.seek(self.offset)
+            for line in input_file:
+                self.offset += len(line)
+                if len(line) > 1:
+                    yield line.decode('UTF-8')
 
     def _process_instruction(self, line):
         """
@@ -68,21 +123,149 @@ class Simulator:
 
         return instructions
 
-    def run(self):
+    def step(self, limit=None):
         """
-        Run the Discrete Event Simulator
+        Execute the next instruction, or the next group of end() instructions with group commit
+
+        Parameters:
+            limit: Maximum number of instructions executed
+
+        Returns:
+            False if the input is exhausted, True otherwise
+        """
+        while not self.pending:
+            instructions = self.get_next_instruction()
+            if instructions is None:
+                return False
+            self.pending = instructions
+
+        self._execute_pending(limit)
+        if self.streaming:
+            self._flush()
+        return True
+
+    def _flush(self):
         """
-        instructions = self.get_next_instruction()
+        Flush the output. In sharded mode the router first writes out the output of the shards
+        """
+        if self.router is not None:
+            self.router.sync()
+        else:
+            self.site_manager.output.flush()
+
+    def _execute_pending(self, limit=None):
+        """
+        Execute the first pending instruction, or the leading end() instructions as a group
+        """
+        group_size = 0
+        if self.group_commit:
+            while (group_size < len(self.pending) and (limit is None or group_size < limit)
+                   and self.pending[group_size].get_instruction_type() == END_FUNC):
+                group_size += 1
+        if group_size > 1:
+            group = self.pending[:group_size]
+            del self.pending[:group_size]
+            self._execute_end_group(group)
+        else:
+            self._execute(self.pending.pop(0))
+
+    def _execute_end_group(self, instructions):
+        """
+        Execute end() instructions at consecutive ticks of the global time as one group commit
+        """
+        start_time = self.current_time + 1
+        self.current_time += len(instructions)
+
+        start = self.site_manager.metrics.clock()
+        self.transaction_manager.end_group([instruction.get_params()[0] for instruction in instructions], start_time)
+        self._retry_deferred()
+        self.site_manager.metrics.observe_time("instruction_latency_seconds", start, type="end_group")
+        self._propagate()
+        self.instructions_executed += len(instructions)
+
+    def _propagate(self):
+        # Lazy replication applies the replication log as the clock advances, in the background of the instructions
+        if self.site_manager.replication.enabled:
+            start = self.site_manager.metrics.clock()
+            self.site_manager.replication.propagate(self.site_manager, self.current_time)
+            self.site_manager.metrics.observe_time("phase_seconds", start, phase="propagation")
+        # Adaptive placement and site rebalancing move the copies of variables in the background too
+        if self.site_manager.placement.enabled:
+            start = self.site_manager.metrics.clock()
+            self.transaction_manager.current_time = self.current_time
+            self.transaction_manager.rebalance_placement()
+            self.site_manager.metrics.observe_time("phase_seconds", start, phase="placement")
+        if self.site_manager.rebalancer.pending:
+            start = self.site_manager.metrics.clock()
+            self.transaction_manager.current_time = self.current_time
+            self.transaction_manager.rebalance_sites()
+            self.site_manager.metrics.observe_time("phase_seconds", start, phase="rebalance")
+
+    def _retry_deferred(self):
+        if self.transaction_manager.scheduler.enabled:
+            self.transaction_manager.current_time = self.current_time
+            self.transaction_manager.retry_deferred()
+
+    def _execute(self, instruction):
+        """
+        Execute one instruction at the next tick of the global time
+        """
+        # Increment global time
         self.current_time += 1
 
-        while instructions is not None:
-            for instruction in instructions:
-                # Increment global time
-                self.current_time += 1
+        start = self.site_manager.metrics.clock()
+        if self.router is not None:
+            self.router.dispatch(self.current_time, instruction)
+        elif instruction.get_instruction_type() in SITE_MANAGER_FUNCS:
+            self.site_manager.process_instr(self.current_time, instruction)
+        else:
+            self.transaction_manager.process_instr(self.current_time, instruction)
+        self._retry_deferred()
+        self.site_manager.metrics.observe_time("instruction_latency_seconds", start, type=instruction.get_instruction_type())
+        self._propagate()
+        self.instructions_executed += 1
 
-                if instruction.get_instruction_type() in SITE_MANAGER_FUNCS:
-                    self.site_manager.process_instr(self.current_time, instruction)
-                else:
-                    self.transaction_manager.process_instr(self.current_time, instruction)
+    def feed(self, line):
+        """
+        Execute all instructions of one input line and flush the output. Used to push
+        instructions into the simulator instead of having it read them
 
-            instructions = self.get_next_instruction()
+        Parameters:
+            line: Line in the input file format
+        """
+        if len(line) > 1:
+            self.pending.extend(self._process_instruction(line))
+            while self.pending:
+                self._execute_pending()
+        self._flush()
+
+    async def run_async(self, source):
+        """
+        Execute instructions as they arrive from an async source
+
+        Parameters:
+            source: Async iterable of lines (str or bytes), e.g. asyncio.StreamReader
+        """
+        async for line in source:
+            if isinstance(line, bytes):
+                line = line.decode('UTF-8')
+            self.feed(line)
+
+    def run(self, max_instructions=None):
+        """
+        Run the Discrete Event Simulator
+
+        Parameters:
+            max_instructions: If passed, stop once instructions_executed reaches it
+
+        Returns:
+            True if the input is exhausted, False if the run stopped at max_instructions
+        """
+        finished = False
+        while max_instructions is None or self.instructions_executed < max_instructions:
+            if not self.step(None if max_instructions is None else max_instructions - self.instructions_executed):
+                finished = True
+                break
+
+        self._flush()
+        return finished
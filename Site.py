@@ -6,6 +6,7 @@ Authors:
 import logging
 
 from RepCRec.DataManager import DataManager
+from RepCRec.config import config
 from RepCRec.enums.SiteStatus import SiteStatus
 
 log = logging.getLogger(__name__)
@@ -17,6 +18,8 @@ class Site:
 
     Paramters:
         index: Index of the current site
+        output: OutputSink passed on to the data manager
+        num_variables: Number of total variables present
 
     Attributes:
         id : Site id
@@ -26,12 +29,12 @@ class Site:
 
     """
 
-    def __init__(self, index):
+    def __init__(self, index, output=None, num_variables=config['NUM_VARIABLES']):
         self.id = index
         self.status = SiteStatus.UP
         self.last_failure_time = None
         # Initialise DataManger
-        self.data_manager = DataManager(self.id)
+        self.data_manager = DataManager(self.id, output, num_variables)
 
     def set_status(self, status):
         """
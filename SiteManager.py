@@ -3,12 +3,24 @@ Authors:
 1) Joel Marvin Tellis (jt4680)
 2) Sahil Bakshi (sb8916)
 """
+import bisect
 import logging
 from collections import defaultdict
+from functools import partial
 
 from RepCRec.Site import Site
-from RepCRec.constants import FAIL_FUNC, DUMP_FUNC, RECOVER_FUNC
+from RepCRec.Output import LoggingSink
+from RepCRec.Metrics import NullMetrics
+from RepCRec.Tracer import NullTracer
+from RepCRec.Replication import EagerReplication
+from RepCRec.Placement import StaticPlacement
+from RepCRec.Rebalance import SiteRebalancer
+from RepCRec.Cost import NullCostModel
+from RepCRec.Result import AsOfReadResult, SiteResult, DumpResult
+from RepCRec.constants import (FAIL_FUNC, DUMP_FUNC, RECOVER_FUNC, READ_AS_OF_FUNC, DUMP_AS_OF_FUNC, ADD_SITE_FUNC,
+                               DECOMMISSION_SITE_FUNC)
 from RepCRec.enums.TransactionStatus import TransactionStatus
+from RepCRec.enums.SiteStatus import SiteStatus
 
 log = logging.getLogger(__name__)
 
@@ -21,24 +33,57 @@ class SiteManager:
     Paramters:
         num_sites: Number of sites
         num_variables: Number of total variables present
+        output: OutputSink for the output events, LoggingSink if not passed
+        dump_writer: DumpWriter saving dump() snapshots to a file, if not passed dump() goes to the output sink
+        dump_diff: If True, dump() only contains variables committed since the previous dump()
+        metrics: Metrics shared with the transaction manager and simulator, NullMetrics if not passed
+        tracer: Tracer shared with the transaction manager, NullTracer if not passed
+        replication: LazyReplication queueing the commits of replicas, EagerReplication if not passed
+        placement: AdaptivePlacement moving the copies of hot variables, StaticPlacement if not passed
+        rebalancer: SiteRebalancer moving the copies of variables after add_site and decommission_site,
+            a SiteRebalancer with its default chunks if not passed
+        cost: CostModel simulating the latency of site accesses, NullCostModel if not passed
 
     Attributes:
-        num_sites: Number of sites
+        num_sites: Number of sites, ids of added sites follow the ids of the initial sites
         num_variables: Number of total variables present
         sites_list : List of all Site objects
+        all_sites : List of all Site objects without the None at index 0 and the decommissioned sites which left,
+                        shared by every caller of get_all_sites
+        retired_site_ids ( Set ) : Ids of the decommissioned sites which left the system
+        site_ids_by_status ( Dict ) : KEY is SiteStatus and VALUE is the set of ids of the sites with that status.
+                        Only changed by fail_sites, recover_site and mark_site_up
+        available_sites : Cached list of UP and RECOVERED Site objects in id order, None when it has to be rebuilt
         site_failure_history ( Dict() ) : KEY is site_id and Value is list of timestamps when the site failed
         site_recover_history ( Dict() ) : KEY is site_id and Value as list of timestamps when the site recovered
         waiting_txn ( Dict( List[] ) ) : KEY as site_id and Values as tuple of (Transaction obj, variable_id) waiting for a read on
                         odd indexed varaible because the site was down
         waiting_txn_even_var ( Dict( Dict() ) : KEY as site_id and inner dict has INNER KEY = variable_id and Values txn obj
                         waiting for a read on even indexed varaible because the site was down
+        pending_read_handler : Callable of the transaction manager noting a pending read served on recovery like
+                        any other read, see TransactionManager.note_pending_read. Set by the transaction manager
         current_time (int) : The global time at this point
     """
 
-    def __init__(self, num_sites, num_variables):
+    def __init__(self, num_sites, num_variables, output=None, dump_writer=None, dump_diff=False, metrics=None, tracer=None, replication=None, placement=None,
+                 rebalancer=None, cost=None):
         # Append None on zero index for easy retreival
         self.num_sites = num_sites
-        self.sites_list = [None] + [Site(i) for i in range(1, num_sites + 1)]
+        self.output = output if output is not None else LoggingSink()
+        self.dump_writer = dump_writer
+        self.dump_diff = dump_diff
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.tracer = tracer if tracer is not None else NullTracer()
+        self.replication = replication if replication is not None else EagerReplication()
+        self.placement = placement if placement is not None else StaticPlacement()
+        self.rebalancer = rebalancer if rebalancer is not None else SiteRebalancer()
+        self.cost = cost if cost is not None else NullCostModel()
+        self.sites_list = [None] + [Site(i, self.output, num_variables) for i in range(1, num_sites + 1)]
+        self.all_sites = self.sites_list[1:]
+        self.retired_site_ids = set()
+        self.site_ids_by_status = {status: set() for status in SiteStatus}
+        self.site_ids_by_status[SiteStatus.UP].update(range(1, num_sites + 1))
+        self.available_sites = None
         self.site_failure_history = dict()
         self.site_recover_history = dict()
         for i in range(1, num_sites + 1):
@@ -46,48 +91,211 @@ class SiteManager:
             self.site_recover_history[i] = [float('inf')]
         self.num_variables = num_variables
         self.waiting_txn = defaultdict(list)
-        def temp_dict():
-            return defaultdict(list)
-        self.waiting_txn_even_var = defaultdict(temp_dict)
+        self.waiting_txn_even_var = defaultdict(partial(defaultdict, list))
+        self.pending_read_handler = None
         self.current_time = 0
 
     def process_instr(self, current_time, instruction):
         """
         Simulator calls this function when the Instruction has to deal with sites.
-        This includes instructions for fail, recover and dump.
+        This includes instructions for fail, recover and dump, the time travel reads R_asof and dump_asof, and
+        add_site() and decommission_site(3) which change the set of sites.
+        dump() takes optional site ids and variable names to dump a subset, e.g. dump(1, 2, x4).
+        R_asof(x4, 5) reads x4 as of time 5, R_asof(x4, 5, 3) reads it from site 3.
+        dump_asof(5) dumps the sites as of time 5 and takes the same optional subset as dump()
 
         Parameters:
             current_time : The global time at this point
             instruction : object of class Instruction, contains the current instruction attributes
+
+        Returns:
+            Result object of the instruction (DumpResult or SiteResult)
+        """
+        with self.metrics.timer("process_instr_seconds", manager="site_manager"):
+            params = instruction.get_params()
+
+            self.current_time = current_time
+
+            if instruction.get_instruction_type() == DUMP_FUNC:
+                # DUMP
+                self.output.emit("info", "Site DUMP from SiteManager")
+                site_ids = [int(param) for param in params if param.isdigit()]
+                variable_ids = [int(param[1:]) for param in params if param.startswith("x")]
+                return self.dump(site_ids or None, variable_ids or None)
+            elif instruction.get_instruction_type() == FAIL_FUNC:
+                # Bring a site down, fail(1, 2, 3) brings several sites down at once
+                if len(params) > 1:
+                    return self.fail_sites([int(param) for param in params])
+                return self.fail_site(int(params[0]))
+            elif instruction.get_instruction_type() == RECOVER_FUNC:
+                # Bring a site UP
+                return self.recover_site(int(params[0]))
+            elif instruction.get_instruction_type() == READ_AS_OF_FUNC:
+                return self.read_as_of(params[0], int(params[1]), int(params[2]) if len(params) > 2 else None)
+            elif instruction.get_instruction_type() == DUMP_AS_OF_FUNC:
+                site_ids = [int(param) for param in params[1:] if param.isdigit()]
+                variable_ids = [int(param[1:]) for param in params[1:] if param.startswith("x")]
+                return self.dump_as_of(int(params[0]), site_ids or None, variable_ids or None)
+            elif instruction.get_instruction_type() == ADD_SITE_FUNC:
+                return self.add_site()
+            elif instruction.get_instruction_type() == DECOMMISSION_SITE_FUNC:
+                return self.decommission_site(int(params[0]))
+            return None
+
+    def get_dump(self, site_ids=None, variable_ids=None, changed_only=False):
+        """
+        Collect the committed values of the sites. Dumped variables are marked clean
+        in the dirty sets of the data managers.
+
+        Parameters:
+            site_ids: List of site ids to dump, all sites if None
+            variable_ids: List of variable ids to dump, all variables if None
+            changed_only: If True, only variables committed since the previous dump are collected
+
+        Returns:
+            DumpResult with KEY as site_id and VALUE as dict of variable_id -> committed value
+        """
+        self.replication.drain(self, self.current_time)
+        sites = {}
+        for i in (site_ids if site_ids is not None else [site.get_id() for site in self.all_sites]):
+            data_manager = self.sites_list[i].get_data_manager()
+            committed_variables = data_manager.get_committed_variables()
+            dirty_variables = data_manager.pop_dirty_variables(variable_ids)
+            if changed_only:
+                keys = dirty_variables
+            elif variable_ids is not None:
+                keys = [key for key in variable_ids if key in committed_variables]
+            else:
+                keys = committed_variables.keys()
+            sites[i] = {key: committed_variables[key].get_value() for key in keys}
+        return DumpResult(sites)
+
+    def dump(self, site_ids=None, variable_ids=None):
+        """
+        Write the dump of the sites to the dump writer if present, otherwise to the output sink
+
+        Parameters:
+            site_ids: List of site ids to dump, all sites if None
+            variable_ids: List of variable ids to dump, all variables if None
+
+        Returns:
+            DumpResult that was written
+        """
+        dump_result = self.get_dump(site_ids, variable_ids, self.dump_diff)
+        if self.dump_writer is not None:
+            self.dump_writer.write(self.current_time, dump_result)
+        else:
+            self.output.dump(dump_result)
+        return dump_result
+
+    def was_up_at(self, site_id, timestamp):
+        """
+        Check if a site was up at a time, using its failure and recovery histories
+
+        Parameters:
+            site_id: ID of the site
+            timestamp: Any past time
+
+        Returns:
+            True if the site was up at timestamp
+        """
+        # The first entries of the histories are placeholders
+        failures = bisect.bisect_right(self.site_failure_history[site_id], timestamp, 1)
+        if failures == 1:
+            return True
+        recoveries = bisect.bisect_right(self.site_recover_history[site_id], timestamp, 1)
+        return recoveries > 1 and self.site_recover_history[site_id][recoveries - 1] >= self.site_failure_history[site_id][failures - 1]
+
+    def as_of_site(self, var_id, timestamp):
+        """
+        Site serving a read of a variable as of a past time: the copy with the latest commit at or before timestamp,
+        as a copy which was down during a commit misses it even once it recovered. Among the copies of that commit,
+        the first site which was up at timestamp
+
+        Parameters:
+            var_id: ID of the variable
+            timestamp: Any past time
+
+        Returns:
+            ID of the site, None if no site stores a value of the variable committed at or before timestamp
+        """
+        best = None
+        for site in self.get_all_sites():
+            variable = site.get_data_manager().get_committed_variables().get(var_id)
+            commit_time = variable.find_time_of_snapshot_as_of(timestamp) if variable is not None else None
+            if commit_time is None:
+                continue
+            key = (commit_time, self.was_up_at(site.get_id(), timestamp))
+            if best is None or key > best[0]:
+                best = (key, site.get_id())
+        return best[1] if best is not None else None
+
+    def read_as_of(self, var_name, timestamp, site_id=None):
+        """
+        Read the value of a variable committed at or before a past time, outside of any transaction
+
+        Parameters:
+            var_name: Name of the variable (x1, x2, etc)
+            timestamp: Any past time
+            site_id: Site to read from. If None, the site chosen by as_of_site
+
+        Returns:
+            AsOfReadResult
         """
-        params = instruction.get_params()
+        var_id = int(var_name[1:])
+        self.replication.drain(self, self.current_time)
+        if site_id is None:
+            site_id = self.as_of_site(var_id, timestamp)
+        value = self.sites_list[site_id].get_data_manager().read_as_of(timestamp, var_id) if site_id is not None else None
+        if value is None:
+            self.output.emit("info", "%s as of time %s : no site can serve the read", var_name, timestamp)
+            return AsOfReadResult(var_name, timestamp)
+        self.output.emit("read_asof", "%s as of time %s : %s (Site %s)", var_name, timestamp, value, site_id,
+                         var=var_name, asof=timestamp, value=value, site=site_id, time=self.current_time)
+        return AsOfReadResult(var_name, timestamp, value, site_id)
+
+    def get_dump_as_of(self, timestamp, site_ids=None, variable_ids=None):
+        """
+        Collect the values of the sites committed at or before a past time. Dirty sets are not changed.
 
-        self.current_time = current_time
+        Parameters:
+            timestamp: Any past time
+            site_ids: List of site ids to dump, all sites if None
+            variable_ids: List of variable ids to dump, all variables if None
 
-        if instruction.get_instruction_type() == DUMP_FUNC:
-            # DUMP
-            log.info("Site DUMP from SiteManager")
-            self.dump()
-        elif instruction.get_instruction_type() == FAIL_FUNC:
-            # Bring a site down
-            self.fail_site(int(params[0]))
-        elif instruction.get_instruction_type() == RECOVER_FUNC:
-            # Bring a site UP
-            self.recover_site(int(params[0]))
-        return
+        Returns:
+            DumpResult with KEY as site_id and VALUE as dict of variable_id -> committed value
+        """
+        self.replication.drain(self, self.current_time)
+        sites = {}
+        for i in (site_ids if site_ids is not None else [site.get_id() for site in self.all_sites]):
+            committed_variables = self.sites_list[i].get_data_manager().get_committed_variables()
+            keys = committed_variables.keys() if variable_ids is None else [key for key in variable_ids if key in committed_variables]
+            sites[i] = {key: committed_variables[key].find_snapshot_as_of(timestamp) for key in keys}
+        return DumpResult(sites)
+
+    def dump_as_of(self, timestamp, site_ids=None, variable_ids=None):
+        """
+        Write the dump of the sites as of a past time to the output sink
 
-    def dump(self):
+        Returns:
+            DumpResult that was written
         """
-        Print the dump of all sites
+        self.output.emit("info", "Site DUMP as of time %s from SiteManager", timestamp)
+        dump_result = self.get_dump_as_of(timestamp, site_ids, variable_ids)
+        self.output.dump(dump_result)
+        return dump_result
+
+    def set_output(self, output):
         """
-        for i in range(1, self.num_sites+1):
-            site = self.sites_list[i]
-            print("\nSite "+str(i)+" -", end = " ")
-            for key, value in site.get_data_manager().get_committed_variables().items():
-                print("x"+str(key)+" : "+str(value.get_value()), end=", ")
-            print()
-        print()
-        return
+        Replace the output sink of the site manager and of the data managers of all sites
+
+        Parameters:
+            output: OutputSink
+        """
+        self.output = output
+        for site in self.get_all_sites():
+            site.data_manager.output = output
 
     def get_site(self, index):
         """
@@ -101,12 +309,150 @@ class SiteManager:
 
     def get_all_sites(self):
         """
-        Returns the list of all sites maintained
+        Returns the list of all sites maintained. The list is shared and must not be modified
+
+        Returns:
+            List of Site object
+        """
+        return self.all_sites
+
+    def get_variable_sites(self, variable_id):
+        """
+        Returns the sites storing a variable in id order. The list may be shared and must not be modified
+
+        Parameters:
+            variable_id: ID of the variable
+
+        Returns:
+            List of Site object
+        """
+        return self.placement.sites_of(self, variable_id)
+
+    def get_service_sites(self):
+        """
+        Returns the sites which are not decommissioned, in id order. New copies are only placed on them
+
+        Returns:
+            List of Site object
+        """
+        return [site for site in self.all_sites if site.get_id() not in self.rebalancer.draining]
+
+    def is_in_service(self, site_id):
+        """
+        Returns:
+            True if the site was not decommissioned
+        """
+        return site_id not in self.rebalancer.draining and site_id not in self.retired_site_ids
+
+    def get_available_sites(self):
+        """
+        Returns the sites which are UP or RECOVERED, in id order. The list is shared and must not be modified
 
         Returns:
             List of Site object
         """
-        return self.sites_list[1:]
+        if self.available_sites is None:
+            available = self.site_ids_by_status[SiteStatus.UP] | self.site_ids_by_status[SiteStatus.RECOVERED]
+            self.available_sites = [self.sites_list[site_id] for site_id in sorted(available)]
+        return self.available_sites
+
+    def has_down_sites(self):
+        """
+        Returns:
+            True if any site is DOWN
+        """
+        return len(self.site_ids_by_status[SiteStatus.DOWN]) > 0
+
+    def is_site_available(self, site_id):
+        """
+        Returns:
+            True if the site is UP or RECOVERED
+        """
+        return site_id not in self.site_ids_by_status[SiteStatus.DOWN]
+
+    def _site_status_changed(self, index, old_status):
+        """
+        Move a site whose status changed to the status set of its new status
+        """
+        self.site_ids_by_status[old_status].discard(index)
+        self.site_ids_by_status[self.sites_list[index].get_status()].add(index)
+        self.available_sites = None
+
+    def mark_site_up(self, index):
+        """
+        Mark a site UP, a RECOVERED site becomes UP once a transaction commits a write on it
+
+        Parameters:
+            index: Index of the site
+        """
+        site = self.sites_list[index]
+        old_status = site.get_status()
+        if old_status != SiteStatus.UP:
+            site.set_status(SiteStatus.UP)
+            self._site_status_changed(index, old_status)
+
+    def add_site(self):
+        """
+        Add an empty UP site. The rebalancer copies variables to it in chunks while transactions keep running
+
+        Returns:
+            SiteResult of the new site
+        """
+        self._start_rebalance()
+        index = self.num_sites + 1
+        site = Site(index, self.output, 0)
+        self.sites_list.append(site)
+        self.num_sites = index
+        self.all_sites = [site for site in self.sites_list[1:] if site.get_id() not in self.retired_site_ids]
+        self.site_ids_by_status[SiteStatus.UP].add(index)
+        self.available_sites = None
+        self.site_failure_history[index] = [0]
+        self.site_recover_history[index] = [float('inf')]
+        self.output.emit("add_site", "Site %s added", str(index), site=index, time=self.current_time)
+        return SiteResult(index, site.get_status())
+
+    def decommission_site(self, index):
+        """
+        Decommission a site. The rebalancer moves its variables to the other sites in chunks while
+        transactions keep running, and the site leaves once they are moved
+
+        Parameters:
+            index: Index of the site
+
+        Returns:
+            SiteResult of the site
+        """
+        if not 1 <= index <= self.num_sites or not self.is_in_service(index):
+            raise ValueError("Site %s is unknown or already decommissioned" % index)
+        if len(self.get_service_sites()) == 1:
+            raise ValueError("The last site can not be decommissioned")
+        self._start_rebalance()
+        self.rebalancer.draining.add(index)
+        self.output.emit("decommission_site", "Site %s decommissioned", str(index), site=index, time=self.current_time)
+        return SiteResult(index, self.sites_list[index].get_status())
+
+    def _start_rebalance(self):
+        """
+        Pin every variable to its sites and queue them for the rebalancer, before the set of sites changes
+        """
+        if self.replication.enabled:
+            raise ValueError("Sites can not be added or decommissioned with lazy replication")
+        self.placement.pin(self)
+        self.rebalancer.plan(self, self.current_time)
+
+    def retire_site(self, index):
+        """
+        Remove a decommissioned site which stores no variable anymore
+
+        Parameters:
+            index: Index of the site
+        """
+        self.retired_site_ids.add(index)
+        self.all_sites = [site for site in self.all_sites if site.get_id() != index]
+        for site_ids in self.site_ids_by_status.values():
+            site_ids.discard(index)
+        self.available_sites = None
+        self.output.emit("info", "Site %s left", str(index))
 
     def add_wait_txn(self, site_id, transaction, variable_id):
         """
@@ -118,6 +464,8 @@ class SiteManager:
             transaction : Transaction Object
         """
         self.waiting_txn[site_id].append([transaction, variable_id])
+        if self.metrics.enabled:
+            self.metrics.observe("wait_queue_depth", self.get_wait_queue_depth(site_id), site=site_id)
 
     def add_wait_txn_even(self, site_id, transaction, variable_id):
         """
@@ -129,6 +477,39 @@ class SiteManager:
             transaction : Transaction Object
         """
         self.waiting_txn_even_var[site_id][variable_id].append(transaction)
+        if self.metrics.enabled:
+            self.metrics.observe("wait_queue_depth", self.get_wait_queue_depth(site_id), site=site_id)
+
+    def get_waiting_variables(self):
+        """
+        Variables on which a transaction waits for a pending read
+
+        Returns:
+            Set of variable ids
+        """
+        variables = set()
+        for records in self.waiting_txn.values():
+            variables.update(var_id for txn, var_id in records if txn.get_status() == TransactionStatus.WAITING)
+        for pending_txns in self.waiting_txn_even_var.values():
+            for var_id, txn_obj_list in pending_txns.items():
+                if any(txn.get_status() == TransactionStatus.WAITING for txn in txn_obj_list):
+                    variables.add(var_id)
+        return variables
+
+    def get_wait_queue_depth(self, site_id):
+        """
+        Number of reads waiting for a site to recover
+
+        Parameters:
+            site_id: ID of the site
+
+        Returns:
+            Number of pending reads on odd and even indexed variables
+        """
+        depth = len(self.waiting_txn[site_id]) if site_id in self.waiting_txn else 0
+        if site_id in self.waiting_txn_even_var:
+            depth += sum(len(txn_list) for txn_list in self.waiting_txn_even_var[site_id].values())
+        return depth
 
     def fail_site(self, index):
         """
@@ -136,10 +517,38 @@ class SiteManager:
 
         Parameters:
             index: Index of the site to be failed
+
+        Returns:
+            SiteResult
         """
-        log.info("Site %s failed",str(index))
-        self.sites_list[index].fail()
-        self.site_failure_history[index].append(self.current_time)
+        return self.fail_sites([index])[0]
+
+    def fail_sites(self, indices):
+        """
+        Fail several sites at the same time, e.g. a whole rack, in one call. The list of available sites
+        is rebuilt once for all of them, when it is needed next
+
+        Parameters:
+            indices: Indices of the sites to be failed
+
+        Returns:
+            List of SiteResult
+        """
+        results = []
+        for index in indices:
+            site = self.sites_list[index]
+            if index in self.retired_site_ids:
+                self.output.emit("info", "Site %s was decommissioned, fail ignored", str(index))
+                results.append(SiteResult(index, site.get_status()))
+                continue
+            self.output.emit("fail", "Site %s failed", str(index), site=index, time=self.current_time)
+            old_status = site.get_status()
+            site.fail()
+            self._site_status_changed(index, old_status)
+            self.site_failure_history[index].append(self.current_time)
+            self.tracer.site("fail", index, self.current_time)
+            results.append(SiteResult(index, site.get_status()))
+        return results
 
     def recover_site(self, index):
         """
@@ -147,23 +556,34 @@ class SiteManager:
 
         Parameters:
             index: Index of the site to be recovered
+
+        Returns:
+            SiteResult containing the pending reads served on recovery
         """
-        log.info("Site %s recovered",str(index))
+        if index in self.retired_site_ids:
+            self.output.emit("info", "Site %s was decommissioned, recover ignored", str(index))
+            return SiteResult(index, self.sites_list[index].get_status())
+        self.output.emit("recover", "Site %s recovered", str(index), site=index, time=self.current_time)
+        old_status = self.sites_list[index].get_status()
         self.sites_list[index].recover()
+        self._site_status_changed(index, old_status)
         self.site_recover_history[index].append(self.current_time)
+        self.tracer.site("recover", index, self.current_time)
+        # Lazy replication : the site applies the commits queued while it was down before serving reads
+        self.replication.catch_up(self, index, self.current_time)
 
         # Even Indexed Variables
         pending_txns = self.waiting_txn_even_var[index]
 
         cleared_variables = []
+        reads = []
 
         for var_id, txn_obj_list in pending_txns.items() :
-            log.info("Executing Pending reads (if any) for even indexed variables as site recovered")
+            self.output.emit("info", "Executing Pending reads (if any) for even indexed variables as site recovered")
             for txn in txn_obj_list :
                 if txn.get_status() == TransactionStatus.WAITING and not(txn.get_status() == TransactionStatus.ABORTED) :
-                    log.info("Txn %s : Reading  x%s from Site %s", txn.get_name(), str(var_id), str(index))
-                    log.info("x%s : %s", str(var_id), self.get_site(index).get_data_manager().find_most_recent_snapshot(txn.get_start_time() ,var_id, txn.get_id()))
-                    txn.set_status(TransactionStatus.RUNNING)
+                    self.output.emit("info", "Txn %s : Reading  x%s from Site %s", txn.get_name(), str(var_id), str(index))
+                    reads.append(self._serve_pending_read(txn, var_id, index))
 
 
             self.waiting_txn_even_var[index][var_id] = []
@@ -173,23 +593,44 @@ class SiteManager:
         for site in self.get_all_sites() :
             to_be_cleared_list = self.waiting_txn_even_var[site.get_id()]
 
-            for index in cleared_variables :
-                if index in to_be_cleared_list.keys():
-                    log.debug("Clearing pending reads list on variable %s from Site %s", index, site.get_id())
-                    self.waiting_txn_even_var[site.get_id()][index] = []
+            for var_id in cleared_variables :
+                if var_id in to_be_cleared_list.keys():
+                    log.debug("Clearing pending reads list on variable %s from Site %s", var_id, site.get_id())
+                    self.waiting_txn_even_var[site.get_id()][var_id] = []
 
         # Odd Indexed Variables
         if index in self.waiting_txn.keys():
             wait_txn_list = self.waiting_txn[index]
-            log.info("Executing Pending reads for odd indexed variables as site recovered")
+            self.output.emit("info", "Executing Pending reads for odd indexed variables as site recovered")
             for record in wait_txn_list:
                 # Site is UP
                 txn = record[0]
                 var_index = record[1]
                 if txn.get_status() == TransactionStatus.WAITING and not(txn.get_status() == TransactionStatus.ABORTED) :
-                    log.info("Txn %s : Reading  x%s ", txn.get_name(), str(var_index))
-                    log.info("x%s : %s", str(var_index), self.get_site(index).get_data_manager().find_most_recent_snapshot(txn.get_start_time() ,var_index, txn.get_id()))
-                    txn.set_status(TransactionStatus.RUNNING)
+                    self.output.emit("info", "Txn %s : Reading  x%s ", txn.get_name(), str(var_index))
+                    reads.append(self._serve_pending_read(txn, var_index, index))
+            self.waiting_txn[index] = []
+
+        return SiteResult(index, self.sites_list[index].get_status(), reads)
+
+    def _serve_pending_read(self, txn, var_id, index):
+        """
+        Serve a pending read of a transaction from a recovered site
+
+        Parameters:
+            txn : Transaction object which was waiting
+            var_id : ID of the variable
+            index : Index of the recovered site
+
+        Returns:
+            ReadResult containing the value read
+        """
+        site = self.get_site(index)
+        value = site.get_data_manager().find_most_recent_snapshot(txn.get_start_time(), var_id, txn.get_id(), txn.get_write_buffer())
+        txn.set_status(TransactionStatus.RUNNING)
+        self.tracer.wakeup(txn.get_id(), "x" + str(var_id), index, self.current_time)
+        # The read is noted like any other read, so validation sees its rw-antidependencies
+        return self.pending_read_handler(txn, var_id, site, value, self.current_time)
 
     def get_site_failure_history(self, index):
         """
@@ -0,0 +1,170 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import json
+
+# Thread id of the row holding site failures and recoveries
+SITES_TID = 0
+
+
+class Tracer:
+    """
+    Records the lifecycle of every transaction with logical timestamps and writes it in
+    Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope). Every transaction is
+    a thread row of its own: a span from begin to commit/abort, spans for waits on down
+    sites and instant events for begin, reads, writes, wakeups and validation phases.
+
+    Parameters:
+        tick_us: Trace microseconds per tick of the global time
+
+    Attributes:
+        events ( List ) : Trace events recorded so far
+        open_txns ( Dict ) : KEY is txn id and VALUE is (name, start_time) of transactions which did not end yet
+        open_waits ( Dict ) : KEY is txn id and VALUE is (start_time, var_name, site ids) of the pending read
+    """
+    enabled = True
+
+    def __init__(self, tick_us=1000):
+        self.tick_us = tick_us
+        self.events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": SITES_TID, "args": {"name": "Sites"}}]
+        self.open_txns = {}
+        self.open_waits = {}
+
+    def _instant(self, tid, name, time, args):
+        self.events.append({"name": name, "ph": "i", "s": "t", "pid": 1, "tid": tid, "ts": time * self.tick_us, "args": args})
+
+    def _span(self, tid, name, start_time, end_time, args):
+        self.events.append({"name": name, "ph": "X", "pid": 1, "tid": tid, "ts": start_time * self.tick_us,
+                            "dur": max(end_time - start_time, 0) * self.tick_us, "args": args})
+
+    def begin(self, txn_id, txn_name, time):
+        """
+        Transaction began
+        """
+        self.open_txns[txn_id] = (txn_name, time)
+        self.events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": txn_id, "args": {"name": txn_name}})
+        self._instant(txn_id, "begin", time, {})
+
+    def read(self, txn_id, var_name, site_id, value, time):
+        """
+        Read served by a site
+        """
+        self._instant(txn_id, "R " + var_name, time, {"site": site_id, "value": value})
+
+    def write(self, txn_id, var_name, value, site_ids, time):
+        """
+        Write recorded on the local copies of site_ids
+        """
+        self._instant(txn_id, "W " + var_name, time, {"value": value, "sites": site_ids})
+
+    def wait(self, txn_id, var_name, site_ids, time):
+        """
+        Read is pending until one of site_ids recovers
+        """
+        self.open_waits[txn_id] = (time, var_name, site_ids)
+        self._instant(txn_id, "wait " + var_name, time, {"sites": site_ids})
+
+    def wakeup(self, txn_id, var_name, site_id, time):
+        """
+        Pending read was served because site_id recovered
+        """
+        self._close_wait(txn_id, time, "served")
+        self._instant(txn_id, "wakeup " + var_name, time, {"site": site_id})
+
+    def _close_wait(self, txn_id, time, outcome):
+        wait = self.open_waits.pop(txn_id, None)
+        if wait is not None:
+            start_time, var_name, site_ids = wait
+            self._span(txn_id, "waiting for " + var_name, start_time, time, {"sites": site_ids, "outcome": outcome})
+
+    def phase(self, txn_id, phase, time, passed):
+        """
+        Validation phase of end() finished
+        """
+        self._instant(txn_id, "validate " + phase, time, {"passed": passed})
+
+    def end(self, txn_id, time, status, reason=None):
+        """
+        Transaction committed or aborted
+        """
+        self._close_wait(txn_id, time, "aborted")
+        txn_name, start_time = self.open_txns.pop(txn_id, ("T" + str(txn_id), time))
+        args = {"status": status}
+        if reason is not None:
+            args["reason"] = reason
+        self._instant(txn_id, status.lower(), time, args)
+        self._span(txn_id, txn_name, start_time, time, args)
+
+    def site(self, event, site_id, time):
+        """
+        Site failed or recovered
+        """
+        self._instant(SITES_TID, event + " site " + str(site_id), time, {"site": site_id})
+
+    def to_dict(self, time=None):
+        """
+        Trace in Chrome trace-event format. Transactions and waits which are still open are closed at time.
+
+        Parameters:
+            time: Current global time, the last event time if None
+
+        Returns:
+            Dict with traceEvents
+        """
+        events = list(self.events)
+        if time is None:
+            time = max([event.get("ts", 0) for event in events] + [0]) // self.tick_us
+        for txn_id, (start_time, var_name, site_ids) in self.open_waits.items():
+            events.append({"name": "waiting for " + var_name, "ph": "X", "pid": 1, "tid": txn_id, "ts": start_time * self.tick_us,
+                           "dur": (time - start_time) * self.tick_us, "args": {"sites": site_ids, "outcome": "open"}})
+        for txn_id, (txn_name, start_time) in self.open_txns.items():
+            events.append({"name": txn_name, "ph": "X", "pid": 1, "tid": txn_id, "ts": start_time * self.tick_us,
+                           "dur": (time - start_time) * self.tick_us, "args": {"status": "RUNNING"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"tick_us": self.tick_us}}
+
+    def write_trace(self, file_path, time=None):
+        """
+        Write the trace to a file
+
+        Parameters:
+            file_path: Output file
+            time: Current global time, the last event time if None
+        """
+        with open(file_path, 'w', encoding='UTF-8') as trace_file:
+            json.dump(self.to_dict(time), trace_file)
+
+
+class NullTracer(Tracer):
+    """
+    Tracer which records nothing. Used when tracing is disabled
+    """
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+
+    def begin(self, txn_id, txn_name, time):
+        return
+
+    def read(self, txn_id, var_name, site_id, value, time):
+        return
+
+    def write(self, txn_id, var_name, value, site_ids, time):
+        return
+
+    def wait(self, txn_id, var_name, site_ids, time):
+        return
+
+    def wakeup(self, txn_id, var_name, site_id, time):
+        return
+
+    def phase(self, txn_id, phase, time, passed):
+        return
+
+    def end(self, txn_id, time, status, reason=None):
+        return
+
+    def site(self, event, site_id, time):
+        return
@@ -23,6 +23,9 @@ class Transaction:
         start_time: Time at which the transaction started
         commit_time: Time at which the transaction committed
         sites_accessed : list of site_id's
+        write_buffer : KEY is variable id and VALUE is (value, ids of the sites it was written to,
+            None or dict of older values of sites which were down for the later writes). Values reach the
+            data managers of the sites only when the transaction commits
 
     """
 
@@ -33,6 +36,7 @@ class Transaction:
         self.start_time = timestamp
         self.sites_accessed = []
         self.commit_time = None
+        self.write_buffer = {}
 
     def get_name(self):
         """
@@ -101,6 +105,83 @@ class Transaction:
         self.sites_accessed.append((site_id, operation, timestamp))
         return
 
+    def buffer_write(self, variable_id, value, site_ids):
+        """
+        Note a write of the transaction in its write buffer. A later write of the same variable
+        replaces the value and adds its sites, sites it skipped keep the older value
+        """
+        entry = self.write_buffer.get(variable_id)
+        if entry is None:
+            self.write_buffer[variable_id] = (value, tuple(site_ids), None)
+            return
+        old_value, written_sites, stale = entry
+        if tuple(site_ids) != written_sites:
+            skipped = [site_id for site_id in written_sites if site_id not in site_ids]
+            if skipped or stale:
+                # Only when a site failed between the writes, the transaction is aborted at end() anyway
+                stale = dict(stale or {})
+                for site_id in skipped:
+                    stale.setdefault(site_id, old_value)
+                for site_id in site_ids:
+                    stale.pop(site_id, None)
+            written_sites = tuple(sorted(set(written_sites).union(site_ids)))
+        elif stale:
+            stale = None
+        self.write_buffer[variable_id] = (value, written_sites, stale or None)
+
+    def retain_write_sites(self, variable_id, site_ids):
+        """
+        Keep the buffered write of a variable only for the given sites, when its other copies are removed
+        """
+        value, written_sites, stale = self.write_buffer[variable_id]
+        written_sites = tuple(site_id for site_id in written_sites if site_id in site_ids)
+        if stale:
+            stale = {site_id: old_value for site_id, old_value in stale.items() if site_id in site_ids}
+        self.write_buffer[variable_id] = (value, written_sites, stale or None)
+
+    def add_write_sites(self, variable_id, site_ids, timestamp):
+        """
+        Extend the buffered write of a variable to new copies placed on the given sites, as if the
+        transaction wrote them at timestamp
+
+        Parameters:
+            variable_id: ID of the variable
+            site_ids: Ids of the sites storing the new copies
+            timestamp: The global time at this point
+        """
+        value, written_sites, stale = self.write_buffer[variable_id]
+        for site_id in site_ids:
+            self.add_sites_accessed(site_id, "W", timestamp)
+        self.write_buffer[variable_id] = (value, tuple(sorted(set(written_sites).union(site_ids))), stale)
+
+    def get_write_buffer(self):
+        """
+        Gets the write buffer of the transaction
+
+        Returns:
+            Dict with KEY as variable id and VALUE as (value, site ids, None or dict of older values per site)
+        """
+        return self.write_buffer
+
+    def get_writes_by_site(self):
+        """
+        Gets the values the transaction wrote to every site
+
+        Returns:
+            Dict with KEY as site id and VALUE as dict with KEY as variable id and VALUE as the written value
+        """
+        writes_by_site = {}
+        for variable_id, (value, site_ids, stale) in self.write_buffer.items():
+            for site_id in site_ids:
+                writes_by_site.setdefault(site_id, {})[variable_id] = stale.get(site_id, value) if stale else value
+        return writes_by_site
+
+    def clear_write_buffer(self):
+        """
+        Drop the buffered writes once the transaction committed or aborted
+        """
+        self.write_buffer = {}
+
     def set_status(self, status):
         """
         Set status of the transaction
@@ -3,17 +3,25 @@ Authors:
 1) Joel Marvin Tellis (jt4680)
 2) Sahil Bakshi (sb8916)
 """
+import bisect
 import logging, copy
-from collections import defaultdict
-from itertools import groupby
+from collections import defaultdict, deque
+from functools import partial
 
 from RepCRec.Transaction import Transaction
+from RepCRec.Result import BeginResult, ReadResult, WriteResult, EndResult
+from RepCRec.enums.AbortReason import AbortReason
+from RepCRec.Analytics import NullAnalytics
+from RepCRec.Scheduler import NullScheduler
 from RepCRec.enums.SiteStatus import SiteStatus
 from RepCRec.enums.TransactionStatus import TransactionStatus
-from RepCRec.constants import BEGIN_FUNC, WRITE_FUNC, READ_FUNC, END_FUNC
+from RepCRec.constants import BEGIN_FUNC, WRITE_FUNC, READ_FUNC, END_FUNC, SCAN_FUNC
 
 log = logging.getLogger(__name__)
 
+# graph : cycle search in the serialization graph, pivot : inConflict/outConflict flags of SSI
+VALIDATION_ENGINES = ["graph", "pivot"]
+
 class TransactionManager:
     """
     Transaction manager class is reponsible for handling transaction level activites. It is also responsible for calling site manager when a transaction commits.
@@ -22,31 +30,71 @@ class TransactionManager:
         num_vars (int): Number of variables
         num_sites (int): Number of sites
         site_manager (class object): Global instance of SiteManager
+        output (OutputSink): Sink for the output events, defaults to the sink of site_manager
+        metrics (Metrics): Instrumentation, defaults to the metrics of site_manager
+        tracer (Tracer): Per transaction event tracer, defaults to the tracer of site_manager
+        analytics (ConflictAnalytics): Conflict hotspot aggregation, NullAnalytics if not passed
+        scheduler (RetryScheduler): Defers end() of waiting transactions, NullScheduler (abort at end) if not passed
+        replication: LazyReplication of site_manager, EagerReplication unless lazy replication is enabled
+        placement: AdaptivePlacement of site_manager, StaticPlacement unless adaptive placement is enabled
+        validation (str): Serializability validation engine from VALIDATION_ENGINES, graph if not passed
 
     Attributes:
         current_time (int) : The global time at this point
         transaction_map (dict): Maps Transaction ID to Transaction class object
+        active_txns (set): IDs of the transactions which began and may not have ended, pruned by rebalance_placement
+                                    and, with the pivot engine, when they end
         transaction_access_history (dict of dict): Helps determine conflict edges as inputs are read.
                                     KEY of outer hashmap is Txn ID and VALUE is inner dict respectively.
                                     Inner dict : KEY is Variable ID and values is list of character containing characters ('R' or 'W')
                                     to check for Read-Write or Write-Write conflicts when another concurrent transaction
                                     modifies the same data afterwards
         serialization_graph (dict of list) : Graph to detect cycles when a transaction commits.
+        in_conflict (set) : pivot engine, IDs of transactions with an incoming rw-antidependency
+        out_conflict (set) : pivot engine, IDs of transactions with an outgoing rw-antidependency
+        var_readers (dict of set) : pivot engine, KEY is Variable ID and VALUE is IDs of transactions that read it
+        var_writers (dict of deque) : pivot engine, KEY is Variable ID and VALUE is (commit time, Txn ID) in commit order
+        rw_out_targets (dict of set) : pivot engine, KEY is Txn ID and VALUE is IDs of committed transactions
+                                    which wrote a variable after the transaction read its older version
+        pivot_committed (deque) : pivot engine, (commit time, Txn ID) of the committed transactions still kept in
+                                    the structures above, in commit order. Aborted transactions are dropped at once
+        pivot_horizon (int) : pivot engine, start time of the oldest transaction which may still end, set by the
+                                    shard router as a shard only knows the transactions which accessed it. Computed
+                                    from active_txns if None
     """
-    def __init__(self, num_vars, num_sites, site_manager):
+    def __init__(self, num_vars, num_sites, site_manager, output=None, metrics=None, tracer=None, analytics=None, scheduler=None, validation="graph"):
         self.number_of_variables = num_vars
         self.number_of_sites = num_sites
         self.transaction_map = dict()
         self.site_manager = site_manager
+        self.output = output if output is not None else site_manager.output
+        self.metrics = metrics if metrics is not None else site_manager.metrics
+        self.tracer = tracer if tracer is not None else site_manager.tracer
+        self.analytics = analytics if analytics is not None else NullAnalytics()
+        self.scheduler = scheduler if scheduler is not None else NullScheduler()
+        self.replication = site_manager.replication
+        self.placement = site_manager.placement
+        self.cost = site_manager.cost
+        site_manager.pending_read_handler = self.note_pending_read
         self.current_time = 0
+        self.active_txns = set()
 
-        def temp_dict():
-            return defaultdict(list)
-        self.transaction_access_history = defaultdict(temp_dict)
+        self.transaction_access_history = defaultdict(partial(defaultdict, list))
 
         self.serialization_graph = defaultdict(list)
         self.V = 0
 
+        if validation not in VALIDATION_ENGINES:
+            raise ValueError("Unknown validation engine " + str(validation))
+        self.validation = validation
+        self.in_conflict = set()
+        self.out_conflict = set()
+        self.var_readers = defaultdict(set)
+        self.var_writers = defaultdict(deque)
+        self.rw_out_targets = defaultdict(set)
+        self.pivot_committed = deque()
+        self.pivot_horizon = None
+
     def addEdge(self, u, v):
         """
         Adds an edge to serialization graph from Node u to Node v
@@ -81,6 +129,30 @@ class TransactionManager:
         recStack[v] = False
         return False
 
+    def find_cycle(self, start):
+        """
+        Find a cycle through node start in serialization graph
+
+        Returns:
+            List of nodes on the cycle beginning with start, empty list if there is none
+        """
+        path = [start]
+        visited = {start}
+        stack = [iter(self.serialization_graph.get(start, []))]
+        while stack:
+            for neighbour in stack[-1]:
+                if neighbour == start:
+                    return path
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    path.append(neighbour)
+                    stack.append(iter(self.serialization_graph.get(neighbour, [])))
+                    break
+            else:
+                stack.pop()
+                path.pop()
+        return []
+
     def isCyclic(self):
         """
         Detect Cycle in serialization graph
@@ -106,24 +178,37 @@ class TransactionManager:
         Parameters:
             current_time : The global time at this point
             instruction : object of class Instruction, contains the current instruction attributes
+
+        Returns:
+            Result object of the instruction (BeginResult, ReadResult, WriteResult or EndResult), a list of
+            ReadResult or WriteResult for batched reads and writes and scans, None if invalid
         """
-        self.current_time = current_time
-        params = instruction.get_params()
-
-        if instruction.get_instruction_type() == BEGIN_FUNC:
-            # being()
-            self.begin(params)
-        elif instruction.get_instruction_type() == READ_FUNC:
-            # read()
-            self.read_req(params)
-        elif instruction.get_instruction_type() == WRITE_FUNC:
-            # write()
-            self.write_req(params)
-        elif instruction.get_instruction_type() == END_FUNC:
-            # end()
-            self.end_txn(params)
-        else:
-            log.info("Invalid Instruction in Transaction Manager")
+        with self.metrics.timer("process_instr_seconds", manager="transaction_manager"):
+            self.current_time = current_time
+            params = instruction.get_params()
+
+            if instruction.get_instruction_type() == BEGIN_FUNC:
+                # being()
+                return self.begin(params)
+            elif instruction.get_instruction_type() == READ_FUNC:
+                # read(), R(T1, x1, x2, x7) reads several variables
+                if len(params) > 2:
+                    return self.read_batch(params)
+                return self.read_req(params)
+            elif instruction.get_instruction_type() == WRITE_FUNC:
+                # write(), W(T1, x2=5, x4=9) writes several variables
+                if "=" in params[1]:
+                    return self.write_batch(params)
+                return self.write_req(params)
+            elif instruction.get_instruction_type() == SCAN_FUNC:
+                # scan(), S(T1, x1, x100) reads x1 to x100
+                return self.scan(params)
+            elif instruction.get_instruction_type() == END_FUNC:
+                # end()
+                return self.end_txn(params)
+            else:
+                self.output.emit("info", "Invalid Instruction in Transaction Manager")
+                return None
 
     def begin(self, params):
         """
@@ -132,12 +217,301 @@ class TransactionManager:
 
         Parameters:
             params : list of parameters of the parsed instruction, containing instruction name
+
+        Returns:
+            BeginResult
         """
-        log.info("Starting %s", params[0])
+        self.output.emit("begin", "Starting %s", params[0], txn=params[0], time=self.current_time)
         txn_name =  params[0]
         txn_index = int(txn_name[1:])
         self.transaction_map[txn_index] = Transaction(txn_index, params[0], self.current_time)
-        return
+        self.active_txns.add(txn_index)
+        self.tracer.begin(txn_index, txn_name, self.current_time)
+        return BeginResult(txn_name, self.current_time)
+
+    def _serve_read(self, txn_obj, var_name, var_index, site):
+        """
+        Reads the value of a variable visible to the transaction from a site and notes the access
+
+        Parameters:
+            txn_obj : Transaction object
+            var_name : Name of the variable
+            var_index : ID of the variable
+            site : Site object serving the read
+
+        Returns:
+            ReadResult containing the value read
+        """
+        value = site.get_data_manager().find_most_recent_snapshot(txn_obj.get_start_time(), var_index, txn_obj.get_id(), txn_obj.get_write_buffer())
+        return self._note_read(txn_obj, var_name, var_index, site, value)
+
+    def _note_read(self, txn_obj, var_name, var_index, site, value, accessed=None):
+        """
+        Write out a value read by the transaction and note the access
+
+        Parameters:
+            txn_obj : Transaction object
+            var_name : Name of the variable
+            var_index : ID of the variable
+            site : Site object which served the read
+            value : Value read
+            accessed : If passed, the id of the site is added to it instead of the sites accessed by the transaction
+
+        Returns:
+            ReadResult containing the value read
+        """
+        self.output.emit("read", "%s : %s", var_name, value, txn=txn_obj.get_name(), var=var_name, value=value, site=site.get_id(), time=self.current_time)
+        self.cost.read(txn_obj.get_id(), site.get_id(), self.current_time)
+        # Note that T accessed var:R
+        self.transaction_access_history[txn_obj.get_id()][var_index].append("R")
+        self.placement.record_read(var_index)
+        # Note that T accessed this site
+        if accessed is None:
+            txn_obj.add_sites_accessed(site.get_id(), "R", self.current_time)
+        else:
+            accessed.add(site.get_id())
+        self.tracer.read(txn_obj.get_id(), var_name, site.get_id(), value, self.current_time)
+        if self.validation == "pivot":
+            self._pivot_read(txn_obj, var_index)
+        return ReadResult(txn_obj.get_name(), var_name, TransactionStatus.RUNNING, value, site.get_id())
+
+    def note_pending_read(self, txn_obj, var_index, site, value, current_time):
+        """
+        Note a pending read served by a recovered site, called by the site manager on recovery
+
+        Parameters:
+            txn_obj : Transaction object which was waiting
+            var_index : ID of the variable
+            site : Site object of the recovered site
+            value : Value read
+            current_time : The global time at this point
+
+        Returns:
+            ReadResult containing the value read
+        """
+        self.current_time = current_time
+        return self._note_read(txn_obj, "x" + str(var_index), var_index, site, value)
+
+    def _pivot_read(self, txn_obj, var_index):
+        """
+        pivot engine: note the read and flag the rw-antidependencies to transactions which already
+        committed a newer version of the variable than the one T reads
+
+        Parameters:
+            txn_obj : Transaction object of the reader
+            var_index : ID of the variable
+        """
+        txn_index = txn_obj.get_id()
+        self.var_readers[var_index].add(txn_index)
+        for commit_time, writer in reversed(self.var_writers.get(var_index, ())):
+            if commit_time <= txn_obj.get_start_time():
+                break
+            self.out_conflict.add(txn_index)
+            self.in_conflict.add(writer)
+            self.rw_out_targets[txn_index].add(writer)
+
+    def _find_even_read_site(self, txn_obj, var_name, var_index, clean_sites=None):
+        """
+        Find the site that can serve a read of an even indexed (replicated) variable
+
+        Parameters:
+            txn_obj : Transaction object
+            var_name : Name of the variable
+            var_index : ID of the variable
+            clean_sites : Ids of the sites which can serve every read of the transaction, checked per variable if None
+
+        Returns:
+            Tuple of (Site object which can serve the read or None, list of ids of DOWN sites the read can wait on)
+        """
+        txn_name = txn_obj.get_name()
+        sites_to_be_added_for_wait = []
+        lagging_sites = []
+        for site in self.placement.read_order(self.site_manager, var_index):
+            # Adaptive placement : a copy placed for younger transactions can not serve T, failures before it was placed do not count
+            if txn_obj.get_start_time() < self.placement.valid_from(var_index, site.get_id()):
+                continue
+            placed_at = self.placement.placed_at(var_index, site.get_id())
+            if not self.replication.is_visible(site.get_id(), txn_obj.get_start_time()):
+                if site.get_status() == SiteStatus.DOWN:
+                    # Lazy replication : a DOWN site applies its queued commits before it serves pending reads
+                    self.replication.catch_up(self.site_manager, site.get_id(), self.current_time, txn_obj.get_start_time())
+                else:
+                    # Lazy replication : the watermark of the site is older than T, other sites are tried first
+                    lagging_sites.append(site)
+                    continue
+
+            if clean_sites is not None and site.get_id() in clean_sites:
+                self.output.emit("info", "Txn %s : Reading  %s from Site %s", txn_name, var_name, site.get_id())
+                return site, []
+            if site.get_status() == SiteStatus.UP or site.get_status() == SiteStatus.RECOVERED :
+                if self._can_serve_even_read(txn_obj, var_name, var_index, site):
+                    return site, []
+            elif site.get_status() == SiteStatus.DOWN :
+                # Site is currently down. Check if we need to wait
+                log.debug("Site %s DOWN. Checking if Read op can be put into Pending ...", site.get_id())
+                # Check 1 : site s was up all the time between the time when xi was committed and T began.
+                log.debug("CHECK 1 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
+                time_var_last_committed = site.get_data_manager().get_committed_variable_before_time(txn_obj.get_start_time(), var_index)
+
+                # Failure History for this site
+                failure_history = self.site_manager.get_site_failure_history(site.get_id())
+
+                flg_case_1 = False
+
+                for fail_time in failure_history :
+                    if fail_time > time_var_last_committed and fail_time > placed_at and fail_time < txn_obj.get_start_time():
+                        # Site failed between the time xi was committed and T began. T can abort
+                        log.debug("Site %s failed btw time when %s was committed and %s began . Going to next site", site.get_id(), var_name, txn_name)
+                        flg_case_1 = True
+                        break
+
+                if flg_case_1:
+                    continue
+
+                # At this Stage -> We are sure this site did not fail between the time xi was committed and the T began()
+
+                # Check 2 : A read from a transaction that begins after the recovery of site s for a replicated variable x will not be allowed at s until a committed write to x takes place on s.
+                log.debug("CHECK 2 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
+
+                # Recovery History for this site
+                entire_recover_history = self.site_manager.get_site_recover_history(site.get_id())
+                if len(entire_recover_history) == 1:
+                    # Site never failed yet(till this current_time) and hence never had to recover
+                    # Add txn read to pending state for this site
+                    self.output.emit("info", "Txn %s has to be added for Pending Reading on %s from Site %s", txn_name, var_name, site.get_id())
+                    sites_to_be_added_for_wait.append(site.get_id())
+                    # self.site_manager.add_wait_txn_even(site.get_id(), self.transaction_map[int(txn_name[1:])], var_index)
+                    continue
+
+                # At this stage -> we have some recovery history for this site
+                # Remove the first float('inf') value from history
+                entire_recover_history = entire_recover_history[1:]
+
+                recover_history_before_T_began = []
+
+                for t in entire_recover_history:
+                    if t <= placed_at:
+                        continue
+                    if t < txn_obj.get_start_time() :
+                        recover_history_before_T_began.append(t)
+                    else:
+                        break
+
+                # Now we have list of timestamps when the site failed before T began
+
+                # Now we check if there was a write committed to xi at this site after the last timestamp in recover_history_before_T_began
+                flg = True
+                if len(recover_history_before_T_began) == 0:
+                    # site never failed before T began and hence never had to recover before T began
+                    log.debug("Site %s never failed before %s began", site.get_id(), txn_name)
+                    pass
+                else:
+                    log.debug("Checking if Write was committed on %s at Site %s ....", var_name, site.get_id())
+                    flg = site.get_data_manager().check_commit_btw_time_range(recover_history_before_T_began[-1], txn_obj.get_start_time(), var_index)
+
+                if flg:
+                    # write was committed and hence T can read xi value from this site
+
+                    # Add txn read to pending state for this site
+                    self.output.emit("info", "Txn %s has to be added for Pending Reading on %s from Site %s. Not Added yet", txn_name, var_name, site.get_id())
+                    sites_to_be_added_for_wait.append(site.get_id())
+                    # self.site_manager.add_wait_txn_even(site.get_id(), self.transaction_map[int(txn_name[1:])], var_index)
+                    continue
+                else:
+                    # Look for another site
+                    log.debug("Write was not committed on %s at Site %s between recovery and %s began. Looking for next site", var_name, site.get_id(), txn_name)
+                    continue
+
+        for site in lagging_sites:
+            # No site with a recent enough watermark can serve the read, a lagging site catches up first
+            self.replication.catch_up(self.site_manager, site.get_id(), self.current_time, txn_obj.get_start_time())
+            if self._can_serve_even_read(txn_obj, var_name, var_index, site):
+                return site, []
+        return None, sites_to_be_added_for_wait
+
+    def _can_serve_even_read(self, txn_obj, var_name, var_index, site):
+        """
+        Check if an UP or RECOVERED site can serve a read of an even indexed (replicated) variable
+
+        Parameters:
+            txn_obj : Transaction object
+            var_name : Name of the variable
+            var_index : ID of the variable
+            site : Site object
+
+        Returns:
+            True if the site can serve the read
+        """
+        txn_name = txn_obj.get_name()
+        placed_at = self.placement.placed_at(var_index, site.get_id())
+        # Check 1 : site s was up all the time between the time when xi was committed and T began.
+        log.debug("CHECK 1 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
+        time_var_last_committed = site.get_data_manager().get_committed_variable_before_time(txn_obj.get_start_time(), var_index)
+
+        # Failure History for this site
+        failure_history = self.site_manager.get_site_failure_history(site.get_id())
+
+        flg_case_1 = False
+
+        for fail_time in failure_history :
+            if fail_time > time_var_last_committed and fail_time > placed_at and fail_time < txn_obj.get_start_time():
+                # Site failed between the time xi was committed and T began. T can abort
+                log.debug("Site %s failed btw time when %s was committed and %s began . Going to next site", site.get_id(), var_name, txn_name)
+                flg_case_1 = True
+                break
+
+        if flg_case_1:
+            return False
+
+        # At this Stage -> We are sure this site did not fail between the time xi was committed and the T began()
+
+        # Check 2 : A read from a transaction that begins after the recovery of site s for a replicated variable x will not be allowed at s until a committed write to x takes place on s.
+        log.debug("CHECK 2 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
+
+        # Recovery History for this site
+        entire_recover_history = self.site_manager.get_site_recover_history(site.get_id())
+        if len(entire_recover_history) == 1:
+            # Site never failed yet(till this current_time) and hence never had to recover
+            log.debug("Site %s never failed till this time", site.get_id())
+            self.output.emit("info", "Txn %s : Reading  %s from Site %s", txn_name, var_name, site.get_id())
+            return True
+
+        # At this stage -> we have some recovery history for this site
+        # Remove the first float('inf') value from history
+        entire_recover_history = entire_recover_history[1:]
+
+        recover_history_before_T_began = []
+
+        for t in entire_recover_history:
+            if t <= placed_at:
+                continue
+            if t < txn_obj.get_start_time() :
+                recover_history_before_T_began.append(t)
+            else:
+                break
+
+        # Now we have list of timestamps when the site failed before T began
+
+        # Now we check if there was a write committed to xi at this site after the last timestamp in recover_history_before_T_began
+        flg = True
+        if len(recover_history_before_T_began) == 0:
+            # site never failed before T began and hence never had to recover before T began
+            log.debug("Site %s never failed before %s began", site.get_id(), txn_name)
+            pass
+        else:
+            log.debug("Checking if Write was committed on %s at Site %s ....", var_name, site.get_id())
+            flg = site.get_data_manager().check_commit_btw_time_range(recover_history_before_T_began[-1], txn_obj.get_start_time(), var_index)
+
+        if flg:
+            # write was committed and hence T can read xi value from this site
+            log.debug("Write was committed on %s at Site %s between recovery and %s began", var_name, site.get_id(), txn_name)
+            self.output.emit("info", "Txn %s : Reading  %s from Site %s", txn_name, var_name, site.get_id())
+            return True
+        else:
+            # Look for another site
+            log.debug("Write was not committed on %s at Site %s between recovery and %s began. Looking for next site", var_name, site.get_id(), txn_name)
+            return False
+
 
     def read_req(self, params):
         """
@@ -145,6 +519,9 @@ class TransactionManager:
 
         Parameters:
             params : list of parameters of the parsed instruction, containing instruction name, variable name
+
+        Returns:
+            ReadResult
         """
         txn_name =  params[0]
         txn_index = int(txn_name[1:])
@@ -152,202 +529,219 @@ class TransactionManager:
 
         var_name = params[1]
         var_index = int(var_name[1:])
+        return self._read(txn_obj, var_name, var_index)
 
-        if var_index % 2 == 0 :
-            # Even indexed variable - Available at all sites
-            sites_to_be_added_for_wait = []
-            for site in self.site_manager.get_all_sites():
-                if site.get_status() == SiteStatus.UP or site.get_status() == SiteStatus.RECOVERED :
-                    # Check 1 : site s was up all the time between the time when xi was committed and T began.
-                    log.debug("CHECK 1 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
-                    time_var_last_committed = site.get_data_manager().get_committed_variable_before_time(txn_obj.get_start_time(), var_index)
-
-                    # Failure History for this site
-                    failure_history = self.site_manager.get_site_failure_history(site.get_id())
-
-                    flg_case_1 = False
-
-                    for fail_time in failure_history :
-                        if fail_time > time_var_last_committed and fail_time < txn_obj.get_start_time():
-                            # Site failed between the time xi was committed and T began. T can abort
-                            log.debug("Site %s failed btw time when %s was committed and %s began . Going to next site", site.get_id(), var_name, txn_name)
-                            flg_case_1 = True
-                            break
-
-                    if flg_case_1:
-                        continue
+    def read_batch(self, params):
+        """
+        Method to handle a batched read instruction, e.g. R(T1, x1, x2, x7). The variables are read in order
+        at one tick, with the same results as one R instruction per variable. The sites which can serve
+        every read of the transaction are found once for the whole batch
 
-                    # At this Stage -> We are sure this site did not fail between the time xi was committed and the T began()
-
-                    # Check 2 : A read from a transaction that begins after the recovery of site s for a replicated variable x will not be allowed at s until a committed write to x takes place on s.
-                    log.debug("CHECK 2 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
-
-                    # Recovery History for this site
-                    entire_recover_history = self.site_manager.get_site_recover_history(site.get_id())
-                    if len(entire_recover_history) == 1:
-                        # Site never failed yet(till this current_time) and hence never had to recover
-                        log.debug("Site %s never failed till this time", site.get_id())
-                        sites_to_be_added_for_wait = []
-                        log.info("Txn %s : Reading  %s from Site %s", txn_name, var_name, site.get_id())
-                        log.info("%s : %s", var_name, site.get_data_manager().find_most_recent_snapshot(txn_obj.get_start_time() ,var_index, txn_obj.get_id()))
-                        # Note that T accessed var:R
-                        self.transaction_access_history[txn_index][var_index].append("R")
-                        # Note that T accessed this site
-                        self.transaction_map[txn_index].add_sites_accessed(site.get_id(), "R", self.current_time)
-                        return
-
-                    # At this stage -> we have some recovery history for this site
-                    # Remove the first float('inf') value from history
-                    entire_recover_history = entire_recover_history[1:]
-
-                    recover_history_before_T_began = []
-
-                    for t in entire_recover_history:
-                        if t < txn_obj.get_start_time() :
-                            recover_history_before_T_began.append(t)
-                        else:
-                            break
-
-                    # Now we have list of timestamps when the site failed before T began
-
-                    # Now we check if there was a write committed to xi at this site after the last timestamp in recover_history_before_T_began
-                    flg = True
-                    if len(recover_history_before_T_began) == 0:
-                        # site never failed before T began and hence never had to recover before T began
-                        log.debug("Site %s never failed before %s began", site.get_id(), txn_name)
-                        pass
-                    else:
-                        log.debug("Checking if Write was committed on %s at Site %s ....", var_name, site.get_id())
-                        flg = site.get_data_manager().check_commit_btw_time_range(recover_history_before_T_began[-1], txn_obj.get_start_time(), var_index)
-
-                    if flg:
-                        # write was committed and hence T can read xi value from this site
-                        log.debug("Write was committed on %s at Site %s between recovery and %s began", var_name, site.get_id(), txn_name)
-                        sites_to_be_added_for_wait = []
-                        log.info("Txn %s : Reading  %s from Site %s", txn_name, var_name, site.get_id())
-                        log.info("%s : %s", var_name, site.get_data_manager().find_most_recent_snapshot(txn_obj.get_start_time() ,var_index, txn_obj.get_id()))
-                        # Note that T accessed var:R
-                        self.transaction_access_history[txn_index][var_index].append("R")
-                        # Note that T accessed this site
-                        self.transaction_map[txn_index].add_sites_accessed(site.get_id(), "R", self.current_time)
-                        return
-                    else:
-                        # Look for another site
-                        log.debug("Write was not committed on %s at Site %s between recovery and %s began. Looking for next site", var_name, site.get_id(), txn_name)
-                        continue
+        Parameters:
+            params : list of parameters of the parsed instruction, containing the transaction name and variable names
 
-                elif site.get_status() == SiteStatus.DOWN :
-                    # Site is currently down. Check if we need to wait
-                    log.debug("Site %s DOWN. Checking if Read op can be put into Pending ...", site.get_id())
-                    # Check 1 : site s was up all the time between the time when xi was committed and T began.
-                    log.debug("CHECK 1 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
-                    time_var_last_committed = site.get_data_manager().get_committed_variable_before_time(txn_obj.get_start_time(), var_index)
+        Returns:
+            List of ReadResult in variable order
+        """
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        clean_sites = self._clean_read_sites(txn_obj)
+        return [self._read(txn_obj, var_name, int(var_name[1:]), clean_sites) for var_name in params[1:]]
 
-                    # Failure History for this site
-                    failure_history = self.site_manager.get_site_failure_history(site.get_id())
+    def scan(self, params):
+        """
+        Method to handle a scan instruction, e.g. S(T1, x1, x100). Every variable from the first to the last
+        is read as of the start of the transaction, in id order at one tick, with the same results as
+        R(T1, x1, x2, ..., x100). The available copies checks of every site are prepared once for the scan
+        (see _read_site_checks) and the serving site of each variable is picked first, then the snapshots
+        are looked up data manager by data manager, each one in variable id order. Variables without a
+        serving site, e.g. the ones R() would try on a DOWN site first, are read like R() does, so they can wait or abort
+        the transaction
 
-                    flg_case_1 = False
+        Parameters:
+            params : list of parameters of the parsed instruction, containing the transaction name, first and last variable names
 
-                    for fail_time in failure_history :
-                        if fail_time > time_var_last_committed and fail_time < txn_obj.get_start_time():
-                            # Site failed between the time xi was committed and T began. T can abort
-                            log.debug("Site %s failed btw time when %s was committed and %s began . Going to next site", site.get_id(), var_name, txn_name)
-                            flg_case_1 = True
-                            break
+        Returns:
+            List of ReadResult in variable order
+        """
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        first = max(int(params[1][1:]), 1)
+        last = min(int(params[2][1:]), self.number_of_variables)
+        start_time = txn_obj.get_start_time()
+        site_checks = self._read_site_checks(txn_obj)
+        clean_sites = {site_id for site_id, (last_failure, _) in site_checks.items() if last_failure is None}
+
+        # Pick the serving sites, None for the variables read like R() does
+        serving = [self._scan_site(txn_obj, var_index, site_checks) for var_index in range(first, last + 1)]
+        by_site = defaultdict(list)
+        for var_index, site in enumerate(serving, first):
+            if site is not None:
+                by_site[site].append(var_index)
+        values = {}
+        for site, variable_ids in by_site.items():
+            values.update(zip(variable_ids, site.get_data_manager().scan(start_time, variable_ids)))
+
+        write_buffer = txn_obj.get_write_buffer()
+        txn_name = txn_obj.get_name()
+        accessed = set()
+        results = []
+        for var_index, site in enumerate(serving, first):
+            var_name = "x%s" % var_index
+            if site is None:
+                results.append(self._read(txn_obj, var_name, var_index, clean_sites))
+                continue
+            if not self.placement.is_replicated(var_index):
+                self.output.emit("info", "Txn %s : Reading  %s ", txn_name, var_name)
+            else:
+                self.output.emit("info", "Txn %s : Reading  %s from Site %s", txn_name, var_name, site.get_id())
+            value = values[var_index]
+            if var_index in write_buffer:
+                # T wrote the variable, it may read its own write
+                value = site.get_data_manager().find_most_recent_snapshot(start_time, var_index, txn_obj.get_id(), write_buffer)
+            results.append(self._note_read(txn_obj, var_name, var_index, site, value, accessed))
+        for site_id in sorted(accessed):
+            txn_obj.add_sites_accessed(site_id, "R", self.current_time)
+        return results
+
+    def _scan_site(self, txn_obj, var_index, site_checks):
+        """
+        Site a scan reads a variable from, the one R() would read it from, found without the per variable scans
+        of the failure and recovery histories
 
-                    if flg_case_1:
-                        continue
+        Parameters:
+            txn_obj : Transaction object
+            var_index : ID of the variable
+            site_checks : See _read_site_checks
 
-                    # At this Stage -> We are sure this site did not fail between the time xi was committed and the T began()
+        Returns:
+            Site object, None if the variable has to be read like R() does
+        """
+        if not self.placement.is_replicated(var_index):
+            site = self.site_manager.get_variable_sites(var_index)[0]
+            return site if site.get_status() == SiteStatus.UP else None
+        start_time = txn_obj.get_start_time()
+        for site in self.placement.read_order(self.site_manager, var_index):
+            site_id = site.get_id()
+            if start_time < self.placement.valid_from(var_index, site_id):
+                continue
+            if not self.replication.is_visible(site_id, start_time):
+                return None
+            if site_id not in site_checks:
+                # DOWN site, R() may note it for a pending read
+                return None
+            last_failure, last_recovery = site_checks[site_id]
+            if last_failure is None:
+                return site
+            if self.placement.placed_at(var_index, site_id):
+                return None
+            # Check 1 : no failure between the last commit of xi before T began and T began
+            # Check 2 : xi was committed between the last recovery before T began and T began
+            last_commit = site.get_data_manager().get_committed_variable_before_time(start_time, var_index)
+            if last_failure <= last_commit and (last_recovery is None or last_recovery < last_commit):
+                return site
+        return None
+
+    def _read_site_checks(self, txn_obj):
+        """
+        Last failure and last recovery before the transaction began of every UP or RECOVERED site,
+        which decide Check 1 and Check 2 of the available copies rules for all variables of the site
 
-                    # Check 2 : A read from a transaction that begins after the recovery of site s for a replicated variable x will not be allowed at s until a committed write to x takes place on s.
-                    log.debug("CHECK 2 for Reading %s from Site %s by Txn %s", var_name, site.get_id(), txn_name)
+        Parameters:
+            txn_obj : Transaction object
 
-                    # Recovery History for this site
-                    entire_recover_history = self.site_manager.get_site_recover_history(site.get_id())
-                    if len(entire_recover_history) == 1:
-                        # Site never failed yet(till this current_time) and hence never had to recover
-                        # Add txn read to pending state for this site
-                        log.info("Txn %s has to be added for Pending Reading on %s from Site %s", txn_name, var_name, site.get_id())
-                        sites_to_be_added_for_wait.append(site.get_id())
-                        # self.site_manager.add_wait_txn_even(site.get_id(), self.transaction_map[int(txn_name[1:])], var_index)
-                        continue
+        Returns:
+            Dict with KEY as site id and VALUE as (time of the last failure, time of the last recovery), None if there was none
+        """
+        start_time = txn_obj.get_start_time()
+        site_checks = {}
+        for site in self.site_manager.get_available_sites():
+            # The first entries of the histories are placeholders
+            failure_history = self.site_manager.get_site_failure_history(site.get_id())
+            recover_history = self.site_manager.get_site_recover_history(site.get_id())
+            failures = bisect.bisect_left(failure_history, start_time, 1)
+            recoveries = bisect.bisect_left(recover_history, start_time, 1)
+            site_checks[site.get_id()] = (failure_history[failures - 1] if failures > 1 else None,
+                                          recover_history[recoveries - 1] if recoveries > 1 else None)
+        return site_checks
+
+    def _clean_read_sites(self, txn_obj):
+        """
+        Sites which are UP or RECOVERED and did not fail before the transaction began. Check 1 and
+        Check 2 of the available copies rules pass on them for every variable
 
-                    # At this stage -> we have some recovery history for this site
-                    # Remove the first float('inf') value from history
-                    entire_recover_history = entire_recover_history[1:]
+        Parameters:
+            txn_obj : Transaction object
 
-                    recover_history_before_T_began = []
+        Returns:
+            Set of site ids
+        """
+        start_time = txn_obj.get_start_time()
+        # The first entry of a failure history is a placeholder
+        return {site.get_id() for site in self.site_manager.get_available_sites()
+                if bisect.bisect_left(self.site_manager.get_site_failure_history(site.get_id()), start_time, 1) == 1}
 
-                    for t in entire_recover_history:
-                        if t < txn_obj.get_start_time() :
-                            recover_history_before_T_began.append(t)
-                        else:
-                            break
+    def _read(self, txn_obj, var_name, var_index, clean_sites=None):
+        """
+        Read a variable in a transaction
 
-                    # Now we have list of timestamps when the site failed before T began
+        Parameters:
+            txn_obj : Transaction object
+            var_name : Name of the variable
+            var_index : ID of the variable
+            clean_sites : Ids of the sites which can serve every read of the transaction, see _clean_read_sites
 
-                    # Now we check if there was a write committed to xi at this site after the last timestamp in recover_history_before_T_began
-                    flg = True
-                    if len(recover_history_before_T_began) == 0:
-                        # site never failed before T began and hence never had to recover before T began
-                        log.debug("Site %s never failed before %s began", site.get_id(), txn_name)
-                        pass
-                    else:
-                        log.debug("Checking if Write was committed on %s at Site %s ....", var_name, site.get_id())
-                        flg = site.get_data_manager().check_commit_btw_time_range(recover_history_before_T_began[-1], txn_obj.get_start_time(), var_index)
+        Returns:
+            ReadResult
+        """
+        txn_name = txn_obj.get_name()
+        txn_index = txn_obj.get_id()
 
-                    if flg:
-                        # write was committed and hence T can read xi value from this site
+        if self.placement.is_replicated(var_index) :
+            # Even indexed variable - Available at all sites
+            start = self.metrics.clock()
+            site, sites_to_be_added_for_wait = self._find_even_read_site(txn_obj, var_name, var_index, clean_sites)
+            self.metrics.observe_time("phase_seconds", start, phase="read_eligibility")
+            if site is not None:
+                return self._serve_read(txn_obj, var_name, var_index, site)
 
-                        # Add txn read to pending state for this site
-                        log.info("Txn %s has to be added for Pending Reading on %s from Site %s. Not Added yet", txn_name, var_name, site.get_id())
-                        sites_to_be_added_for_wait.append(site.get_id())
-                        # self.site_manager.add_wait_txn_even(site.get_id(), self.transaction_map[int(txn_name[1:])], var_index)
-                        continue
-                    else:
-                        # Look for another site
-                        log.debug("Write was not committed on %s at Site %s between recovery and %s began. Looking for next site", var_name, site.get_id(), txn_name)
-                        continue
             # No Site could service the READ
             # Check if there were any sites that could be added for Pending READs
             if len(sites_to_be_added_for_wait) > 0 :
                 for site_id in sites_to_be_added_for_wait :
-                    log.info("Adding Txn %s for Pending Reading on %s from Site %s ...", txn_name, var_name, site_id)
+                    self.output.emit("wait", "Adding Txn %s for Pending Reading on %s from Site %s ...", txn_name, var_name, site_id, txn=txn_name, var=var_name, site=site_id, time=self.current_time)
                     self.site_manager.add_wait_txn_even(site_id, self.transaction_map[int(txn_name[1:])], var_index)
                     txn_obj.set_status(TransactionStatus.WAITING)
+                self.tracer.wait(txn_index, var_name, sites_to_be_added_for_wait, self.current_time)
+                return ReadResult(txn_name, var_name, TransactionStatus.WAITING)
             else:
-                log.info("Txn %s : Reading  %s FAILED AS NO VALID SITE FOUND", txn_name, var_name)
-                log.info("Txn %s : ABORTING as READ failed", txn_name)
+                self.output.emit("info", "Txn %s : Reading  %s FAILED AS NO VALID SITE FOUND", txn_name, var_name)
+                self.output.emit("abort", "Txn %s : ABORTING as READ failed", txn_name, txn=txn_name, reason=AbortReason.READ_FAILED.name, time=self.current_time)
                 txn_obj.set_status(TransactionStatus.ABORTED)
+                self.metrics.inc("aborts_total", reason=AbortReason.READ_FAILED.name)
+                self.tracer.end(txn_index, self.current_time, TransactionStatus.ABORTED.name, AbortReason.READ_FAILED.name)
+                self.analytics.abort(AbortReason.READ_FAILED)
+                return ReadResult(txn_name, var_name, TransactionStatus.ABORTED, reason=AbortReason.READ_FAILED)
 
         else:
             # Odd Indexed variable - Only available at one site
-            target_site_index = 1 + var_index % 10
-            target_site = self.site_manager.get_site(target_site_index)
+            target_site = self.site_manager.get_variable_sites(var_index)[0]
+            target_site_index = target_site.get_id()
 
             if target_site.get_status() == SiteStatus.UP:
                 # Site is UP
-                log.info("Txn %s : Reading  %s ", txn_name, var_name)
-                log.info("%s : %s", var_name, target_site.get_data_manager().find_most_recent_snapshot(txn_obj.get_start_time() ,var_index, txn_obj.get_id()))
-                # Note that T accessed var:R
-                self.transaction_access_history[txn_index][var_index].append("R")
-                # Note that T accessed this site
-                self.transaction_map[txn_index].add_sites_accessed(target_site.get_id(), "R", self.current_time)
+                self.output.emit("info", "Txn %s : Reading  %s ", txn_name, var_name)
+                return self._serve_read(txn_obj, var_name, var_index, target_site)
             elif target_site.get_status() == SiteStatus.RECOVERED :
                 # Site has recovered from failure
                 # since index varibale is odd, we can perform the read from RECOVERED site
-                log.info("Txn %s : Reading %s from RECOVERED site as odd indexed variable", txn_name, var_name)
-                log.info("%s : %s", var_name, target_site.get_data_manager().find_most_recent_snapshot(txn_obj.get_start_time() ,var_index, txn_obj.get_id()))
-                # Note that T accessed var:R
-                self.transaction_access_history[txn_index][var_index].append("R")
-                # Note that T accessed this site
-                self.transaction_map[txn_index].add_sites_accessed(target_site.get_id(), "R", self.current_time)
+                self.output.emit("info", "Txn %s : Reading %s from RECOVERED site as odd indexed variable", txn_name, var_name)
+                return self._serve_read(txn_obj, var_name, var_index, target_site)
             else:
                 # Site is DOWN
-                log.info("Txn %s : Reading  %s FAILED AS SITE %s IS DOWN. Adding to Waiting_txns...", txn_name, var_name, target_site_index)
+                self.output.emit("wait", "Txn %s : Reading  %s FAILED AS SITE %s IS DOWN. Adding to Waiting_txns...", txn_name, var_name, target_site_index, txn=txn_name, var=var_name, site=target_site_index, time=self.current_time)
                 self.site_manager.add_wait_txn(target_site_index, self.transaction_map[int(txn_name[1:])], var_index)
                 txn_obj.set_status(TransactionStatus.WAITING)
+                self.tracer.wait(txn_index, var_name, [target_site_index], self.current_time)
+                return ReadResult(txn_name, var_name, TransactionStatus.WAITING)
 
 
     def write_req(self, params):
@@ -356,61 +750,106 @@ class TransactionManager:
 
         Parameters:
             params : list of parameters of the parsed instruction, containing instruction name, variable name, new value
+
+        Returns:
+            WriteResult
         """
-        txn_name =  params[0]
-        txn_index = int(txn_name[1:])
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        return self._write(txn_obj, params[1], params[2])
+
+    def write_batch(self, params):
+        """
+        Method to handle a batched write instruction, e.g. W(T1, x2=5, x4=9). The variables are written in
+        order at one tick, with the same results as one W instruction per variable. Every site written is
+        noted once in the sites accessed by the transaction
+
+        Parameters:
+            params : list of parameters of the parsed instruction, containing the transaction name and var=value pairs
+
+        Returns:
+            List of WriteResult in variable order
+        """
+        txn_obj = self.transaction_map[int(params[0][1:])]
+        accessed = set()
+        results = []
+        for param in params[1:]:
+            var_name, value = param.split("=")
+            results.append(self._write(txn_obj, var_name.strip(), value.strip(), accessed))
+        for site_id in sorted(accessed):
+            txn_obj.add_sites_accessed(site_id, "W", self.current_time)
+        return results
+
+    def _write(self, txn_obj, var_name, value, accessed=None):
+        """
+        Write a variable in a transaction, the value is buffered until the transaction commits
+
+        Parameters:
+            txn_obj : Transaction object
+            var_name : Name of the variable
+            value : New value as written in the instruction
+            accessed : If passed, the ids of the sites written are added to it instead of the sites accessed by the transaction
+
+        Returns:
+            WriteResult
+        """
+        txn_name = txn_obj.get_name()
+        txn_index = txn_obj.get_id()
 
-        var_name = params[1]
         var_index = int(var_name[1:])
-        var_value = int(params[2])
+        var_value = int(value)
+        sites_written = []
+        self.placement.record_write(var_index)
 
-        if var_index % 2 == 0 :
+        if self.placement.is_replicated(var_index) :
             # Even indexed variable - Available at all sites
-            for site in self.site_manager.get_all_sites():
+            for site in self.site_manager.get_variable_sites(var_index):
                 if site.get_status() == SiteStatus.UP:
-                    # Site is UP, update the local copy of the site
-                    site.get_data_manager().update_local_copy(int(txn_name[1:]), var_index, var_value)
-                    log.info("Txn %s : Write  %s , Value %s, Site : %s UP", txn_name, var_name, params[2], site.get_id())
-                    # Note that T accessed var:W
-                    self.transaction_access_history[txn_index][var_index].append("W")
-                    # Note that T accessed this site
-                    self.transaction_map[txn_index].add_sites_accessed(site.get_id(), "W", self.current_time)
+                    # Site is UP, the write is buffered for this site
+                    self.output.emit("write", "Txn %s : Write  %s , Value %s, Site : %s UP", txn_name, var_name, value, site.get_id(), txn=txn_name, var=var_name, value=var_value, site=site.get_id(), time=self.current_time)
+                    sites_written.append(site.get_id())
                 elif site.get_status() == SiteStatus.RECOVERED:
                     # Site was previously down but now has recovered. Can service Write
-                    log.info("Txn %s : Write  %s , Value %s, Site : %s RECOVERED site can service WRITE...", txn_name, var_name, params[2], site.get_id())
-                    site.get_data_manager().update_local_copy(int(txn_name[1:]), var_index, var_value)
-                    # Note that T accessed var:W
-                    self.transaction_access_history[txn_index][var_index].append("W")
-                    # Note that T accessed this site
-                    self.transaction_map[txn_index].add_sites_accessed(site.get_id(), "W", self.current_time)
+                    self.output.emit("write", "Txn %s : Write  %s , Value %s, Site : %s RECOVERED site can service WRITE...", txn_name, var_name, value, site.get_id(), txn=txn_name, var=var_name, value=var_value, site=site.get_id(), time=self.current_time)
+                    sites_written.append(site.get_id())
                 else:
                     # Site is Down
-                    log.info("Txn %s : Write  %s , Value %s, Site : %s FAILED as site is down", txn_name, var_name, params[2], site.get_id())
+                    self.output.emit("info", "Txn %s : Write  %s , Value %s, Site : %s FAILED as site is down", txn_name, var_name, value, site.get_id())
                     continue
+            if sites_written:
+                # Note that T accessed var:W, once for all sites
+                self.transaction_access_history[txn_index][var_index].append("W")
         else:
             # Odd Indexed variable - Only available at one site
-            target_site_index = 1 + var_index % 10
-            target_site = self.site_manager.get_site(target_site_index)
+            target_site = self.site_manager.get_variable_sites(var_index)[0]
 
             if target_site.get_status() == SiteStatus.UP :
                 # Site is UP
-                target_site.get_data_manager().update_local_copy(int(txn_name[1:]), var_index, var_value)
-                log.info("Txn %s : Write  %s , Value %s, Site : %s odd index variable", txn_name, var_name, params[2], target_site.get_id())
+                self.output.emit("write", "Txn %s : Write  %s , Value %s, Site : %s odd index variable", txn_name, var_name, value, target_site.get_id(), txn=txn_name, var=var_name, value=var_value, site=target_site.get_id(), time=self.current_time)
                 # Note that T accessed var:W
                 self.transaction_access_history[txn_index][var_index].append("W")
-                # Note that T accessed this site
-                self.transaction_map[txn_index].add_sites_accessed(target_site.get_id(), "W", self.current_time)
+                sites_written.append(target_site.get_id())
             elif target_site.get_status() == SiteStatus.RECOVERED:
                 # Site was previously down but now has recovered. Can service Write
-                log.info("Txn %s : Write  %s , Value %s, Site : %s RECOVERED site can service WRITE for odd index...", txn_name, var_name, params[2], target_site.get_id())
-                target_site.get_data_manager().update_local_copy(int(txn_name[1:]), var_index, var_value)
+                self.output.emit("write", "Txn %s : Write  %s , Value %s, Site : %s RECOVERED site can service WRITE for odd index...", txn_name, var_name, value, target_site.get_id(), txn=txn_name, var=var_name, value=var_value, site=target_site.get_id(), time=self.current_time)
                 # Note that T accessed var:W
                 self.transaction_access_history[txn_index][var_index].append("W")
-                # Note that T accessed this site
-                self.transaction_map[txn_index].add_sites_accessed(target_site.get_id(), "W", self.current_time)
+                sites_written.append(target_site.get_id())
             else:
                 # Site is DOWN
-                log.info("Txn %s : Write %s , Value %s FAILED as site %s is down", txn_name, var_name, params[2], target_site.get_id())
+                self.output.emit("info", "Txn %s : Write %s , Value %s FAILED as site %s is down", txn_name, var_name, value, target_site.get_id())
+
+        if sites_written:
+            self.cost.write(txn_index, sites_written, self.current_time)
+            # Note that T accessed these sites
+            if accessed is None:
+                for site_id in sites_written:
+                    txn_obj.add_sites_accessed(site_id, "W", self.current_time)
+            else:
+                accessed.update(sites_written)
+            # The value reaches the data managers of these sites only if T commits
+            txn_obj.buffer_write(var_index, var_value, sites_written)
+        self.tracer.write(txn_index, var_name, var_value, sites_written, self.current_time)
+        return WriteResult(txn_name, var_name, var_value, sites_written)
 
     def end_txn(self, params):
         """
@@ -418,70 +857,336 @@ class TransactionManager:
 
         Parameters:
             params : list of parameters of the parsed instruction, containing instruction name
+
+        Returns:
+            EndResult
         """
-        log.info("Txn %s : END. Checking whether to COMMIT/ABORT.....", params[0])
+        self.output.emit("info", "Txn %s : END. Checking whether to COMMIT/ABORT.....", params[0])
 
         txn_name =  params[0]
         txn_index = int(txn_name[1:])
 
         txn_obj =  self.transaction_map[txn_index]
-        txn_start_time = txn_obj.get_start_time()
+
+        if(txn_obj.get_status() == TransactionStatus.ABORTED) :
+            # Txn was already aborted by a failed read
+            self.output.emit("abort", "Txn %s : was ABORTED as READ failed", txn_name, txn=txn_name, reason=AbortReason.READ_FAILED.name, time=self.current_time)
+            txn_obj.clear_write_buffer()
+            self.cost.finish(txn_index, self.metrics)
+            self._pivot_finish(txn_obj)
+            return EndResult(txn_name, TransactionStatus.ABORTED, AbortReason.READ_FAILED, self.current_time)
 
         if(txn_obj.get_status() == TransactionStatus.WAITING) :
             # Txn is waiting on some read
-            log.info("Txn %s : is wating on some read. has to be ABORTED", txn_name)
-            txn_obj.set_status(TransactionStatus.ABORTED)
+            deadline = self.scheduler.defer(txn_obj, self.current_time)
+            if deadline is not None:
+                self.output.emit("defer", "Txn %s : is waiting on some read. END deferred until time %s", txn_name, deadline, txn=txn_name, deadline=deadline, time=self.current_time)
+                self.metrics.inc("deferred_ends_total", outcome="deferred")
+                return EndResult(txn_name, TransactionStatus.WAITING, time=self.current_time)
+            self.output.emit("abort", "Txn %s : is wating on some read. has to be ABORTED", txn_name, txn=txn_name, reason=AbortReason.WAITING.name, time=self.current_time)
+            return self._abort(txn_obj, AbortReason.WAITING)
+
+        return self._validate_and_commit(txn_obj)
+
+    def retry_deferred(self):
+        """
+        Retry the deferred ends whose pending read was served and abort the ones which timed out,
+        oldest transaction first. Called after every instruction
+
+        Returns:
+            List of EndResult
+        """
+        results = []
+        for txn_obj, timed_out in self.scheduler.pop_due(self.current_time, self.transaction_map):
+            txn_name = txn_obj.get_name()
+            if timed_out:
+                self.output.emit("abort", "Txn %s : deferred END timed out waiting on some read. has to be ABORTED", txn_name, txn=txn_name, reason=AbortReason.TIMEOUT.name, time=self.current_time)
+                self.metrics.inc("deferred_ends_total", outcome="timed_out")
+                results.append(self._abort(txn_obj, AbortReason.TIMEOUT))
+            else:
+                self.output.emit("info", "Txn %s : pending read served. Retrying deferred END.....", txn_name)
+                self.metrics.inc("deferred_ends_total", outcome="retried")
+                results.append(self._validate_and_commit(txn_obj))
+        return results
+
+    def _active_writers(self):
+        """
+        Active transactions which may still read or write, for moving copies of variables
+
+        Returns:
+            (Dict with KEY as variable id and VALUE as the active transactions which wrote it,
+            start time of the oldest active transaction or a time after current_time if there is none)
+        """
+        self.active_txns = {txn_index for txn_index in self.active_txns
+                            if self.transaction_map[txn_index].get_status() in (TransactionStatus.RUNNING, TransactionStatus.WAITING)}
+        writers = defaultdict(list)
+        horizon = self.current_time + 1
+        for txn_index in sorted(self.active_txns):
+            txn_obj = self.transaction_map[txn_index]
+            for variable_id in txn_obj.get_write_buffer():
+                writers[variable_id].append(txn_obj)
+            horizon = min(horizon, txn_obj.get_start_time())
+        return writers, horizon
+
+    def rebalance_placement(self):
+        """
+        Adaptive placement: every interval ticks, place the hot variables again. Variables waited on by a
+        pending read are not moved, variables written by an active transaction can only lose copies. Called after every instruction
+        """
+        if not self.placement.enabled or self.current_time % self.placement.interval:
+            return
+        writers, horizon = self._active_writers()
+        self.placement.rebalance(self.site_manager, writers, self.site_manager.get_waiting_variables(), horizon, self.current_time)
+
+    def rebalance_sites(self):
+        """
+        After add_site or decommission_site: every interval ticks of the rebalancer, move the next chunk of
+        variables to their new sites. Called after every instruction
+        """
+        rebalancer = self.site_manager.rebalancer
+        if not rebalancer.pending or self.current_time % rebalancer.interval:
             return
+        writers, horizon = self._active_writers()
+        rebalancer.step(self.site_manager, writers, self.site_manager.get_waiting_variables(), horizon, self.current_time)
+
+    def end_group(self, txn_names, start_time):
+        """
+        Group commit of end() instructions executed at consecutive ticks, e.g. the ends of one input line.
+        The result is the same as ending the transactions one at a time at start_time, start_time + 1, ...
+        but the group shares one copy of the serialization graph and one cycle check, and commits are
+        applied to every data manager in one batch. If the group forms a cycle, the ends are redone one at a time.
+
+        Parameters:
+            txn_names : Names of the transactions in end order
+            start_time : Time of the first end
+
+        Returns:
+            List of EndResult
+        """
+        if self.validation == "pivot":
+            # Pivot validation is O(1) per conflict, there is no graph search to share
+            results = []
+            for offset, txn_name in enumerate(txn_names):
+                self.current_time = start_time + offset
+                results.append(self.end_txn([txn_name]))
+            return results
+
+        graph = copy.deepcopy(self.serialization_graph)
+        decisions = []
+        group_written = set()
+        rw_edges = []
+
+        # Validate without side effects other than the graph and the tentative commits
+        start = self.metrics.clock()
+        for offset, txn_name in enumerate(txn_names):
+            self.current_time = start_time + offset
+            txn_obj = self.transaction_map[int(txn_name[1:])]
+            if txn_obj.get_status() != TransactionStatus.RUNNING:
+                decisions.append((txn_obj, "end", None))
+                continue
+            if self.check_site_failure(txn_obj):
+                decisions.append((txn_obj, "site_failure", None))
+                continue
+            written = [var for var, operations in self.transaction_access_history[txn_obj.get_id()].items() if "W" in operations]
+            ssi_conflict = self.check_ssi(txn_obj)
+            if ssi_conflict is None:
+                # First committer wins against the transactions committed earlier in the group
+                ssi_conflict = next((var for var in written if var in group_written), None)
+            if ssi_conflict is not None:
+                decisions.append((txn_obj, "ssi", ssi_conflict))
+                continue
+            rw_edges.extend(self.add_edges(txn_obj))
+            txn_obj.set_status(TransactionStatus.COMMITTED)
+            txn_obj.set_commit_time(self.current_time)
+            group_written.update(written)
+            decisions.append((txn_obj, "commit", None))
+        is_cyclic = any(decision == "commit" for _, decision, _ in decisions) and self.isCyclic()
+        self.metrics.observe_time("phase_seconds", start, phase="group_validation")
+
+        if is_cyclic:
+            # Some end of the group aborts due to a cycle, redo the group one end at a time
+            self.serialization_graph = graph
+            for txn_obj, decision, _ in decisions:
+                if decision == "commit":
+                    txn_obj.set_status(TransactionStatus.RUNNING)
+                    txn_obj.set_commit_time(None)
+            results = []
+            for offset, txn_name in enumerate(txn_names):
+                self.current_time = start_time + offset
+                results.append(self.end_txn([txn_name]))
+            return results
+
+        for rw_edge in rw_edges:
+            self.analytics.rw_edge(*rw_edge)
+
+        start = self.metrics.clock()
+        results = []
+        batch = defaultdict(list)
+        for offset, (txn_obj, decision, ssi_conflict) in enumerate(decisions):
+            self.current_time = start_time + offset
+            txn_name = txn_obj.get_name()
+            if decision == "end":
+                results.append(self.end_txn([txn_name]))
+                continue
+            self.output.emit("info", "Txn %s : END. Checking whether to COMMIT/ABORT.....", txn_name)
+            self.tracer.phase(txn_obj.get_id(), "site_failure", self.current_time, decision != "site_failure")
+            if decision == "site_failure":
+                results.append(self._abort_site_failure(txn_obj))
+                continue
+            self.tracer.phase(txn_obj.get_id(), "ssi", self.current_time, decision != "ssi")
+            if decision == "ssi":
+                results.append(self._abort_ssi(txn_obj, ssi_conflict))
+                continue
+            self.tracer.phase(txn_obj.get_id(), "serialization_graph", self.current_time, True)
+            self.commit(txn_obj, batch)
+            results.append(EndResult(txn_name, TransactionStatus.COMMITTED, time=self.current_time))
+
+        for site_id, commits in batch.items():
+            self.site_manager.get_site(site_id).get_data_manager().commit_batch(commits)
+        self.metrics.observe_time("phase_seconds", start, phase="group_commit")
+        return results
+
+    def _validate_and_commit(self, txn_obj):
+        """
+        Validate a transaction which is not waiting and commit it or abort it
+
+        Parameters:
+            txn_obj : Transaction object
+
+        Returns:
+            EndResult
+        """
+        txn_name = txn_obj.get_name()
+        txn_index = txn_obj.get_id()
 
         #### When an end(T) occurs, for each access of T, determine whether T should abort either:
 
         # Case 1: for available copies reasons (i.e. T wrote x on a site that later failed)
+        start = self.metrics.clock()
+        site_failed = self.check_site_failure(txn_obj)
+        self.metrics.observe_time("phase_seconds", start, phase="site_failure_validation")
+        self.tracer.phase(txn_index, "site_failure", self.current_time, not site_failed)
+        if site_failed:
+            return self._abort_site_failure(txn_obj)
+
+        # Case 2: for Snapshot Isolation reasons (i.e. some other transaction T' modified x after T began, T wrote x before or after' committed and T' committed before the end(T) occurred)
+        start = self.metrics.clock()
+        ssi_conflict = self.check_ssi(txn_obj)
+        self.metrics.observe_time("phase_seconds", start, phase="ssi_validation")
+        self.tracer.phase(txn_index, "ssi", self.current_time, ssi_conflict is None)
+        if ssi_conflict is not None:
+            return self._abort_ssi(txn_obj, ssi_conflict)
+
+        if self.validation == "pivot":
+            # Case 3 (pivot engine): committing T would leave T or a committed neighbour with both an incoming and an outgoing rw edge
+            start = self.metrics.clock()
+            rw_edges = self.pivot_check(txn_obj)
+            self.metrics.observe_time("phase_seconds", start, phase="pivot_detection")
+            self.tracer.phase(txn_index, "pivot", self.current_time, rw_edges is not None)
+            if rw_edges is None:
+                return self._abort_pivot(txn_obj)
+            self.pivot_commit(txn_obj, rw_edges)
+            start = self.metrics.clock()
+            self.commit(txn_obj)
+            self.metrics.observe_time("phase_seconds", start, phase="commit")
+            return EndResult(txn_name, TransactionStatus.COMMITTED, time=self.current_time)
+
+        # Case 3: Cycle in Serialization graph i.e. because committing T would create a cycle in the serialization graph including two rw edges in a row
+
+        # Make a copy of the existing serialization graph
+        graph = copy.deepcopy(self.serialization_graph)
+
+        start = self.metrics.clock()
+        for rw_edge in self.add_edges(txn_obj):
+            self.analytics.rw_edge(*rw_edge)
+        self.metrics.observe_time("phase_seconds", start, phase="edge_construction")
+
+        log.debug("Txn %s : Checking for cycle in serialization graph", txn_name)
+        # Check if Cycle is formed
+        start = self.metrics.clock()
+        is_cyclic = self.isCyclic()
+        self.metrics.observe_time("phase_seconds", start, phase="cycle_detection")
+        self.tracer.phase(txn_index, "serialization_graph", self.current_time, not is_cyclic)
+        if is_cyclic == 1:
+            # IF Cycle, then ABORT, revert the serialization graph with the copy made at the start
+            # Abort transaction
+            log.debug("Graph contains cycle !!!!! ")
+            if self.analytics.enabled:
+                self.analytics.cycle(["T" + str(node) for node in self.find_cycle(txn_index)])
+            self.output.emit("abort", "Txn %s : ABORTED due to cycle in serialization graph", txn_name, txn=txn_name, reason=AbortReason.CYCLE.name, time=self.current_time)
+            self.serialization_graph = graph
+            return self._abort(txn_obj, AbortReason.CYCLE)
+        else:
+            # ELSE leave the serialization graph as it is
+            log.debug("Graph doesn't contain cycle")
+
+        ### COMMIT the transaction
+        log.debug("Txn %s : ALL Fine. Trying to COMMIT...", txn_name)
+        start = self.metrics.clock()
+        self.commit(txn_obj)
+        self.metrics.observe_time("phase_seconds", start, phase="commit")
+        return EndResult(txn_name, TransactionStatus.COMMITTED, time=self.current_time)
 
-        for site_id, operation, timestamp in self.transaction_map[txn_index].get_sites_accessed():
+    def check_site_failure(self, txn_obj):
+        """
+        Available copies validation: check if T wrote x on a site that later failed
+
+        Parameters:
+            txn_obj : Transaction object
+
+        Returns:
+            True if T has to abort
+        """
+        for site_id, operation, timestamp in txn_obj.get_sites_accessed():
             # IF the site was accessed for WRITE
             if operation == "W":
                 # Failure History for this site
                 failure_history = self.site_manager.get_site_failure_history(site_id)
 
-                # Recovery History for this site
-                recover_history = self.site_manager.get_site_recover_history(site_id)
-
                 # check if site failed after performing write
                 for fail_time in failure_history :
                     if fail_time > timestamp :
-                        # Abort transaction
-                        log.info("Txn %s : ABORTED due to site failure", txn_name)
-                        return
+                        return True
+        return False
 
-        # Case 2: for Snapshot Isolation reasons (i.e. some other transaction T' modified x after T began, T wrote x before or after' committed and T' committed before the end(T) occurred)
+    def check_ssi(self, txn_obj):
+        """
+        First committer wins validation: check if some other transaction T' committed a variable
+        written by T after T began
 
-        variables_accessed = self.transaction_access_history[txn_index]
+        Parameters:
+            txn_obj : Transaction object
+
+        Returns:
+            ID of the conflicting variable if T has to abort, None otherwise
+        """
+        txn_start_time = txn_obj.get_start_time()
+        variables_accessed = self.transaction_access_history[txn_obj.get_id()]
 
         for variable_index in variables_accessed.keys():
             if "W" in variables_accessed[variable_index]:
-                if variable_index % 2 == 0:
-                    # Even indexed variable accessed
-                    for site in self.site_manager.get_all_sites():
-                        if site.get_data_manager().get_committed_variable_time(variable_index) > txn_start_time :
-                                # Abort transaction
-                                log.info("Txn %s : ABORTED due to SSI reason", txn_name)
-                                return
-                else:
-                    # Odd indexed variable accessed
-                    target_site_index = 1 + variable_index % 10
-                    target_site = self.site_manager.get_site(target_site_index)
+                # Every copy of the variable, a single one for odd indexed variables
+                for site in self.site_manager.get_variable_sites(variable_index):
+                    if site.get_data_manager().get_committed_variable_time(variable_index) > txn_start_time :
+                        return variable_index
+        return None
 
-                    if target_site.get_data_manager().get_committed_variable_time(variable_index) > txn_start_time :
-                        # Abort transaction
-                        log.info("Txn %s : ABORTED due to SSI reason", txn_name)
-                        return
+    def add_edges(self, txn_obj):
+        """
+        Add the edges between T' and every committed transaction T to the serialization graph
 
-        # Case 3: Cycle in Serialization graph i.e. because committing T would create a cycle in the serialization graph including two rw edges in a row
+        Parameters:
+            txn_obj : Transaction object of T'
 
-        # Make a copy of the existing serialization graph
-        graph = copy.deepcopy(self.serialization_graph)
+        Returns:
+            List of (variable id, reader txn id, writer txn id) of the rw-antidependency edges found
+        """
+        rw_edges = []
+        txn_index = txn_obj.get_id()
+        txn_start_time = txn_obj.get_start_time()
+        variables_accessed = self.transaction_access_history[txn_index]
 
-        log.debug("Txn %s : Adding edges to serialization graph", txn_name)
+        log.debug("Txn %s : Adding edges to serialization graph", txn_obj.get_name())
         ## Current txn is considered (T')
         # Add Edges of current Txn to the serialization graph
         for variable_index in variables_accessed.keys():
@@ -489,12 +1194,10 @@ class TransactionManager:
             operations = variables_accessed[variable_index]
             w_flg_T_dash = ("W" in operations)
             r_flg_T_dash = ("R" in operations)
-            T_dash_commit_time = txn_obj.get_commit_time()
 
             for inner_txn_idx, txn_object in self.transaction_map.items():
 
                 if txn_object.get_status() == TransactionStatus.COMMITTED :
-                    # print("--------- Transaction"+str(inner_txn_idx)+ " was in COMMITTED")
                     # Means txn_object is in the serialization graph
                     # For each committed transaction, considered (T)
                     inner_txn_var_accessed = self.transaction_access_history[inner_txn_idx]
@@ -519,44 +1222,249 @@ class TransactionManager:
                         # add T --rw --> T' to the serialization graph if T reads from x, T' writes to x, and T begins before end(T').
                         if r_flg_T and w_flg_T_dash and txn_object.get_start_time() < self.current_time :
                             self.addEdge(inner_txn_idx, txn_index)
+                            rw_edges.append((variable_index, inner_txn_idx, txn_index))
                             log.debug("Adding Edge (Case 3.1) T%s --> T%s ", inner_txn_idx, txn_index)
 
                         if r_flg_T_dash and w_flg_T and txn_obj.get_start_time() < txn_object.get_commit_time() :
                             self.addEdge(txn_index, inner_txn_idx,)
+                            rw_edges.append((variable_index, txn_index, inner_txn_idx))
                             log.debug("Adding Edge (Case 3.2) T%s --> T%s ", txn_index, inner_txn_idx)
+        return rw_edges
 
-        log.debug("Txn %s : Checking for cycle in serialization graph", txn_name)
-        # Check if Cycle is formed
-        if self.isCyclic() == 1:
-            # IF Cycle, then ABORT, revert the serialization graph with the copy made at the start
-            # Abort transaction
-            log.debug("Graph contains cycle !!!!! ")
-            log.info("Txn %s : ABORTED due to cycle in serialization graph", txn_name)
-            self.serialization_graph = graph
+    def pivot_readers(self, txn_obj):
+        """
+        pivot engine: readers of the variables written by T
+
+        Parameters:
+            txn_obj : Transaction object
+
+        Returns:
+            List of (variable id, reader txn id)
+        """
+        readers = []
+        for variable_index, operations in self.transaction_access_history[txn_obj.get_id()].items():
+            if "W" in operations:
+                readers.extend((variable_index, reader) for reader in sorted(self.var_readers.get(variable_index, ())))
+        return readers
+
+    def pivot_check(self, txn_obj, readers=None):
+        """
+        pivot engine: find the rw-antidependencies from concurrent readers of the variables written by T
+        and check for a dangerous structure. T can not commit if it would have both an incoming and an
+        outgoing rw edge, or if a committed transaction would get both through T
+
+        Parameters:
+            txn_obj : Transaction object
+            readers : (variable id, reader txn id) pairs to check, pivot_readers(txn_obj) if not passed
+
+        Returns:
+            List of (variable id, reader txn id, writer txn id) of the new rw edges, None if T has to abort
+        """
+        txn_index = txn_obj.get_id()
+        rw_edges = []
+        for variable_index, reader in (readers if readers is not None else self.pivot_readers(txn_obj)):
+            # Every reader of x read an older version of x than T writes, only concurrent readers count
+            reader_obj = self.transaction_map[reader]
+            if reader == txn_index or reader_obj.get_status() == TransactionStatus.ABORTED:
+                continue
+            if reader_obj.get_status() == TransactionStatus.COMMITTED and reader_obj.get_commit_time() <= txn_obj.get_start_time():
+                continue
+            rw_edges.append((variable_index, reader, txn_index))
+
+        in_conflict = txn_index in self.in_conflict or len(rw_edges) > 0
+        out_conflict = txn_index in self.out_conflict
+        if in_conflict and out_conflict:
+            return None
+        for _, reader, _ in rw_edges:
+            if self.transaction_map[reader].get_status() == TransactionStatus.COMMITTED and reader in self.in_conflict:
+                return None
+        for writer in self.rw_out_targets[txn_index]:
+            if self.transaction_map[writer].get_status() == TransactionStatus.COMMITTED and writer in self.out_conflict:
+                return None
+        return rw_edges
+
+    def pivot_commit(self, txn_obj, rw_edges):
+        """
+        pivot engine: set the conflict flags of the rw edges of T and note the variables T commits
+        """
+        txn_index = txn_obj.get_id()
+        for variable_index, reader, writer in rw_edges:
+            self.out_conflict.add(reader)
+            self.in_conflict.add(writer)
+            self.analytics.rw_edge(variable_index, reader, writer)
+        for variable_index, operations in self.transaction_access_history[txn_index].items():
+            if "W" in operations:
+                self.var_writers[variable_index].append((self.current_time, txn_index))
+
+    def _pivot_oldest_start(self):
+        """
+        pivot engine: start time of the oldest transaction which may still end
+
+        Returns:
+            pivot_horizon if set, else the start time of the oldest active transaction or a time after current_time if there is none
+        """
+        if self.pivot_horizon is not None:
+            return self.pivot_horizon
+        return min((self.transaction_map[txn_index].get_start_time() for txn_index in self.active_txns
+                    if self.transaction_map[txn_index].get_status() in (TransactionStatus.RUNNING, TransactionStatus.WAITING)),
+                   default=self.current_time + 1)
+
+    def _pivot_finish(self, txn_obj):
+        """
+        pivot engine: T committed or aborted. No check looks at the flags and reads of an aborted T, they are
+        dropped at once. A committed T is kept until every transaction which may still end began at or after its
+        commit: T is then never a concurrent reader or writer again, and its commits no longer flag any read.
+        The work is proportional to the reads and writes of the transactions dropped, not to the length of the trace
+        """
+        if self.validation != "pivot":
             return
+        txn_index = txn_obj.get_id()
+        self.active_txns.discard(txn_index)
+        if txn_obj.get_status() == TransactionStatus.COMMITTED:
+            self.pivot_committed.append((txn_obj.get_commit_time(), txn_index))
         else:
-            # ELSE leave the serialization graph as it is
-            log.debug("Graph doesn't contain cycle")
+            self._pivot_forget(txn_index)
+        horizon = self._pivot_oldest_start()
+        while self.pivot_committed and self.pivot_committed[0][0] <= horizon:
+            _, committed = self.pivot_committed.popleft()
+            self._pivot_forget(committed)
+            for variable_index, operations in self.transaction_access_history[committed].items():
+                writers = self.var_writers.get(variable_index)
+                if writers is None or "W" not in operations:
+                    continue
+                while writers and writers[0][0] <= horizon:
+                    writers.popleft()
+                if not writers:
+                    del self.var_writers[variable_index]
 
-        # print(self.serialization_graph)
-        ### COMMIT the transaction
-        log.debug("Txn %s : ALL Fine. Trying to COMMIT...", txn_name)
-        # print(self.transaction_map[txn_index].get_sites_accessed())
-        # site_accessed_list = list(zip(*self.transaction_map[txn_index].get_sites_accessed()))[0]
-
-        # shorthand to solve problem
-        res = {key: [v[0] for v in val] for key, val in groupby(sorted(self.transaction_map[txn_index].get_sites_accessed(), key=lambda ele: ele[1]), key=lambda ele: ele[1])}
-        # print(res)
-        # print(site_accessed_list)
-        for site in self.site_manager.get_all_sites():
-            if site.get_id() in res.get("W", []) and (site.get_status() == SiteStatus.UP or site.get_status() == SiteStatus.RECOVERED):
-                # log.info("Txn %s : COMMITTING TO SITE %s", txn_name, site.get_id())
-                site.get_data_manager().commit_txn(txn_index, self.current_time)
-                if site.get_status() == SiteStatus.RECOVERED :
-                    log.info("Txn %s :Changing RECOVERED status to UP for Site %s", txn_name, site.get_id())
-                site.set_status(SiteStatus.UP)
-
-        log.info("Txn %s : COMMITTED SUCCESSFULLY", txn_name)
+    def _pivot_forget(self, txn_index):
+        """
+        pivot engine: drop the conflict flags, rw_out_targets and reads of a transaction
+        """
+        self.in_conflict.discard(txn_index)
+        self.out_conflict.discard(txn_index)
+        self.rw_out_targets.pop(txn_index, None)
+        for variable_index, operations in self.transaction_access_history[txn_index].items():
+            readers = self.var_readers.get(variable_index)
+            if readers is None or "R" not in operations:
+                continue
+            readers.discard(txn_index)
+            if not readers:
+                del self.var_readers[variable_index]
+
+    def commit(self, txn_obj, batch=None):
+        """
+        Materialize the write buffer of T on every site it wrote to which is still available, and mark T committed
+
+        Parameters:
+            txn_obj : Transaction object
+            batch : If passed, the commits are not applied to the data managers but collected in batch,
+                a dict with KEY as site id and VALUE as list of (txn id, commit time, writes)
+        """
+        txn_index = txn_obj.get_id()
+        txn_name = txn_obj.get_name()
+
+        if self.replication.enabled:
+            # Lazy replication : only the primary copies are committed now, the replicas are propagated later
+            direct = self.replication.defer(self.site_manager, txn_obj, self.current_time)
+            for site_id, writes in sorted(direct.items()):
+                self.site_manager.get_site(site_id).get_data_manager().commit_txn(txn_index, self.current_time, writes)
+            self.cost.commit(txn_index, {site_id: len(writes) for site_id, writes in direct.items()}, self.current_time)
+            write_buffer = txn_obj.get_write_buffer()
+            for site_id in sorted(self.site_manager.site_ids_by_status[SiteStatus.RECOVERED]):
+                if any(site_id in entry[1] for entry in write_buffer.values()):
+                    self._bring_site_up(txn_name, site_id)
+            self._mark_committed(txn_obj)
+            return
+
+        # Only the sites T wrote to, in id order
+        writes_by_site = txn_obj.get_writes_by_site()
+        committed = {}
+        for site_id in sorted(writes_by_site):
+            if self.site_manager.is_site_available(site_id):
+                site = self.site_manager.get_site(site_id)
+                writes = writes_by_site[site_id]
+                if batch is None:
+                    site.get_data_manager().commit_txn(txn_index, self.current_time, writes)
+                else:
+                    batch[site_id].append((txn_index, self.current_time, writes))
+                committed[site_id] = len(writes)
+                self._bring_site_up(txn_name, site_id)
+        self.cost.commit(txn_index, committed, self.current_time)
+
+        self._mark_committed(txn_obj)
+
+    def _bring_site_up(self, txn_name, site_id):
+        """
+        A commit of T wrote to the site, a RECOVERED site becomes UP
+        """
+        if self.site_manager.get_site(site_id).get_status() == SiteStatus.RECOVERED :
+            self.output.emit("info", "Txn %s :Changing RECOVERED status to UP for Site %s", txn_name, site_id)
+        self.site_manager.mark_site_up(site_id)
+
+    def _mark_committed(self, txn_obj):
+        """
+        Marks the transaction as committed at the current time
+        """
+        txn_name = txn_obj.get_name()
+        self.output.emit("commit", "Txn %s : COMMITTED SUCCESSFULLY", txn_name, txn=txn_name, time=self.current_time)
         txn_obj.set_commit_time(self.current_time)
         txn_obj.set_status(TransactionStatus.COMMITTED)
-        return
+        txn_obj.clear_write_buffer()
+        self.cost.finish(txn_obj.get_id(), self.metrics)
+        self._pivot_finish(txn_obj)
+        self.tracer.end(txn_obj.get_id(), self.current_time, TransactionStatus.COMMITTED.name)
+
+    def _abort_site_failure(self, txn_obj):
+        """
+        Abort T because it wrote on a site that failed afterwards
+
+        Returns:
+            EndResult for the aborted transaction
+        """
+        txn_name = txn_obj.get_name()
+        self.output.emit("abort", "Txn %s : ABORTED due to site failure", txn_name, txn=txn_name, reason=AbortReason.SITE_FAILURE.name, time=self.current_time)
+        return self._abort(txn_obj, AbortReason.SITE_FAILURE)
+
+    def _abort_ssi(self, txn_obj, variable_id):
+        """
+        Abort T because variable_id was committed by another transaction after T began
+
+        Returns:
+            EndResult for the aborted transaction
+        """
+        txn_name = txn_obj.get_name()
+        self.analytics.fcw_conflict(variable_id)
+        self.output.emit("abort", "Txn %s : ABORTED due to SSI reason", txn_name, txn=txn_name, reason=AbortReason.SSI.name, time=self.current_time)
+        return self._abort(txn_obj, AbortReason.SSI)
+
+    def _abort_pivot(self, txn_obj):
+        """
+        Abort T because committing it would complete a dangerous structure (pivot engine)
+
+        Returns:
+            EndResult for the aborted transaction
+        """
+        txn_name = txn_obj.get_name()
+        self.output.emit("abort", "Txn %s : ABORTED due to dangerous structure (pivot) in SSI", txn_name, txn=txn_name, reason=AbortReason.PIVOT.name, time=self.current_time)
+        return self._abort(txn_obj, AbortReason.PIVOT)
+
+    def _abort(self, txn_obj, reason):
+        """
+        Marks the transaction as aborted
+
+        Parameters:
+            txn_obj : Transaction object
+            reason : AbortReason
+
+        Returns:
+            EndResult for the aborted transaction
+        """
+        txn_obj.set_status(TransactionStatus.ABORTED)
+        txn_obj.clear_write_buffer()
+        self.metrics.inc("aborts_total", reason=reason.name)
+        self.analytics.abort(reason)
+        self.cost.finish(txn_obj.get_id(), self.metrics)
+        self._pivot_finish(txn_obj)
+        self.tracer.end(txn_obj.get_id(), self.current_time, TransactionStatus.ABORTED.name, reason.name)
+        return EndResult(txn_obj.get_name(), TransactionStatus.ABORTED, reason, self.current_time)
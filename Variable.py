@@ -3,6 +3,9 @@ Authors:
 1) Joel Marvin Tellis (jt4680)
 2) Sahil Bakshi (sb8916)
 """
+import bisect
+
+
 class Variable:
     """
     Variable class represents the data of our sites which can be read or written by transactions
@@ -17,6 +20,8 @@ class Variable:
         snapshots: List representing snapshot history containing (time, value) tuples where
             time is timestamp when a variable was committed by some transaction
             value is the new value that was committed.
+        snapshot_times: Commit times of snapshots in the same order. Commit times only grow,
+            so lookups by time are binary searches over this list
     """
 
     def __init__(self, index, name, value, current_site_id):
@@ -26,6 +31,7 @@ class Variable:
         self.value = value
         self.snapshots = []
         self.snapshots.append((0, value))
+        self.snapshot_times = [0]
 
     def get_sites(self, site_id):
         """
@@ -53,6 +59,20 @@ class Variable:
         """
         return self.current_site_id
 
+    def copy_to(self, site_id):
+        """
+        Copy of the variable with its snapshot history, to be stored on another site
+
+        Args:
+            site_id: Index of the site the copy is stored on
+        Returns:
+            Variable object
+        """
+        variable = Variable(self.index, self.name, self.value, site_id)
+        variable.snapshots = list(self.snapshots)
+        variable.snapshot_times = list(self.snapshot_times)
+        return variable
+
     def get_value(self):
         """
         Getter for value
@@ -76,6 +96,7 @@ class Variable:
         Update the snapshot
         """
         self.snapshots.append((timestamp, new_value))
+        self.snapshot_times.append(timestamp)
 
     def most_recent_snapshot_time(self):
         """
@@ -90,10 +111,9 @@ class Variable:
         """
         Return the most recent snapshot of the variable before the specified timestamp
         """
-        for i in range(len(self.snapshots)-1, -1, -1):
-            entry = self.snapshots[i]
-            if entry[0] < timestamp:
-                return entry[1]
+        i = bisect.bisect_left(self.snapshot_times, timestamp)
+        if i > 0:
+            return self.snapshots[i - 1][1]
 
         return None
 
@@ -101,13 +121,39 @@ class Variable:
         """
         Return the time of most recent snapshot of the variable before the specified timestamp
         """
-        for i in range(len(self.snapshots)-1, -1, -1):
-            entry = self.snapshots[i]
-            if entry[0] < timestamp:
-                return entry[0]
+        i = bisect.bisect_left(self.snapshot_times, timestamp)
+        if i > 0:
+            return self.snapshot_times[i - 1]
 
         return None
 
+    def find_time_of_snapshot_as_of(self, timestamp):
+        """
+        Return the commit time of the value of the variable committed at or before the specified timestamp
+        """
+        i = bisect.bisect_right(self.snapshot_times, timestamp)
+        if i > 0:
+            return self.snapshot_times[i - 1]
+
+        return None
+
+    def find_snapshot_as_of(self, timestamp):
+        """
+        Return the value of the variable committed at or before the specified timestamp
+        """
+        i = bisect.bisect_right(self.snapshot_times, timestamp)
+        if i > 0:
+            return self.snapshots[i - 1][1]
+
+        return None
+
+    def committed_between(self, timestamp1, timestamp2):
+        """
+        Return True if the variable was committed strictly between timestamp1 and timestamp2
+        """
+        i = bisect.bisect_right(self.snapshot_times, timestamp1)
+        return i < len(self.snapshot_times) and self.snapshot_times[i] < timestamp2
+
     def get_snapshots_list(self):
         """
         Returns the list of snapshots of this variable
@@ -8,6 +8,11 @@ READ_FUNC = "R"
 WRITE_FUNC = "W"
 DUMP_FUNC = "dump"
 END_FUNC = "end"
+SCAN_FUNC = "S"
 FAIL_FUNC = "fail"
 RECOVER_FUNC = "recover"
-SITE_MANAGER_FUNCS = [DUMP_FUNC, FAIL_FUNC, RECOVER_FUNC]
+READ_AS_OF_FUNC = "R_asof"
+DUMP_AS_OF_FUNC = "dump_asof"
+ADD_SITE_FUNC = "add_site"
+DECOMMISSION_SITE_FUNC = "decommission_site"
+SITE_MANAGER_FUNCS = [DUMP_FUNC, FAIL_FUNC, RECOVER_FUNC, READ_AS_OF_FUNC, DUMP_AS_OF_FUNC, ADD_SITE_FUNC, DECOMMISSION_SITE_FUNC]
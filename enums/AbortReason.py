@@ -0,0 +1,19 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+from enum import Enum
+
+
+class AbortReason(Enum):
+    """
+    Reason due to which a transaction was aborted
+    """
+    READ_FAILED = 0
+    WAITING = 1
+    SITE_FAILURE = 2
+    SSI = 3
+    CYCLE = 4
+    TIMEOUT = 5
+    PIVOT = 6
@@ -4,13 +4,26 @@ Authors:
 2) Sahil Bakshi (sb8916)
 """
 import logging
+import sys
 from pathlib import Path
 import plac
 
 from RepCRec.config import config
+from RepCRec.Output import OUTPUT_FORMATS, create_sink
+from RepCRec.Dump import DUMP_FORMATS, create_dump_writer
+from RepCRec.Metrics import Metrics, METRICS_FORMATS
+from RepCRec.Profiler import PROFILE_MODES, run_profiled
+from RepCRec.Tracer import Tracer
+from RepCRec.Analytics import ConflictAnalytics
+from RepCRec.Scheduler import RetryScheduler
+from RepCRec.Replication import LazyReplication, REPLICATION_MODES
+from RepCRec.Placement import AdaptivePlacement, PLACEMENT_MODES
+from RepCRec.Cost import CostModel, parse_site_values, parse_slow_sites
 from RepCRec.SiteManager import SiteManager
-from RepCRec.TransactionManager import TransactionManager
+from RepCRec.TransactionManager import TransactionManager, VALIDATION_ENGINES
 from RepCRec.Simulator import Simulator
+from RepCRec.Shard import ShardRouter
+from RepCRec.Checkpoint import save_checkpoint, load_checkpoint
 
 class RepCRec:
     """
@@ -18,45 +31,188 @@ class RepCRec:
     Job is to start site manager, transaction manager and Simulator.
 
     Parameters:
-        file_path: File containing instructions
+        file_path: File containing instructions, - to stream them from std input
         num_sites: Number of sites
         num_variables: Number of variables
         out_file: If out_file is present, logs will be written to it
+        output_format: log (default), text, jsonl or null. text and jsonl are buffered sinks writing to out_file
+        dump_file: If dump_file is present, dump() snapshots are written to it instead of the output
+        dump_format: json (default), csv or binary format of dump_file
+        dump_diff: If set, dump() only contains variables committed since the previous dump()
+        metrics_file: If metrics_file is present, metrics are collected and written to it at the end of the run
+        metrics_format: json (default) or prometheus format of metrics_file
+        profile: If present, Simulator.run is run under cProfile (cprofile) or the sampling profiler (sample)
+        profile_out: File for the profile, repcrec.pstats or repcrec.collapsed if not passed
+        trace_file: If trace_file is present, transaction lifecycles are written to it in Chrome trace-event format
+        hotspots: If present, conflict hotspots are aggregated and the top hotspots report is printed at the end of the run
+        hotspot_file: If present, the hotspots report is also written to it as JSON
+        retry_timeout: If present, end() of a transaction waiting on a read is deferred and retried when the site
+            recovers, aborting it if the read was not served within retry_timeout ticks
+        group_commit: If set, consecutive end() instructions of one line are validated and committed as a group
+        validation: graph (default) detects cycles in the serialization graph, pivot detects dangerous
+            structures with the inConflict/outConflict flags of SSI. Shards always use pivot, graph can not be combined with them
+        replication: eager (default) commits every copy in end(), lazy commits the primary copy of every variable
+            and propagates the other copies in batches after the end
+        placement: static (default) keeps odd variables on one site and even variables on every site, adaptive
+            adds copies of read hot variables and drops copies of write hot ones. Can not be combined with lazy replication
+        shards: If present, variables are partitioned over this many transaction manager processes (pivot validation).
+            Can not be combined with checkpoints, traces, hotspots, retries, lazy replication, adaptive placement or the cost model
+        rtt: If present, the cost model simulates the latency of site accesses with these round trip times in ms,
+            one value for every site or comma separated values per site, and prints the latency percentiles at the end of the run
+        bandwidth: Values transferred per ms per site for the cost model, 1000 if not passed
+        slow_sites: Slow sites for the cost model, e.g. 3x10@100-200 : site 3 is 10 times slower from tick 100 to tick 200
+        checkpoint_at: If present, the run stops after this many instructions and a checkpoint is written
+        checkpoint_file: File for the checkpoint, repcrec.ckpt if not passed
+        resume: If present, state is restored from this checkpoint. If file_path is the input of the
+            checkpointed run, reading continues where it stopped, otherwise file_path is executed from its start.
+            The checkpoint keeps its validation, retries, replication and placement, they can not be passed again
 
     Returns:
         The output of the test case
     """
     @plac.annotations(
-        file_path=("Input file path.","positional", None, str),
+        file_path=("Input file path, - to read instructions from std input as they arrive","positional", None, str),
         num_sites=("Number of Sites", "option", "n", int),
         num_variables=("Number of variables", "option", "v", int),
-        out_file=("Output file, if not passed by default output will be printed to std output", "option", "o", str))
+        out_file=("Output file, if not passed by default output will be printed to std output", "option", "o", str),
+        output_format=("Output format", "option", "f", str, OUTPUT_FORMATS),
+        dump_file=("File to write dump() snapshots to", "option", "d", str),
+        dump_format=("Format of the dump file", "option", "F", str, list(DUMP_FORMATS.keys())),
+        dump_diff=("dump() only writes variables changed since the previous dump()", "flag", "D"),
+        metrics_file=("File to write metrics to at the end of the run", "option", "m", str),
+        metrics_format=("Format of the metrics file", "option", "M", str, METRICS_FORMATS),
+        profile=("Profile the run", "option", "p", str, PROFILE_MODES),
+        profile_out=("Profile output file", "option", "P", str),
+        trace_file=("File to write the Chrome trace of transactions to", "option", "t", str),
+        hotspots=("Print the top N conflict hotspots at the end of the run", "option", "H", int),
+        hotspot_file=("File to write the conflict hotspot report to as JSON", "option", "j", str),
+        retry_timeout=("Defer end() of waiting transactions for up to N ticks", "option", "R", int),
+        group_commit=("Group commit of the end() instructions of one line", "flag", "G"),
+        validation=("Serializability validation engine, graph if not passed", "option", "S", str, VALIDATION_ENGINES),
+        replication=("Replication mode, eager if not passed", "option", "L", str, REPLICATION_MODES),
+        placement=("Placement of the copies of variables, static if not passed", "option", "A", str, PLACEMENT_MODES),
+        shards=("Run N transaction manager shards in separate processes", "option", "N", int),
+        rtt=("Simulated round trip time in ms of every site, or per site (1,1,5), enables the cost model", "option", "T", str),
+        bandwidth=("Simulated values per ms of every site, or per site, for the cost model", "option", "B", str),
+        slow_sites=("Slow sites for the cost model, e.g. 3x10@100-200,5x4", "option", "W", str),
+        checkpoint_at=("Stop after N instructions and write a checkpoint", "option", "c", int),
+        checkpoint_file=("Checkpoint file", "option", "C", str),
+        resume=("Resume from a checkpoint", "option", "r", str))
     def __init__(self, file_path, num_sites=config['NUM_SITES'],
                  num_variables=config['NUM_VARIABLES'],
-                 out_file=None):
-        p = Path('.')
-        p = p / file_path
+                 out_file=None, output_format="log",
+                 dump_file=None, dump_format="json", dump_diff=False,
+                 metrics_file=None, metrics_format="json",
+                 profile=None, profile_out=None, trace_file=None,
+                 hotspots=None, hotspot_file=None, retry_timeout=None, group_commit=False, validation=None,
+                 replication=None, placement=None, shards=None, rtt=None, bandwidth=None, slow_sites=None,
+                 checkpoint_at=None, checkpoint_file="repcrec.ckpt", resume=None):
+        if file_path == "-":
+            p = sys.stdin
+        else:
+            p = Path('.')
+            p = (p / file_path).resolve()
 
-        if out_file:
-            open(out_file, 'w', encoding='UTF-8').close()
+        if output_format == "log":
+            if out_file:
+                open(out_file, 'w', encoding='UTF-8').close()
 
-        logging.basicConfig(filename=out_file,
-                            filemode='w',
-                            encoding='utf-8',
-                            format='%(levelname)s - %(message)s',
-                            level=config['LOG_LEVEL'])
+            logging.basicConfig(filename=out_file,
+                                filemode='w',
+                                encoding='utf-8',
+                                format='%(levelname)s - %(message)s',
+                                level=config['LOG_LEVEL'])
+        else:
+            logging.basicConfig(format='%(levelname)s - %(message)s',
+                                level=config['LOG_LEVEL'])
 
-        self.site_manager = SiteManager(num_sites, num_variables)
+        self.output = create_sink(output_format, out_file)
+        self.dump_writer = create_dump_writer(dump_format, dump_file) if dump_file else None
 
-        self.transaction_manager = TransactionManager(num_variables, num_sites, self.site_manager)
+        self.metrics_file = metrics_file
+        self.metrics_format = metrics_format
+        self.profile = profile
+        self.profile_out = profile_out
+        self.trace_file = trace_file
+        self.tracer = Tracer() if trace_file else None
+        self.hotspots = hotspots or 10
+        self.hotspot_file = hotspot_file
+        self.analytics = ConflictAnalytics() if hotspots or hotspot_file else None
+        self.metrics = Metrics() if metrics_file else None
+        self.checkpoint_at = checkpoint_at
+        self.checkpoint_file = checkpoint_file
+        self.router = None
+        self.cost = None
+        if rtt or bandwidth or slow_sites:
+            self.cost = CostModel(parse_site_values(rtt or "1"), parse_site_values(bandwidth or "1000"),
+                                  parse_slow_sites(slow_sites) if slow_sites else None)
 
-        self.simulator = Simulator(p, self.site_manager, self.transaction_manager)
+        if shards:
+            if resume or checkpoint_at or trace_file or hotspots or hotspot_file or retry_timeout or replication == "lazy" or placement == "adaptive" or self.cost:
+                raise ValueError("Shards can not be combined with checkpoints, traces, hotspots, retries, lazy replication, adaptive placement or the cost model")
+            if validation == "graph":
+                raise ValueError("Shards use pivot validation, they can not be combined with graph validation")
+            self.router = ShardRouter(shards, num_variables, num_sites, self.output, self.dump_writer, dump_diff, self.metrics)
+            self.site_manager = self.router.site_manager
+            self.transaction_manager = self.router
+            self.simulator = Simulator(p, group_commit=group_commit, router=self.router)
+            return
+
+        if resume:
+            if validation or retry_timeout or replication or placement:
+                raise ValueError("A resumed run keeps the validation, retries, replication and placement of its checkpoint, they can not be passed with resume")
+            self.simulator = load_checkpoint(resume, self.output, self.dump_writer, self.metrics, self.tracer, self.analytics)
+            self.site_manager = self.simulator.site_manager
+            self.transaction_manager = self.simulator.transaction_manager
+            self.site_manager.dump_diff = dump_diff
+            if self.cost is not None:
+                self.site_manager.cost = self.transaction_manager.cost = self.cost
+            self.cost = self.site_manager.cost if self.site_manager.cost.enabled else None
+            self.simulator.group_commit = group_commit
+            if self.simulator.file_name != p:
+                self.simulator.set_input(p)
+            return
+
+        if replication == "lazy" and placement == "adaptive":
+            raise ValueError("Lazy replication can not be combined with adaptive placement")
+        self.site_manager = SiteManager(num_sites, num_variables, self.output, self.dump_writer, dump_diff, self.metrics, self.tracer,
+                                        LazyReplication() if replication == "lazy" else None,
+                                        AdaptivePlacement() if placement == "adaptive" else None, cost=self.cost)
+
+        self.transaction_manager = TransactionManager(num_variables, num_sites, self.site_manager, analytics=self.analytics,
+                                                      scheduler=RetryScheduler(retry_timeout) if retry_timeout else None,
+                                                      validation=validation or "graph")
+
+        self.simulator = Simulator(p, self.site_manager, self.transaction_manager, group_commit)
 
     def run(self):
         """
         Start simulator
         """
-        self.simulator.run()
+        def run_simulator():
+            return self.simulator.run(self.checkpoint_at)
+
+        if self.profile:
+            finished = run_profiled(run_simulator, self.profile, self.profile_out)
+        else:
+            finished = run_simulator()
+        if not finished:
+            save_checkpoint(self.checkpoint_file, self.simulator)
+        if self.router is not None:
+            self.router.close()
+        self.output.close()
+        if self.dump_writer is not None:
+            self.dump_writer.close()
+        if self.metrics is not None:
+            self.metrics.export(self.metrics_file, self.metrics_format)
+        if self.tracer is not None:
+            self.tracer.write_trace(self.trace_file, self.simulator.current_time)
+        if self.cost is not None:
+            print(self.cost.format_summary())
+        if self.analytics is not None:
+            print(self.analytics.format_report(self.hotspots))
+            if self.hotspot_file:
+                self.analytics.export(self.hotspot_file, self.hotspots)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+
+
+class AsOfReadTest(unittest.TestCase):
+    """
+    Reads and dumps of the committed history as of a past time
+    """
+
+    def test_recovered_copy_missing_a_commit_is_not_read(self):
+        engine = Engine(output=NullSink())
+        engine.fail(1)
+        engine.begin("T1")
+        engine.write("T1", "x2", 99)
+        self.assertTrue(engine.end("T1").is_committed())
+        engine.recover(1)
+        result = engine.read_as_of("x2", 7)
+        self.assertEqual(result.value, 99)
+        self.assertEqual(result.site_id, 2)
+        # Site 1 still holds the older value, it is read when asked for explicitly
+        self.assertEqual(engine.read_as_of("x2", 7, 1).value, 20)
+
+    def test_value_before_and_after_commit(self):
+        engine = Engine(output=NullSink())
+        engine.begin("T1")
+        engine.write("T1", "x4", 7)
+        engine.end("T1")
+        self.assertEqual(engine.read_as_of("x4", 3).value, 40)
+        self.assertEqual(engine.read_as_of("x4", 4).value, 7)
+        self.assertEqual(engine.dump_as_of(3).sites[5][4], 40)
+        self.assertEqual(engine.dump_as_of(4).sites[5][4], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
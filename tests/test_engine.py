@@ -0,0 +1,152 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import io
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink, RecordingSink
+from RepCRec.Scheduler import RetryScheduler
+from RepCRec.Simulator import Simulator
+from RepCRec.SiteManager import SiteManager
+from RepCRec.TransactionManager import TransactionManager
+from RepCRec.config import config
+from RepCRec.enums.AbortReason import AbortReason
+from RepCRec.enums.SiteStatus import SiteStatus
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+
+def run_simulator(lines, timeout=None):
+    """
+    Returns:
+        Output events of Simulator running lines, with a RetryScheduler if timeout is passed
+    """
+    sink = RecordingSink()
+    site_manager = SiteManager(config['NUM_SITES'], config['NUM_VARIABLES'], sink)
+    transaction_manager = TransactionManager(config['NUM_VARIABLES'], config['NUM_SITES'], site_manager,
+                                             scheduler=RetryScheduler(timeout) if timeout else None)
+    Simulator(io.StringIO("\n".join(lines) + "\n"), site_manager, transaction_manager).run()
+    return sink.events
+
+
+def run_engine(lines, timeout=None):
+    """
+    Returns:
+        Output events of Engine running lines, with a RetryScheduler if timeout is passed, and the deferred ends it reported
+    """
+    sink = RecordingSink()
+    engine = Engine(output=sink, scheduler=RetryScheduler(timeout) if timeout else None)
+    operations = {"begin": engine.begin, "R": engine.read, "W": engine.write, "end": engine.end,
+                  "fail": engine.fail, "recover": engine.recover}
+    for line in lines:
+        name, params = line.rstrip(")").split("(")
+        # Arguments are passed as parsed from the input file, like Simulator does
+        operations[name](*[param.strip() for param in params.split(",")])
+    return sink.events, engine.take_deferred_ends()
+
+
+class ResultTest(unittest.TestCase):
+    """
+    Every Engine operation returns the Result of its instruction
+    """
+
+    def setUp(self):
+        self.engine = Engine(output=NullSink())
+
+    def test_begin_read_write_end(self):
+        begin = self.engine.begin("T1")
+        self.assertEqual((begin.txn_name, begin.start_time), ("T1", 2))
+        write = self.engine.write("T1", "x2", 22)
+        self.assertEqual((write.var_name, write.value, write.sites), ("x2", 22, list(range(1, 11))))
+        read = self.engine.read("T1", "x2")
+        self.assertTrue(read.is_served())
+        self.assertEqual(read.value, 22)
+        read = self.engine.read("T1", "x3")
+        self.assertEqual((read.value, read.site_id), (30, 4))
+        end = self.engine.end("T1")
+        self.assertTrue(end.is_committed())
+        self.assertEqual(self.engine.dump().sites[1][2], 22)
+
+    def test_ssi_abort_has_reason(self):
+        self.engine.begin("T1")
+        self.engine.begin("T2")
+        self.engine.write("T1", "x2", 1)
+        self.engine.write("T2", "x2", 2)
+        self.assertTrue(self.engine.end("T1").is_committed())
+        end = self.engine.end("T2")
+        self.assertEqual((end.status, end.reason), (TransactionStatus.ABORTED, AbortReason.SSI))
+
+    def test_site_failure_abort_has_reason(self):
+        self.engine.begin("T1")
+        self.engine.write("T1", "x4", 1)
+        self.assertEqual(self.engine.fail(3).status, SiteStatus.DOWN)
+        end = self.engine.end("T1")
+        self.assertEqual((end.status, end.reason), (TransactionStatus.ABORTED, AbortReason.SITE_FAILURE))
+
+    def test_waiting_read_is_served_on_recover(self):
+        self.engine.fail(2)
+        self.engine.begin("T1")
+        read = self.engine.read("T1", "x1")
+        self.assertEqual(read.status, TransactionStatus.WAITING)
+        self.assertIsNone(read.value)
+        result = self.engine.recover(2)
+        self.assertEqual(result.status, SiteStatus.RECOVERED)
+        self.assertEqual([(read.var_name, read.value, read.site_id) for read in result.reads], [("x1", 10, 2)])
+        self.assertTrue(self.engine.end("T1").is_committed())
+
+    def test_end_group_and_fail_sites(self):
+        self.engine.begin("T1")
+        self.engine.begin("T2")
+        self.engine.write("T1", "x4", 1)
+        self.engine.write("T2", "x6", 2)
+        self.assertEqual([end.status for end in self.engine.end_group(["T1", "T2"])], [TransactionStatus.COMMITTED] * 2)
+        self.assertEqual(self.engine.current_time, 7)
+        self.assertEqual([(site.site_id, site.status) for site in self.engine.fail_sites([3, 4])],
+                         [(3, SiteStatus.DOWN), (4, SiteStatus.DOWN)])
+        self.assertEqual(self.engine.dump([1], [4, 6]).sites, {1: {4: 1, 6: 2}})
+
+    def test_same_output_as_simulator(self):
+        lines = ["begin(T1)", "begin(T2)", "W(T1,x2,5)", "R(T2,x2)", "fail(3)", "R(T1,x3)", "W(T2,x4,8)",
+                 "end(T2)", "recover(3)", "fail(2)", "begin(T3)", "R(T3,x1)", "end(T1)", "recover(2)", "end(T3)"]
+        events, ends = run_engine(lines)
+        self.assertEqual(events, run_simulator(lines))
+        self.assertEqual(ends, [])
+
+
+class DeferredEndTest(unittest.TestCase):
+    """
+    Engine retries deferred ends after every operation like Simulator does after every instruction
+    """
+
+    def assert_same_as_simulator(self, lines, timeout):
+        events, ends = run_engine(lines, timeout)
+        self.assertEqual(events, run_simulator(lines, timeout))
+        return ends
+
+    def test_recover_at_deadline_commits(self):
+        # end(T1) is deferred at tick 5 with deadline 8, recover(2) at tick 8 serves the read before the retry
+        ends = self.assert_same_as_simulator(["begin(T1)", "fail(2)", "R(T1,x1)", "end(T1)", "begin(T2)",
+                                              "begin(T3)", "recover(2)"], 3)
+        self.assertEqual([(end.txn_name, end.status) for end in ends], [("T1", TransactionStatus.COMMITTED)])
+
+    def test_timeout_aborts(self):
+        ends = self.assert_same_as_simulator(["begin(T1)", "fail(2)", "R(T1,x1)", "end(T1)", "begin(T2)",
+                                              "begin(T3)", "begin(T4)", "recover(2)"], 3)
+        self.assertEqual([(end.txn_name, end.status) for end in ends], [("T1", TransactionStatus.ABORTED)])
+
+    def test_end_returns_waiting_and_ends_are_taken_once(self):
+        engine = Engine(output=RecordingSink(), scheduler=RetryScheduler(3))
+        engine.begin("T1")
+        engine.fail(2)
+        engine.read("T1", "x1")
+        self.assertEqual(engine.end("T1").status, TransactionStatus.WAITING)
+        result = engine.recover(2)
+        self.assertEqual([end.status for end in result.ends], [TransactionStatus.COMMITTED])
+        self.assertEqual(engine.take_deferred_ends(), result.ends)
+        self.assertEqual(engine.take_deferred_ends(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+from RepCRec.Scheduler import RetryScheduler
+
+
+class PendingReadTest(unittest.TestCase):
+    """
+    A read served when its site recovers is validated like any other read. T1 reads x3 and writes x5,
+    T2 reads x5 and writes x3, so committing both would be a write skew
+    """
+
+    def run_trace(self, validation, fail_site):
+        engine = Engine(output=NullSink(), scheduler=RetryScheduler(10), validation=validation)
+        engine.begin("T1")
+        engine.begin("T2")
+        if fail_site:
+            engine.fail(4)
+        engine.read("T1", "x3")
+        if fail_site:
+            engine.recover(4)
+        engine.read("T2", "x5")
+        engine.write("T2", "x3", 30)
+        end_t2 = engine.end("T2")
+        engine.write("T1", "x5", 50)
+        end_t1 = engine.end("T1")
+        return end_t1, end_t2
+
+    def test_write_skew_aborts(self):
+        for validation in ["graph", "pivot"]:
+            for fail_site in [False, True]:
+                with self.subTest(validation=validation, fail_site=fail_site):
+                    end_t1, end_t2 = self.run_trace(validation, fail_site)
+                    self.assertTrue(end_t2.is_committed())
+                    self.assertFalse(end_t1.is_committed())
+
+
+if __name__ == "__main__":
+    unittest.main()
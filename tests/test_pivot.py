@@ -0,0 +1,76 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+from RepCRec.enums.AbortReason import AbortReason
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+
+class PivotValidationTest(unittest.TestCase):
+    """
+    SSI validation with the inConflict/outConflict flags of the pivot engine
+    """
+
+    def setUp(self):
+        self.engine = Engine(output=NullSink(), validation="pivot")
+        self.transaction_manager = self.engine.transaction_manager
+
+    def run_transactions(self, first, last):
+        # Each transaction reads a variable and writes another one, so consecutive ones overlap on variables
+        for i in range(first, last):
+            txn_name = "T%d" % i
+            self.engine.begin(txn_name)
+            self.engine.read(txn_name, "x%d" % (i % 20 + 1))
+            self.engine.write(txn_name, "x%d" % ((i + 3) % 20 + 1), i)
+            self.assertTrue(self.engine.end(txn_name).is_committed())
+
+    def assert_pruned(self):
+        self.assertEqual(len(self.transaction_manager.var_readers), 0)
+        self.assertEqual(sum(len(writers) for writers in self.transaction_manager.var_writers.values()), 0)
+        self.assertEqual(self.transaction_manager.in_conflict, set())
+        self.assertEqual(self.transaction_manager.out_conflict, set())
+        self.assertEqual(len(self.transaction_manager.rw_out_targets), 0)
+        self.assertEqual(len(self.transaction_manager.pivot_committed), 0)
+
+    def test_write_skew_aborts_pivot(self):
+        self.engine.begin("T1")
+        self.engine.begin("T2")
+        self.engine.read("T1", "x2")
+        self.engine.read("T2", "x4")
+        self.engine.write("T1", "x4", 1)
+        self.engine.write("T2", "x2", 2)
+        self.assertTrue(self.engine.end("T1").is_committed())
+        end = self.engine.end("T2")
+        self.assertEqual((end.status, end.reason), (TransactionStatus.ABORTED, AbortReason.PIVOT))
+        self.assertEqual(self.engine.dump().sites[1][2], 20)
+
+    def test_read_only_transaction_commits(self):
+        self.engine.begin("T1")
+        self.engine.begin("T2")
+        self.engine.read("T1", "x2")
+        self.engine.write("T2", "x2", 5)
+        self.assertTrue(self.engine.end("T2").is_committed())
+        self.engine.read("T1", "x4")
+        self.assertTrue(self.engine.end("T1").is_committed())
+
+    def test_state_is_pruned_after_many_transactions(self):
+        self.run_transactions(1, 400)
+        self.assert_pruned()
+
+    def test_state_is_kept_until_the_oldest_transaction_ends(self):
+        self.engine.begin("T0")
+        self.engine.read("T0", "x1")
+        self.run_transactions(1, 100)
+        # Commits after T0 started can still form rw edges with T0
+        self.assertEqual(len(self.transaction_manager.pivot_committed), 99)
+        self.assertTrue(self.engine.end("T0").is_committed())
+        self.assert_pruned()
+
+
+if __name__ == "__main__":
+    unittest.main()
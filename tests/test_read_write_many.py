@@ -0,0 +1,98 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import random
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+
+def random_batches(seed, length=200):
+    """
+    Returns:
+        List of (Engine method, arguments) of transactions reading and writing up to 5 random variables at once,
+        with site failures
+    """
+    rng = random.Random(seed)
+    operations = []
+    active = []
+    down = set()
+    num_txns = 0
+    for _ in range(length):
+        draw = rng.random()
+        var_names = ["x%d" % rng.randint(1, 20) for _ in range(rng.randint(1, 5))]
+        if draw < 0.15 or not active:
+            num_txns += 1
+            active.append("T%d" % num_txns)
+            operations.append(("begin", active[-1]))
+        elif draw < 0.45:
+            operations.append(("read_many", rng.choice(active), var_names))
+        elif draw < 0.7:
+            operations.append(("write_many", rng.choice(active), [(var_name, rng.randint(0, 999)) for var_name in var_names]))
+        elif draw < 0.85:
+            txn_name = rng.choice(active)
+            active.remove(txn_name)
+            operations.append(("end", txn_name))
+        elif draw < 0.93 and len(down) < 3:
+            site_id = rng.randint(1, 10)
+            if site_id not in down:
+                down.add(site_id)
+                operations.append(("fail", site_id))
+        elif down:
+            site_id = rng.choice(sorted(down))
+            down.remove(site_id)
+            operations.append(("recover", site_id))
+    return operations
+
+
+def run(operations, batched):
+    """
+    Returns:
+        Outcome of every read, write and end, and the final dump, with one operation per variable if not batched
+    """
+    engine = Engine(output=NullSink())
+    outcomes = []
+    for name, *args in operations:
+        if name == "read_many":
+            results = engine.read_many(*args) if batched else [engine.read(args[0], var_name) for var_name in args[1]]
+            outcomes.extend((result.var_name, result.status, result.value, result.site_id) for result in results)
+        elif name == "write_many":
+            results = engine.write_many(*args) if batched else [engine.write(args[0], *value) for value in args[1]]
+            outcomes.extend((result.var_name, result.value, result.sites) for result in results)
+        elif name == "end":
+            result = engine.end(*args)
+            outcomes.append((result.txn_name, result.status, result.reason))
+        else:
+            getattr(engine, name)(*args)
+    return outcomes, engine.dump().sites
+
+
+class ReadWriteManyTest(unittest.TestCase):
+    """
+    Batched R(T1, x1, x2) and W(T1, x2=5, x4=9) give the same results as one R or W per variable
+    """
+
+    def test_same_results_as_separate_operations(self):
+        for seed in range(20):
+            operations = random_batches(seed)
+            self.assertEqual(run(operations, True), run(operations, False))
+
+    def test_reads_after_writes_in_the_same_batches(self):
+        engine = Engine(output=NullSink())
+        engine.begin("T1")
+        engine.fail(2)
+        writes = engine.write_many("T1", [("x2", 5), ("x4", 9), ("x2", 6)])
+        self.assertEqual([write.value for write in writes], [5, 9, 6])
+        self.assertNotIn(2, writes[0].sites)
+        reads = engine.read_many("T1", ["x2", "x4", "x3", "x1"])
+        self.assertEqual([read.value for read in reads[:3]], [6, 9, 30])
+        # x1 is only stored on the failed site 2
+        self.assertEqual(reads[3].status, TransactionStatus.WAITING)
+
+
+if __name__ == "__main__":
+    unittest.main()
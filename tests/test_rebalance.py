@@ -0,0 +1,81 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+from RepCRec.Rebalance import SiteRebalancer
+
+
+class SiteRebalanceTest(unittest.TestCase):
+    """
+    Copies of variables moved in chunks after add_site and decommission_site
+    """
+
+    def setUp(self):
+        self.engine = Engine(output=NullSink())
+        self.site_manager = self.engine.site_manager
+        # One snapshot per chunk every 2 ticks, so a rebalance spans several operations
+        self.rebalancer = self.site_manager.rebalancer = SiteRebalancer(interval=2, chunk_size=1)
+        self.num_txns = 0
+        self.engine.begin("T1")
+        self.engine.write("T1", "x2", 5)
+        self.engine.write("T1", "x3", 7)
+        self.assertTrue(self.engine.end("T1").is_committed())
+
+    def run_until(self, done):
+        for _ in range(100):
+            if done():
+                return
+            self.num_txns += 1
+            self.engine.begin("T%d" % (100 + self.num_txns))
+        self.fail("Rebalance did not finish")
+
+    def read_all(self):
+        self.num_txns += 1
+        txn_name = "T%d" % (100 + self.num_txns)
+        self.engine.begin(txn_name)
+        values = [self.engine.read(txn_name, "x%d" % i).value for i in range(1, 21)]
+        self.assertTrue(self.engine.end(txn_name).is_committed())
+        return values
+
+    def test_decommissioned_site_drains(self):
+        before = self.read_all()
+        self.engine.decommission_site(4)
+        self.assertFalse(self.site_manager.is_in_service(4))
+        self.assertNotIn(4, self.site_manager.retired_site_ids)
+        self.assertTrue(self.rebalancer.pending)
+        self.run_until(lambda: not self.rebalancer.draining)
+        self.assertIn(4, self.site_manager.retired_site_ids)
+        self.assertNotIn(4, self.engine.dump().sites)
+        self.assertEqual(self.read_all(), before)
+        # x3 and x13 were only stored on site 4, their history moved with them
+        self.assertEqual(self.engine.read_as_of("x3", 3).value, 30)
+        self.assertEqual(self.engine.read_as_of("x3", 6).value, 7)
+
+    def test_values_survive_adding_a_site(self):
+        before = self.read_all()
+        new_site = self.engine.add_site().site_id
+        self.run_until(lambda: not self.rebalancer.pending)
+        values = self.engine.dump().sites[new_site]
+        self.assertEqual(values[2], 5)
+        self.assertEqual(self.read_all(), before)
+
+    def test_reader_keeps_its_snapshot_during_a_rebalance(self):
+        self.engine.begin("T2")
+        self.engine.read("T2", "x13")
+        self.engine.decommission_site(4)
+        self.engine.begin("T3")
+        self.engine.write("T3", "x3", 8)
+        self.assertTrue(self.engine.end("T3").is_committed())
+        self.run_until(lambda: not self.rebalancer.draining)
+        self.assertEqual(self.engine.read("T2", "x3").value, 7)
+        self.assertTrue(self.engine.end("T2").is_committed())
+        self.assertEqual(self.read_all()[2], 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import random
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+from RepCRec.Replication import LazyReplication
+from RepCRec.Result import EndResult, ReadResult
+
+
+def random_workload(seed, length=300):
+    """
+    Returns:
+        List of (Engine method, arguments) of transactions reading and writing random variables, with site failures
+    """
+    rng = random.Random(seed)
+    operations = []
+    active = []
+    down = set()
+    num_txns = 0
+    for _ in range(length):
+        draw = rng.random()
+        if draw < 0.15 or not active:
+            num_txns += 1
+            active.append("T%d" % num_txns)
+            operations.append(("begin", active[-1]))
+        elif draw < 0.45:
+            operations.append(("read", rng.choice(active), "x%d" % rng.randint(1, 20)))
+        elif draw < 0.7:
+            operations.append(("write", rng.choice(active), "x%d" % rng.randint(1, 20), rng.randint(0, 999)))
+        elif draw < 0.85:
+            txn_name = rng.choice(active)
+            active.remove(txn_name)
+            operations.append(("end", txn_name))
+        elif draw < 0.93 and len(down) < 3:
+            site_id = rng.randint(1, 10)
+            if site_id not in down:
+                down.add(site_id)
+                operations.append(("fail", site_id))
+        elif down:
+            site_id = rng.choice(sorted(down))
+            down.remove(site_id)
+            operations.append(("recover", site_id))
+    return operations
+
+
+class LazyReplicationTest(unittest.TestCase):
+    """
+    Replicas applying the replication log after the primary copies committed
+    """
+
+    def setUp(self):
+        self.replication = LazyReplication(interval=1000)
+        self.engine = Engine(output=NullSink(), replication=self.replication)
+        self.site_manager = self.engine.site_manager
+
+    def committed_value(self, site_id, var_id):
+        return self.site_manager.get_site(site_id).get_data_manager().get_committed_variable_value(var_id)
+
+    def commit_x2(self):
+        self.engine.begin("T1")
+        self.engine.write("T1", "x2", 5)
+        self.assertTrue(self.engine.end("T1").is_committed())
+
+    def test_only_the_primary_copy_is_committed_at_end(self):
+        self.commit_x2()
+        self.assertEqual([self.committed_value(site_id, 2) for site_id in range(1, 11)], [20, 20, 5] + [20] * 7)
+
+    def test_recovered_site_catches_up(self):
+        self.commit_x2()
+        self.engine.fail(5)
+        self.assertEqual(self.committed_value(5, 2), 20)
+        self.engine.recover(5)
+        self.assertEqual(self.committed_value(5, 2), 5)
+        self.assertTrue(self.replication.is_visible(5, self.engine.current_time))
+
+    def test_reads_respect_the_watermark(self):
+        self.engine.begin("T0")
+        self.commit_x2()
+        self.engine.begin("T2")
+        read = self.engine.read("T2", "x2")
+        self.assertEqual(read.value, 5)
+        # The site which served the read applied every commit made before T2 began
+        self.assertTrue(self.replication.is_visible(read.site_id, 5))
+        # T0 began before the commit and still reads the older value
+        self.assertEqual(self.engine.read("T0", "x2").value, 20)
+
+    def test_same_outcomes_as_eager_replication(self):
+        for seed in range(10):
+            operations = random_workload(seed)
+            outcomes = []
+            for replication in (None, LazyReplication()):
+                engine = Engine(output=NullSink(), replication=replication)
+                results = [getattr(engine, name)(*args) for name, *args in operations]
+                outcomes.append(([(result.status, result.value) for result in results if isinstance(result, ReadResult)],
+                                 [(result.txn_name, result.status) for result in results if isinstance(result, EndResult)],
+                                 engine.dump().sites))
+            self.assertEqual(outcomes[0], outcomes[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+from RepCRec.enums.TransactionStatus import TransactionStatus
+from RepCRec.tests.test_read_write_many import random_batches
+
+
+def run(operations, scan):
+    """
+    Returns:
+        Outcome of every read and end, and the final dump. Each batch of reads is replaced by the range of
+        variables from its lowest to its highest id, read with S() if scan, else with one R() per variable
+    """
+    engine = Engine(output=NullSink())
+    outcomes = []
+    for name, *args in operations:
+        if name == "read_many":
+            var_ids = [int(var_name[1:]) for var_name in args[1]]
+            first, last = min(var_ids), max(var_ids)
+            if scan:
+                results = engine.scan(args[0], "x%d" % first, "x%d" % last)
+            else:
+                results = [engine.read(args[0], "x%d" % var_id) for var_id in range(first, last + 1)]
+            outcomes.extend((result.var_name, result.status, result.value, result.site_id) for result in results)
+        elif name == "end":
+            result = engine.end(*args)
+            outcomes.append((result.txn_name, result.status, result.reason))
+        else:
+            getattr(engine, name)(*args)
+    return outcomes, engine.dump().sites
+
+
+class ScanTest(unittest.TestCase):
+    """
+    S(T1, x1, x20) gives the same results as one R per variable
+    """
+
+    def test_same_results_as_separate_reads(self):
+        for seed in range(20):
+            operations = random_batches(seed)
+            self.assertEqual(run(operations, True), run(operations, False))
+
+    def test_recovered_site_falls_back_to_another_copy(self):
+        engine = Engine(output=NullSink())
+        engine.fail(1)
+        engine.recover(1)
+        engine.fail(2)
+        engine.begin("T1")
+        results = engine.scan("T1", "x1", "x4")
+        # x1 only lives on the failed site 2, x2 and x4 are not readable on recovered site 1 before a commit
+        self.assertEqual(results[0].status, TransactionStatus.WAITING)
+        self.assertEqual([(result.value, result.site_id) for result in results[1:]], [(20, 3), (30, 4), (40, 3)])
+        engine.begin("T2")
+        reads = [engine.read("T2", "x%d" % var_id) for var_id in range(1, 5)]
+        self.assertEqual([(read.status, read.value, read.site_id) for read in reads],
+                         [(result.status, result.value, result.site_id) for result in results])
+
+
+if __name__ == "__main__":
+    unittest.main()
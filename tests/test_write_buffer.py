@@ -0,0 +1,68 @@
+"""
+Authors:
+1) Joel Marvin Tellis (jt4680)
+2) Sahil Bakshi (sb8916)
+"""
+import unittest
+
+from RepCRec.Engine import Engine
+from RepCRec.Output import NullSink
+from RepCRec.enums.AbortReason import AbortReason
+from RepCRec.enums.TransactionStatus import TransactionStatus
+
+
+class WriteBufferTest(unittest.TestCase):
+    """
+    Writes are kept in the write buffer of their transaction and reach the sites only at commit
+    """
+
+    def setUp(self):
+        self.engine = Engine(output=NullSink())
+
+    def values(self, var_id):
+        sites = self.engine.dump().sites
+        return {site_id: sites[site_id][var_id] for site_id in sites if var_id in sites[site_id]}
+
+    def test_read_your_own_writes(self):
+        self.engine.begin("T1")
+        self.engine.begin("T2")
+        self.engine.write("T1", "x2", 5)
+        self.engine.write("T1", "x3", 7)
+        self.assertEqual(self.engine.read("T1", "x2").value, 5)
+        self.assertEqual(self.engine.read("T1", "x3").value, 7)
+        self.engine.write("T1", "x2", 6)
+        self.assertEqual(self.engine.read("T1", "x2").value, 6)
+        # Other transactions and the sites do not see the buffered writes
+        self.assertEqual(self.engine.read("T2", "x2").value, 20)
+        self.assertEqual(set(self.values(2).values()), {20})
+        self.assertEqual(self.values(3), {4: 30})
+
+    def test_writes_reach_the_sites_at_commit(self):
+        self.engine.begin("T1")
+        self.engine.write("T1", "x2", 5)
+        self.assertTrue(self.engine.end("T1").is_committed())
+        self.assertEqual(set(self.values(2).values()), {5})
+
+    def test_site_down_at_write_keeps_its_value(self):
+        self.engine.fail(3)
+        self.engine.begin("T1")
+        self.assertNotIn(3, self.engine.write("T1", "x2", 5).sites)
+        self.engine.recover(3)
+        self.assertTrue(self.engine.end("T1").is_committed())
+        values = self.values(2)
+        self.assertEqual(values.pop(3), 20)
+        self.assertEqual(set(values.values()), {5})
+
+    def test_site_failing_before_end_aborts_without_writing(self):
+        self.engine.begin("T1")
+        self.engine.write("T1", "x2", 5)
+        self.engine.fail(3)
+        self.engine.recover(3)
+        end = self.engine.end("T1")
+        self.assertEqual((end.status, end.reason), (TransactionStatus.ABORTED, AbortReason.SITE_FAILURE))
+        self.assertEqual(set(self.values(2).values()), {20})
+        self.assertEqual(self.engine.transaction_manager.transaction_map[1].get_write_buffer(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()